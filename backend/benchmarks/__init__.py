@@ -0,0 +1,21 @@
+"""Offline performance benchmarks for the Solm8 backend.
+
+Benchmarks run against a scratch database (``DB_NAME`` defaults to
+``solm8_benchmark``) on the MongoDB at ``MONGO_URL`` and never touch the
+production database. Run them from the backend directory, e.g.:
+
+    python -m benchmarks.matches_with_messages
+"""
+import os
+
+BENCHMARK_DB_NAME = os.environ.setdefault("BENCHMARK_DB_NAME", "solm8_benchmark")
+# Must happen before database.py is imported anywhere
+os.environ["DB_NAME"] = BENCHMARK_DB_NAME
+
+def ensure_scratch_database(database):
+    """Refuse to seed or drop anything but the benchmark database"""
+    if database.name != BENCHMARK_DB_NAME:
+        raise RuntimeError(
+            f"Benchmarks must run against '{BENCHMARK_DB_NAME}', not '{database.name}'. "
+            "Import the benchmarks package before database.py."
+        )
@@ -0,0 +1,179 @@
+"""Cost of excluding already-swiped users from discovery against swipe history size.
+
+Compares the previous ``{"user_id": {"$nin": [...every swiped id...]}}`` filter
+with the per-user seen-set bitmap in ``exclusions.py``:
+
+* offline (default): size and encode time of the query document that has to
+  be shipped on every discovery request, against the size of the seen-set
+  blocks and the time to load them and test a page of candidates
+* ``--db``: end-to-end discovery latency on a seeded scratch database
+
+    python -m benchmarks.discovery_exclusion --swipes 10000 100000 1000000
+    python -m benchmarks.discovery_exclusion --swipes 10000 100000 --db
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import bson
+
+from benchmarks import BENCHMARK_DB_NAME, ensure_scratch_database
+from exclusions import BLOCK_BITS, WORD_BITS, WORDS_PER_BLOCK, SeenSet
+
+BSON_DOCUMENT_LIMIT = 16 * 1024 * 1024
+
+def blocks_for(user_id: str, seen: SeenSet) -> list:
+    """swipe_exclusions documents equivalent to an in-memory seen-set"""
+    word_bytes = WORD_BITS // 8
+    blocks = []
+    for block in range((len(seen.bits) * 8 + BLOCK_BITS - 1) // BLOCK_BITS):
+        doc = {"user_id": user_id, "block": block}
+        for word in range(WORDS_PER_BLOCK):
+            offset = block * BLOCK_BITS // 8 + word * word_bytes
+            value = int.from_bytes(seen.bits[offset:offset + word_bytes], "little")
+            if value:
+                doc[f"w{word}"] = bson.Int64(value)
+        if len(doc) > 2:
+            blocks.append(doc)
+    return blocks
+
+def timed(func, repeats: int) -> float:
+    """Median wall time of func() in milliseconds"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def offline_case(swipe_count: int, candidates: int, repeats: int) -> dict:
+    user_base = swipe_count * 2
+    swiped_seqs = random.sample(range(1, user_base + 1), swipe_count)
+    swiped_ids = [str(uuid.uuid4()) for _ in range(swipe_count)]
+
+    legacy_filter = {"user_id": {"$nin": swiped_ids}, "profile_complete": True}
+    legacy_bytes = len(bson.encode(legacy_filter))
+    legacy_ms = timed(lambda: bson.encode(legacy_filter), repeats)
+
+    seen = SeenSet(user_base)
+    for seq in swiped_seqs:
+        seen.add(seq)
+    blocks = blocks_for("bench", seen)
+    bitmap_bytes = sum(len(bson.encode(block)) for block in blocks)
+    encoded_blocks = [bson.encode(block) for block in blocks]
+    load_ms = timed(lambda: SeenSet.from_blocks(bson.decode(raw) for raw in encoded_blocks), repeats)
+
+    candidate_seqs = [random.randint(1, user_base) for _ in range(candidates)]
+    scan_ms = timed(lambda: sum(1 for seq in candidate_seqs if seq not in seen), repeats)
+
+    return {
+        "swipes": swipe_count,
+        "nin_filter_bytes": legacy_bytes,
+        "nin_over_bson_limit": legacy_bytes > BSON_DOCUMENT_LIMIT,
+        "nin_encode_ms": round(legacy_ms, 3),
+        "bitmap_bytes": bitmap_bytes,
+        "bitmap_blocks": len(blocks),
+        "bitmap_load_ms": round(load_ms, 3),
+        "bitmap_scan_ms": round(scan_ms, 3),
+        "candidates_scanned": candidates,
+    }
+
+async def db_case(swipe_count: int, page_size: int, repeats: int) -> dict:
+    """Seed one swiper who has swiped on swipe_count of 2 * swipe_count users and time discovery"""
+    from database import db, users_collection, swipes_collection, swipe_exclusions_collection
+    from exclusions import find_unseen_users
+    ensure_scratch_database(db)
+    for collection in (users_collection, swipes_collection, swipe_exclusions_collection):
+        await collection.delete_many({})
+
+    now = datetime.utcnow()
+    user_base = swipe_count * 2
+    users = [{
+        "user_id": str(uuid.uuid4()),
+        "user_seq": seq,
+        "profile_complete": True,
+        "created_at": now - timedelta(seconds=seq),
+    } for seq in range(1, user_base + 1)]
+    for start in range(0, len(users), 10000):
+        await users_collection.insert_many(users[start:start + 10000])
+
+    swiper_id = "bench-swiper"
+    # Swipe on the most recent users first, so discovery has to skip past them
+    swiped = users[:swipe_count]
+    seen = SeenSet(user_base)
+    for start in range(0, swipe_count, 10000):
+        await swipes_collection.insert_many([
+            {"swipe_id": str(uuid.uuid4()), "swiper_id": swiper_id, "target_id": user["user_id"], "action": "pass"}
+            for user in swiped[start:start + 10000]
+        ])
+    for user in swiped:
+        seen.add(user["user_seq"])
+    await swipe_exclusions_collection.insert_many(blocks_for(swiper_id, seen))
+
+    async def legacy():
+        swiped_ids = [doc["target_id"] async for doc in swipes_collection.find({"swiper_id": swiper_id}, {"target_id": 1})]
+        swiped_ids.append(swiper_id)
+        return await users_collection.find(
+            {"user_id": {"$nin": swiped_ids}, "profile_complete": True}
+        ).sort("created_at", -1).limit(page_size).to_list(length=page_size)
+
+    async def bitmap():
+        return await find_unseen_users(swiper_id, {"profile_complete": True}, [("created_at", -1)], page_size)
+
+    results = {"swipes": swipe_count}
+    for name, func in (("nin", legacy), ("bitmap", bitmap)):
+        samples = []
+        try:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                await func()
+                samples.append((time.perf_counter() - start) * 1000)
+            results[f"{name}_ms"] = round(statistics.median(samples), 2)
+        except Exception as e:
+            # The $nin document stops fitting in a single BSON command well before 1M swipes
+            results[f"{name}_error"] = str(e)[:200]
+    return results
+
+async def run_db(swipe_counts, page_size: int, repeats: int) -> list:
+    from database import db
+    from indexes import ensure_indexes
+    await ensure_indexes()
+    results = []
+    for swipe_count in swipe_counts:
+        result = await db_case(swipe_count, page_size, repeats)
+        results.append(result)
+        print(json.dumps(result))
+    await db.client.drop_database(BENCHMARK_DB_NAME)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--swipes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--candidates", type=int, default=1000, help="Candidates tested per offline scan")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--db", action="store_true", help="Time discovery end to end on the scratch database")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    if args.db:
+        results = asyncio.run(run_db(args.swipes, args.page_size, args.repeats))
+    else:
+        results = []
+        for swipe_count in args.swipes:
+            result = offline_case(swipe_count, args.candidates, args.repeats)
+            results.append(result)
+            print(f"{swipe_count:>8} swipes  $nin {result['nin_filter_bytes']:>10} B {result['nin_encode_ms']:8.2f} ms  "
+                  f"bitmap {result['bitmap_bytes']:>8} B load {result['bitmap_load_ms']:6.2f} ms "
+                  f"scan {result['bitmap_scan_ms']:6.3f} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "discovery_exclusion", "mode": "db" if args.db else "offline", "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Per-request time of /api/matches-with-messages against the number of matches.
+
+Compares the single-aggregation endpoint with the previous per-match query
+loop (other user, latest message, read status and unread count per match).
+
+    python -m benchmarks.matches_with_messages --matches 10 50 100 300 1000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks import BENCHMARK_DB_NAME, ensure_scratch_database
+from database import (
+    db, users_collection, matches_collection, messages_collection, read_status_collection
+)
+from indexes import ensure_indexes
+from message_previews import last_message_snapshot
+import server
+
+async def legacy_matches_with_messages(user_id: str) -> list:
+    """The pre-aggregation implementation: four queries per match"""
+    matches = await matches_collection.find({
+        "$or": [{"user1_id": user_id}, {"user2_id": user_id}]
+    }).sort("created_at", -1).to_list(length=None)
+
+    result = []
+    for match in matches:
+        other_user_id = match["user2_id"] if match["user1_id"] == user_id else match["user1_id"]
+        other_user = await users_collection.find_one({"user_id": other_user_id}, {"_id": 0, "password_hash": 0})
+        if not other_user:
+            continue
+        latest_message = await messages_collection.find_one({"match_id": match["match_id"]}, sort=[("timestamp", -1)])
+        read_status = await read_status_collection.find_one({"user_id": user_id, "match_id": match["match_id"]})
+        unread_query = {"match_id": match["match_id"], "sender_id": other_user_id}
+        if read_status and read_status.get("last_read_at"):
+            unread_query["timestamp"] = {"$gt": read_status["last_read_at"]}
+        unread_count = await messages_collection.count_documents(unread_query)
+        result.append({"match_id": match["match_id"], "other_user": other_user,
+                       "latest_message": latest_message, "unread_count": unread_count})
+    return result
+
+async def seed(match_count: int, messages_per_match: int) -> str:
+    """Create one user with match_count conversations and return their user_id"""
+    ensure_scratch_database(db)
+    for collection in (users_collection, matches_collection, messages_collection, read_status_collection):
+        await collection.delete_many({})
+
+    now = datetime.utcnow()
+    me = server.create_user_profile({"email": "bench@solm8.test", "display_name": "Bench"})
+    others = [
+        server.create_user_profile({"email": f"peer{i}@solm8.test", "display_name": f"Peer {i}"})
+        for i in range(match_count)
+    ]
+    await users_collection.insert_many([me] + others)
+
+    matches, messages, read_statuses = [], [], []
+    for i, other in enumerate(others):
+        match_id = str(uuid.uuid4())
+        created_at = now - timedelta(days=1, minutes=i)
+        matches.append({
+            "match_id": match_id,
+            "user1_id": me["user_id"] if i % 2 else other["user_id"],
+            "user2_id": other["user_id"] if i % 2 else me["user_id"],
+            "created_at": created_at,
+            "last_message_at": created_at
+        })
+        for j in range(messages_per_match):
+            messages.append({
+                "message_id": str(uuid.uuid4()),
+                "match_id": match_id,
+                "sender_id": other["user_id"] if j % 3 else me["user_id"],
+                "content": f"message {j}",
+                "timestamp": created_at + timedelta(seconds=j)
+            })
+        if messages_per_match:
+            matches[-1]["last_message_at"] = messages[-1]["timestamp"]
+            matches[-1]["last_message"] = last_message_snapshot(messages[-1])
+        if i % 2:
+            read_statuses.append({
+                "user_id": me["user_id"],
+                "match_id": match_id,
+                "last_read_at": created_at + timedelta(seconds=messages_per_match // 2)
+            })
+
+    await matches_collection.insert_many(matches)
+    if messages:
+        await messages_collection.insert_many(messages)
+    if read_statuses:
+        await read_status_collection.insert_many(read_statuses)
+    return me["user_id"]
+
+async def time_call(func, user_id: str, repeats: int) -> float:
+    """Median wall time of func(user_id) in milliseconds"""
+    await func(user_id)  # warm up caches and the connection pool
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await func(user_id)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+async def run(match_counts, messages_per_match: int, repeats: int) -> list:
+    await ensure_indexes()
+    results = []
+    for match_count in match_counts:
+        user_id = await seed(match_count, messages_per_match)
+        aggregation_ms = await time_call(server.get_matches_with_messages, user_id, repeats)
+        legacy_ms = await time_call(legacy_matches_with_messages, user_id, repeats)
+        results.append({
+            "matches": match_count,
+            "aggregation_ms": round(aggregation_ms, 2),
+            "legacy_ms": round(legacy_ms, 2),
+            "speedup": round(legacy_ms / aggregation_ms, 1) if aggregation_ms else None
+        })
+        print(f"{match_count:>6} matches  aggregation {aggregation_ms:9.2f} ms  legacy {legacy_ms:9.2f} ms")
+    await db.client.drop_database(BENCHMARK_DB_NAME)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, nargs="+", default=[10, 50, 100, 300, 1000])
+    parser.add_argument("--messages-per-match", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.matches, args.messages_per_match, args.repeats))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "matches_with_messages", "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
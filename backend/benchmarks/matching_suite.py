@@ -0,0 +1,201 @@
+"""Matching and discovery performance against the number of profiles.
+
+Profiles come from ``benchmarks.profiles`` (reproducible per --seed).
+
+* offline (default): per-pair ``calculate_compatibility_score`` throughput
+  (timed on a sample of pairs and extrapolated to a full scan), feature
+  store load time and footprint, and vectorized scoring, top-k and
+  shortlist scoring of one user against every profile
+* ``--db``: seeds the scratch database and times full
+  ``/api/ai-recommendations`` and ``/api/discover`` requests, plus the
+  live discovery query on its own
+
+Results are written as JSON with the commit they were measured on, so runs
+from two commits can be diffed:
+
+    python -m benchmarks.matching_suite --sizes 1000 10000 100000 1000000 --json matching.json
+    python -m benchmarks.matching_suite --sizes 1000 10000 100000 --db --json matching-db.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks import BENCHMARK_DB_NAME, ensure_scratch_database
+from benchmarks.profiles import generate_profiles
+from exclusions import SeenSet
+from feature_store import UserFeatureStore
+from matching import AIMatchingService
+
+def median_ms(samples: list) -> float:
+    return round(statistics.median(samples) * 1000, 3)
+
+def timed(func, repeats: int) -> float:
+    """Median wall time of func() in milliseconds"""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return median_ms(samples)
+
+async def timed_async(func, repeats: int) -> float:
+    """Median wall time of await func() in milliseconds, after one warm-up call"""
+    await func()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - start)
+    return median_ms(samples)
+
+def offline_case(size: int, seed: int, pair_sample: int, repeats: int) -> dict:
+    rng = random.Random(seed)
+    sample = []
+    store = UserFeatureStore()
+    start = time.perf_counter()
+    for profile in generate_profiles(size, seed):
+        store.upsert(profile)
+        if len(sample) < pair_sample:
+            sample.append(profile)
+    load_s = time.perf_counter() - start
+
+    # Per-pair scoring: one user against the first pair_sample profiles
+    user = sample[0]
+    start = time.perf_counter()
+    for candidate in sample:
+        AIMatchingService.calculate_compatibility_score(user, candidate)
+    per_pair_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+    users = [rng.choice(sample) for _ in range(repeats)]
+    seen = SeenSet()
+    batch = [timed(lambda: store.score(u, seen), 1) for u in users]
+    top_k = [timed(lambda: store.rank(u, seen, 10), 1) for u in users]
+    shortlist_sizes = []
+    shortlisted = []
+    for u in users:
+        rows = store.shortlist(u)
+        shortlist_sizes.append(len(rows))
+        shortlisted.append(timed(lambda: store.score(u, seen, candidates=rows), 1))
+
+    return {
+        "profiles": size,
+        "per_pair_us": round(per_pair_us, 2),
+        "per_pair_full_scan_ms": round(per_pair_us * size / 1000, 1),
+        "store_load_s": round(load_s, 2),
+        "store_row_bytes": store.row_nbytes,
+        "batch_score_ms": round(statistics.median(batch), 3),
+        "top10_ms": round(statistics.median(top_k), 3),
+        "shortlist_fraction": round(statistics.median(shortlist_sizes) / size, 3),
+        "shortlist_score_ms": round(statistics.median(shortlisted), 3),
+    }
+
+async def db_case(size: int, seed: int, repeats: int) -> dict:
+    from fastapi import Response
+    from database import db, users_collection, swipe_exclusions_collection, discovery_queues_collection, \
+        recommendations_collection
+    from discovery_queue import discovery_query
+    from exclusions import find_unseen_users
+    import feature_store as feature_store_module
+    import server
+
+    ensure_scratch_database(db)
+    for collection in (users_collection, swipe_exclusions_collection, discovery_queues_collection,
+                       recommendations_collection):
+        await collection.delete_many({})
+
+    profiles = generate_profiles(size, seed)
+    start = time.perf_counter()
+    while True:
+        batch = list(itertools.islice(profiles, 10000))
+        if not batch:
+            break
+        await users_collection.insert_many(batch)
+    seed_s = time.perf_counter() - start
+    user = await users_collection.find_one({"user_seq": 1}, {"_id": 0})
+    user_id = user["user_id"]
+
+    # Reset the server's store in place (it holds the previous size's rows), so the first request pays the full load
+    feature_store_module.feature_store.__init__()
+    start = time.perf_counter()
+    await server.get_ai_recommendations(user_id, Response(), limit=10)
+    cold_ms = (time.perf_counter() - start) * 1000
+    recommend_ms = await timed_async(lambda: server.get_ai_recommendations(user_id, Response(), limit=10), repeats)
+
+    query, sort = discovery_query("free", None)
+    discovery_query_ms = await timed_async(lambda: find_unseen_users(user_id, query, sort, 10), repeats)
+    # The first request falls back to the live scan and schedules the queue refill
+    discover_ms = await timed_async(lambda: server.discover_users(user_id, limit=10), repeats)
+
+    return {
+        "profiles": size,
+        "seed_s": round(seed_s, 2),
+        "recommendations_cold_ms": round(cold_ms, 2),
+        "recommendations_ms": recommend_ms,
+        "discovery_query_ms": discovery_query_ms,
+        "discover_ms": discover_ms,
+    }
+
+async def run_db(sizes, seed: int, repeats: int) -> list:
+    from database import db
+    from indexes import ensure_indexes
+    await ensure_indexes()
+    results = []
+    for size in sizes:
+        result = await db_case(size, seed, repeats)
+        results.append(result)
+        print(json.dumps(result))
+    await db.client.drop_database(BENCHMARK_DB_NAME)
+    return results
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pair-sample", type=int, default=20000, help="Pairs timed for per-pair scoring")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--db", action="store_true", help="Time recommendation and discovery requests on the scratch database")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    if args.db:
+        results = asyncio.run(run_db(args.sizes, args.seed, args.repeats))
+    else:
+        results = []
+        for size in args.sizes:
+            result = offline_case(size, args.seed, args.pair_sample, args.repeats)
+            results.append(result)
+            print(f"{size:>8} profiles  per-pair {result['per_pair_us']:6.2f} us  "
+                  f"batch {result['batch_score_ms']:9.3f} ms  top10 {result['top10_ms']:9.3f} ms  "
+                  f"shortlist {result['shortlist_score_ms']:9.3f} ms  load {result['store_load_s']:6.2f} s")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "benchmark": "matching_suite",
+                "mode": "db" if args.db else "offline",
+                "commit": current_commit(),
+                "measured_at": datetime.utcnow().isoformat(),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "seed": args.seed,
+                "results": results,
+            }, f, indent=2)
+
+if __name__ == "__main__":
+    main()
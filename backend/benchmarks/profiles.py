@@ -0,0 +1,77 @@
+"""Synthetic trader profiles for matching benchmarks.
+
+Values come from the enums AIMatchingService scores on (experience levels,
+trading styles, risk levels, goals) and the option lists the profile form
+offers for the free-text-looking fields (tokens, platforms, hours). Skews
+follow what real sign-ups look like: mostly beginners and intermediates,
+one to three token categories, and the odd optional field left empty.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+from matching import AIMatchingService
+
+EXPERIENCE = list(AIMatchingService.EXPERIENCE_LEVELS)
+EXPERIENCE_WEIGHTS = [40, 30, 20, 10]
+# Typical years_trading per experience level
+YEARS_BY_EXPERIENCE = {"Beginner": (0, 1), "Intermediate": (1, 3), "Advanced": (2, 6), "Expert": (4, 10)}
+STYLES = list(AIMatchingService.COMPATIBLE_STYLES)
+RISK = list(AIMatchingService.RISK_LEVELS)
+GOALS = sorted({goal for pair in AIMatchingService.COMPLEMENTARY_GOALS for goal in pair})
+COMMUNICATION_STYLES = sorted({style for pair in AIMatchingService.COMPATIBLE_COMMUNICATION_STYLES for style in pair})
+
+# Option lists from the profile form (frontend/src/App.js)
+TOKENS = ["Meme Coins", "DeFi", "GameFi", "NFTs", "Blue Chips", "Layer 1s"]
+TOKEN_WEIGHTS = [35, 25, 10, 10, 12, 8]
+TRADING_PLATFORMS = ["Axiom", "BullX", "Photon", "Padre", "Jupiter", "Raydium", "Magic Eden", "Other"]
+COMMUNICATION_PLATFORMS = ["Discord", "Telegram", "Twitter DM", "Signal", "WhatsApp", "In-App Only"]
+HOURS = ["Early Morning", "Morning", "Afternoon", "Evening", "Night Owl", "24/7"]
+PORTFOLIO_SIZES = ["Under $1K", "$1K-$10K", "$10K-$100K", "$100K+", "Prefer not to say"]
+
+# Chance an optional matching field was left empty
+EMPTY_OPTIONAL = 0.1
+
+def _weighted_sample(rng: random.Random, population: list, weights: list, count: int) -> list:
+    chosen = []
+    while len(chosen) < count:
+        value = rng.choices(population, weights)[0]
+        if value not in chosen:
+            chosen.append(value)
+    return chosen
+
+def _optional(rng: random.Random, value):
+    return "" if rng.random() < EMPTY_OPTIONAL else value
+
+def synthetic_profile(rng: random.Random, seq: int, now: Optional[datetime] = None) -> dict:
+    """One complete profile; user_seq is seq"""
+    now = now or datetime.utcnow()
+    experience = rng.choices(EXPERIENCE, EXPERIENCE_WEIGHTS)[0]
+    low, high = YEARS_BY_EXPERIENCE[experience]
+    return {
+        "user_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "user_seq": seq,
+        "username": f"trader_{seq}",
+        "display_name": f"Trader {seq}",
+        "profile_complete": True,
+        "last_activity": now - timedelta(minutes=rng.expovariate(1 / 1440)),
+        "trading_experience": experience,
+        "years_trading": rng.randint(low, high),
+        "preferred_tokens": _weighted_sample(rng, TOKENS, TOKEN_WEIGHTS, rng.choice([1, 2, 2, 3, 3, 4])),
+        "looking_for": rng.sample(GOALS, rng.choice([1, 2, 2, 3])),
+        "trading_style": rng.choice(STYLES),
+        "portfolio_size": rng.choice(PORTFOLIO_SIZES),
+        "risk_tolerance": _optional(rng, rng.choice(RISK)),
+        "communication_style": _optional(rng, rng.choice(COMMUNICATION_STYLES)),
+        "trading_hours": _optional(rng, rng.choice(HOURS)),
+        "preferred_trading_platform": _optional(rng, rng.choice(TRADING_PLATFORMS)),
+        "preferred_communication_platform": _optional(rng, rng.choice(COMMUNICATION_PLATFORMS)),
+    }
+
+def generate_profiles(count: int, seed: int = 0) -> Iterator[dict]:
+    """count synthetic profiles, reproducible for a given seed"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    for seq in range(1, count + 1):
+        yield synthetic_profile(rng, seq, now)
@@ -0,0 +1,185 @@
+"""Swipes per second on one worker, before and after the consolidated swipe path.
+
+Compares ``/api/swipe`` with the previous sequential implementation (limit
+check, swipe insert, target lookup, exclusion writes, rewind entitlement,
+history and like inserts, mutual check, then the limit check again). Swipes
+are issued from one event loop with --concurrency requests in flight, the
+way a single uvicorn worker serves them. A share of the likes answer an
+earlier like, so the match branch is exercised too.
+
+    python -m benchmarks.swipe_throughput --swipes 2000 --concurrency 1 10 50 --json swipes.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks import BENCHMARK_DB_NAME, ensure_scratch_database
+from database import (
+    db, users_collection, swipes_collection, swipe_history_collection, likes_received_collection,
+    matches_collection, subscriptions_collection, swipe_exclusions_collection, discovery_queues_collection,
+    analytics_collection, swipe_quotas_collection
+)
+from indexes import ensure_indexes
+import server
+
+COLLECTIONS = (users_collection, swipes_collection, swipe_history_collection, likes_received_collection,
+               matches_collection, subscriptions_collection, swipe_exclusions_collection,
+               discovery_queues_collection, analytics_collection, swipe_quotas_collection)
+
+async def legacy_swipe_user(swipe: server.SwipeAction):
+    """The pre-consolidation implementation: every call awaited in turn"""
+    swipe_status = await server.check_swipe_limit(swipe.swiper_id)
+    if not swipe_status["can_swipe"]:
+        return {"error": "daily_limit_reached", "swipes_remaining": 0, "upgrade_required": True}
+
+    swipe_data = {
+        "swipe_id": str(uuid.uuid4()),
+        "swiper_id": swipe.swiper_id,
+        "target_id": swipe.target_id,
+        "action": swipe.action,
+        "swiped_at": datetime.utcnow(),
+        "timestamp": datetime.utcnow()
+    }
+    await swipes_collection.insert_one(swipe_data)
+
+    target = await users_collection.find_one({"user_id": swipe.target_id}, {"_id": 0, "user_seq": 1})
+    if target:
+        await server.mark_seen(swipe.swiper_id, target.get("user_seq"))
+    await server.pop_candidate(swipe.swiper_id, swipe.target_id)
+
+    await swipe_history_collection.insert_one({
+        "user_id": swipe.swiper_id,
+        "swipe_data": swipe_data,
+        "can_rewind": await server.can_rewind_swipe(swipe.swiper_id)
+    })
+
+    if swipe.action == "like":
+        await likes_received_collection.insert_one({
+            "user_id": swipe.target_id,
+            "liked_by_user_id": swipe.swiper_id,
+            "liked_at": datetime.utcnow()
+        })
+        mutual_like = await swipes_collection.find_one({
+            "swiper_id": swipe.target_id,
+            "target_id": swipe.swiper_id,
+            "action": "like"
+        })
+        if mutual_like:
+            match_data = {
+                "match_id": str(uuid.uuid4()),
+                "user1_id": swipe.swiper_id,
+                "user2_id": swipe.target_id,
+                "created_at": datetime.utcnow(),
+                "last_message_at": datetime.utcnow()
+            }
+            await matches_collection.insert_one(match_data)
+            await server.update_user_analytics(swipe.swiper_id, "match_made")
+            await server.update_user_analytics(swipe.target_id, "match_made")
+            match_notification = {"type": "new_match", "match_id": match_data["match_id"]}
+            await server.manager.send_message(json.dumps(match_notification), swipe.swiper_id)
+            await server.manager.send_message(json.dumps(match_notification), swipe.target_id)
+            updated_swipe_status = await server.check_swipe_limit(swipe.swiper_id)
+            return {"matched": True, "match_id": match_data["match_id"],
+                    "swipes_remaining": updated_swipe_status["swipes_remaining"]}
+
+    updated_swipe_status = await server.check_swipe_limit(swipe.swiper_id)
+    return {"matched": False, "swipes_remaining": updated_swipe_status["swipes_remaining"]}
+
+async def seed(user_count: int, swipe_count: int, like_share: float, mutual_share: float, seed_value: int) -> list:
+    """Reset the scratch collections, create user_count users and return swipe_count swipes to replay
+
+    Swipers get premium subscriptions so the daily limit never cuts a run
+    short; the limit check itself still runs on every swipe.
+    """
+    ensure_scratch_database(db)
+    for collection in COLLECTIONS:
+        await collection.delete_many({})
+
+    rng = random.Random(seed_value)
+    users = [
+        server.create_user_profile({"email": f"swiper{i}@solm8.test", "display_name": f"Swiper {i}"})
+        for i in range(user_count)
+    ]
+    for seq, user in enumerate(users, start=1):
+        user["user_seq"] = seq
+    await users_collection.insert_many(users)
+    now = datetime.utcnow()
+    await subscriptions_collection.insert_many([{
+        "user_id": user["user_id"],
+        "plan_type": "premium_monthly",
+        "status": "active",
+        "created_at": now,
+        "expires_at": now + timedelta(days=30)
+    } for user in users])
+
+    # Each pair swipes at most once (swipes are unique per swiper and target)
+    swipes, earlier_likes, pairs = [], [], set()
+    while len(swipes) < swipe_count:
+        if earlier_likes and rng.random() < mutual_share:
+            # Answer an earlier like, so it becomes a match
+            swiper_id, target_id = earlier_likes.pop(rng.randrange(len(earlier_likes)))[::-1]
+            if (swiper_id, target_id) not in pairs:
+                pairs.add((swiper_id, target_id))
+                swipes.append(server.SwipeAction(swiper_id=swiper_id, target_id=target_id, action="like"))
+            continue
+        swiper, target = rng.sample(users, 2)
+        if (swiper["user_id"], target["user_id"]) in pairs:
+            continue
+        pairs.add((swiper["user_id"], target["user_id"]))
+        action = "like" if rng.random() < like_share else "pass"
+        swipes.append(server.SwipeAction(swiper_id=swiper["user_id"], target_id=target["user_id"], action=action))
+        if action == "like":
+            earlier_likes.append((swiper["user_id"], target["user_id"]))
+    return swipes
+
+async def replay(func, swipes: list, concurrency: int) -> float:
+    """Swipes per second running swipes through func with concurrency in flight"""
+    pending = iter(swipes)
+
+    async def worker():
+        for swipe in pending:
+            await func(swipe)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(swipes) / (time.perf_counter() - start)
+
+async def run(swipe_count: int, concurrencies, user_count: int, like_share: float, mutual_share: float,
+              seed_value: int) -> list:
+    await ensure_indexes()
+    results = []
+    for concurrency in concurrencies:
+        row = {"concurrency": concurrency, "swipes": swipe_count}
+        for name, func in (("legacy", legacy_swipe_user), ("consolidated", server.swipe_user)):
+            swipes = await seed(user_count, swipe_count, like_share, mutual_share, seed_value)
+            row[f"{name}_per_s"] = round(await replay(func, swipes, concurrency), 1)
+        row["speedup"] = round(row["consolidated_per_s"] / row["legacy_per_s"], 2) if row["legacy_per_s"] else None
+        results.append(row)
+        print(f"{concurrency:>4} in flight  legacy {row['legacy_per_s']:9.1f}/s  "
+              f"consolidated {row['consolidated_per_s']:9.1f}/s")
+    await db.client.drop_database(BENCHMARK_DB_NAME)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--swipes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--like-share", type=float, default=0.5, help="Share of new swipes that are likes")
+    parser.add_argument("--mutual-share", type=float, default=0.1, help="Share of swipes answering an earlier like")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.swipes, args.concurrency, args.users, args.like_share, args.mutual_share,
+                              args.seed))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"benchmark": "swipe_throughput", "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
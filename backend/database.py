@@ -0,0 +1,74 @@
+import os
+from motor.motor_asyncio import AsyncIOMotorClient
+
+# Database setup
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.environ.get('DB_NAME', 'solm8_db')
+
+# Pool sizing - one worker keeps many requests in flight while waiting on I/O
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 200))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 10))
+
+# Handle MongoDB Atlas connection with proper SSL and authentication
+if 'mongodb+srv://' in MONGO_URL or 'mongodb.net' in MONGO_URL:
+    # MongoDB Atlas connection
+    client = AsyncIOMotorClient(
+        MONGO_URL,
+        tls=True,
+        tlsAllowInvalidCertificates=False,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE
+    )
+else:
+    # Local MongoDB connection
+    client = AsyncIOMotorClient(
+        MONGO_URL,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE
+    )
+
+# Use environment variable for database name
+db = client[DB_NAME]
+
+# Collections
+users_collection = db.users
+matches_collection = db.matches
+messages_collection = db.messages
+swipes_collection = db.swipes
+profile_images_collection = db.profile_images
+trading_highlights_collection = db.trading_highlights
+social_links_collection = db.social_links
+token_launch_profiles_collection = db.token_launch_profiles
+referrals_collection = db.referrals
+subscriptions_collection = db.subscriptions
+# Folded into swipes (migrations.py collapse_swipe_records); kept for that migration and the legacy swipe benchmark
+swipe_history_collection = db.swipe_history
+likes_received_collection = db.likes_received
+portfolio_connections_collection = db.portfolio_connections
+trading_signals_collection = db.trading_signals
+trading_groups_collection = db.trading_groups
+trading_calendar_collection = db.trading_calendar
+analytics_collection = db.analytics
+read_status_collection = db.read_status
+counters_collection = db.counters
+swipe_exclusions_collection = db.swipe_exclusions
+discovery_queues_collection = db.discovery_queues
+recommendations_collection = db.recommendations
+recommendation_jobs_collection = db.recommendation_jobs
+swipe_quotas_collection = db.swipe_quotas
+
+async def verify_connection():
+    """Ping MongoDB so the app refuses to start with a broken DB"""
+    try:
+        await client.admin.command('ping')
+        print(f"✅ MongoDB connected successfully to: {MONGO_URL}")
+    except Exception as e:
+        print(f"❌ MongoDB connection failed: {e}")
+        print(f"MONGO_URL: {MONGO_URL}")
+        print(f"DB_NAME: {DB_NAME}")
+        # Re-raise to prevent app from starting with broken DB
+        raise
+
+async def fetch_all(cursor) -> list:
+    """Drain a motor cursor into a list"""
+    return await cursor.to_list(length=None)
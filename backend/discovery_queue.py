@@ -0,0 +1,154 @@
+"""Per-user precomputed discovery queues.
+
+``/api/discover`` serves the head of a queue of candidate user_ids kept in
+``discovery_queues`` instead of scanning ``users`` on every call:
+
+    {"user_id": ..., "candidates": [...], "plan_type": ..., "filters": {...}, "refilled_at": ...}
+
+Queues are filled in the background with the same rules as the live scan
+(``discovery_query``). A swipe pops its target. A refill that started
+before a swipe can write the target back, so the head is checked against
+the seen-set again when served. When fewer than
+``QUEUE_LOW_WATERMARK`` candidates remain, or the queue is older than
+``QUEUE_MAX_AGE``, a refill is scheduled.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from database import discovery_queues_collection, users_collection
+from exclusions import find_unseen_users, load_seen_set
+
+QUEUE_SIZE = int(os.environ.get('DISCOVERY_QUEUE_SIZE', 200))
+QUEUE_LOW_WATERMARK = int(os.environ.get('DISCOVERY_QUEUE_LOW_WATERMARK', 20))
+QUEUE_MAX_AGE = timedelta(minutes=int(os.environ.get('DISCOVERY_QUEUE_MAX_AGE_MINUTES', 10)))
+
+# user_ids with a refill in flight, so bursts of swipes schedule one refill
+_refilling = set()
+# Running refill tasks; the event loop only keeps weak references to tasks
+_refill_tasks = set()
+
+def discovery_query(plan_type: str, filters: Optional[dict]) -> Tuple[dict, list]:
+    """(query, sort) used to pick discovery candidates for a plan and filter set"""
+    query = {"profile_complete": True}
+
+    # Apply premium filters if available
+    if plan_type != "free" and filters:
+        if filters.get("portfolio_size"):
+            query["portfolio_size"] = filters["portfolio_size"]
+        if filters.get("trading_experience"):
+            query["trading_experience"] = filters["trading_experience"]
+        if filters.get("preferred_tokens"):
+            query["preferred_tokens"] = {"$in": filters["preferred_tokens"]}
+        if filters.get("years_trading_min"):
+            query["years_trading"] = {"$gte": filters["years_trading_min"]}
+        if filters.get("location"):
+            query["location"] = {"$regex": filters["location"], "$options": "i"}
+
+    # Premium users get priority (more recent activity first)
+    # Free users get standard sorting
+    sort_criteria = "last_activity" if plan_type != "free" else "created_at"
+    return query, [(sort_criteria, -1)]
+
+def effective_filters(plan_type: str, filters: Optional[dict]) -> dict:
+    """Filters only apply to paid plans; normalize so queues can be compared"""
+    return dict(filters) if plan_type != "free" and filters else {}
+
+async def refill_queue(user_id: str, plan_type: str, filters: Optional[dict] = None) -> list:
+    """Recompute user_id's queue from scratch and store it"""
+    filters = effective_filters(plan_type, filters)
+    query, sort = discovery_query(plan_type, filters)
+    candidates = await find_unseen_users(user_id, query, sort, QUEUE_SIZE)
+    candidate_ids = [user["user_id"] for user in candidates]
+    await discovery_queues_collection.update_one(
+        {"user_id": user_id},
+        {"$set": {
+            "candidates": candidate_ids,
+            "plan_type": plan_type,
+            "filters": filters,
+            "refilled_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+    return candidate_ids
+
+async def _refill_in_background(user_id: str, plan_type: str, filters: dict):
+    try:
+        await refill_queue(user_id, plan_type, filters)
+    except Exception as e:
+        print(f"Discovery queue refill failed for {user_id}: {e}")
+    finally:
+        _refilling.discard(user_id)
+
+def schedule_refill(user_id: str, plan_type: str, filters: Optional[dict] = None):
+    """Refill user_id's queue off the request path; no-op if one is already running"""
+    if user_id in _refilling:
+        return
+    _refilling.add(user_id)
+    task = asyncio.create_task(_refill_in_background(user_id, plan_type, effective_filters(plan_type, filters)))
+    _refill_tasks.add(task)
+    task.add_done_callback(_refill_tasks.discard)
+
+async def next_candidates(user_id: str, plan_type: str, filters: Optional[dict], limit: int) -> Optional[list]:
+    """Head of user_id's queue as full user documents, or None if the queue can't serve this request
+
+    The caller falls back to the live scan on None; a refill is already scheduled.
+    """
+    filters = effective_filters(plan_type, filters)
+    queue = await discovery_queues_collection.find_one(
+        {"user_id": user_id},
+        {"_id": 0, "candidates": {"$slice": limit}, "plan_type": 1, "filters": 1, "refilled_at": 1}
+    )
+    if not queue or queue.get("plan_type") != plan_type or queue.get("filters", {}) != filters:
+        schedule_refill(user_id, plan_type, filters)
+        return None
+    if datetime.utcnow() - queue["refilled_at"] > QUEUE_MAX_AGE:
+        schedule_refill(user_id, plan_type, filters)
+
+    candidate_ids = queue["candidates"]
+    if len(candidate_ids) < limit:
+        # Drained faster than the refill; a short page could hide users the live scan would find
+        schedule_refill(user_id, plan_type, filters)
+        return None
+    head, seen = await asyncio.gather(
+        users_collection.find(
+            {"user_id": {"$in": candidate_ids}, "profile_complete": True}, {"_id": 0}
+        ).to_list(length=None),
+        load_seen_set(user_id)
+    )
+    users = {user["user_id"]: user for user in head}
+    if len(users) < len(candidate_ids):
+        # Someone in the head was deleted or went incomplete since the last refill
+        schedule_refill(user_id, plan_type, filters)
+        return None
+    swiped_ids = [uid for uid in candidate_ids if users[uid].get("user_seq") is not None and users[uid]["user_seq"] in seen]
+    if swiped_ids:
+        # Written back by a refill that scanned before these swipes; drop them and serve the live scan this time
+        await discovery_queues_collection.update_one(
+            {"user_id": user_id}, {"$pull": {"candidates": {"$in": swiped_ids}}}
+        )
+        return None
+    return [users[uid] for uid in candidate_ids]
+
+async def pop_candidate(user_id: str, target_id: str):
+    """Drop a swiped target from user_id's queue, refilling when it runs low"""
+    await pop_candidates(user_id, [target_id])
+
+async def pop_candidates(user_id: str, target_ids: list):
+    """Drop several swiped targets from user_id's queue with one update"""
+    queue = await discovery_queues_collection.find_one_and_update(
+        {"user_id": user_id},
+        {"$pull": {"candidates": {"$in": target_ids}}},
+        projection={"_id": 0, "candidates": 1, "plan_type": 1, "filters": 1}
+    )
+    # find_one_and_update returns the pre-pull document
+    if queue and len(set(queue["candidates"]) - set(target_ids)) < QUEUE_LOW_WATERMARK:
+        schedule_refill(user_id, queue["plan_type"], queue.get("filters"))
+
+async def push_candidate_front(user_id: str, target_id: str):
+    """Put a rewound target back at the head of user_id's queue"""
+    await discovery_queues_collection.update_one(
+        {"user_id": user_id, "candidates": {"$ne": target_id}},
+        {"$push": {"candidates": {"$each": [target_id], "$position": 0}}}
+    )
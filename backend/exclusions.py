@@ -0,0 +1,157 @@
+"""Per-user seen-sets for discovery exclusion.
+
+Every user gets a small integer ``user_seq``. The set of users someone has
+already swiped on is stored as a bitmap over those integers, split into
+fixed-size blocks in ``swipe_exclusions``:
+
+    {"user_id": ..., "block": seq // BLOCK_BITS, "w0": <32 bits>, ..., "w127": <32 bits>}
+
+Swipes set a bit with an atomic ``$bit`` upsert, so the stored set never grows
+beyond one bit per user in the base. Discovery walks the candidate index and
+skips members of the set in memory. The query document no longer carries
+the swipe history in a ``$nin`` list.
+"""
+from typing import AsyncIterator, Optional
+
+from bson import Int64
+from pymongo import ReturnDocument
+
+from database import counters_collection, swipe_exclusions_collection, swipes_collection, users_collection
+
+WORD_BITS = 32
+WORDS_PER_BLOCK = 128
+BLOCK_BITS = WORD_BITS * WORDS_PER_BLOCK
+WORD_MASK = (1 << WORD_BITS) - 1
+
+class SeenSet:
+    """In-memory bitmap of user_seq values"""
+
+    def __init__(self, size_bits: int = 0):
+        self.bits = bytearray((size_bits + 7) // 8)
+
+    def __contains__(self, seq: int) -> bool:
+        byte = seq >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & (1 << (seq & 7)))
+
+    def add(self, seq: int):
+        byte = seq >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte + 1 - len(self.bits)))
+        self.bits[byte] |= 1 << (seq & 7)
+
+    def __len__(self) -> int:
+        return sum(bin(b).count("1") for b in self.bits)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.bits)
+
+    @classmethod
+    def from_blocks(cls, blocks) -> "SeenSet":
+        """Assemble a bitmap from swipe_exclusions block documents"""
+        blocks = list(blocks)
+        seen = cls((max((b["block"] for b in blocks), default=-1) + 1) * BLOCK_BITS)
+        for block in blocks:
+            base = block["block"] * BLOCK_BITS // 8
+            for word in range(WORDS_PER_BLOCK):
+                value = block.get(f"w{word}")
+                if value:
+                    offset = base + word * WORD_BITS // 8
+                    seen.bits[offset:offset + WORD_BITS // 8] = (value & WORD_MASK).to_bytes(WORD_BITS // 8, "little")
+        return seen
+
+def _bit_position(seq: int):
+    """(block, word field, mask) addressing seq's bit"""
+    block, offset = divmod(seq, BLOCK_BITS)
+    word, bit = divmod(offset, WORD_BITS)
+    return block, f"w{word}", 1 << bit
+
+async def next_user_seq() -> int:
+    """Allocate the next integer user sequence number"""
+    counter = await counters_collection.find_one_and_update(
+        {"_id": "user_seq"},
+        {"$inc": {"value": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["value"]
+
+def seen_update(user_id: str, seq: int, seen: bool = True) -> tuple:
+    """(filter, update) setting or clearing seq's bit for user_id; usable in bulk writes"""
+    block, field, mask = _bit_position(seq)
+    operation = {"or": Int64(mask)} if seen else {"and": Int64(WORD_MASK ^ mask)}
+    return {"user_id": user_id, "block": block}, {"$bit": {field: operation}}
+
+async def mark_seen(user_id: str, seq: Optional[int]):
+    """Record that user_id has swiped on the user with sequence seq"""
+    if seq is None:
+        return
+    query, update = seen_update(user_id, seq)
+    await swipe_exclusions_collection.update_one(query, update, upsert=True)
+
+async def unmark_seen(user_id: str, seq: Optional[int]):
+    """Forget a swipe (rewind) so the user shows up in discovery again"""
+    if seq is None:
+        return
+    query, update = seen_update(user_id, seq, seen=False)
+    await swipe_exclusions_collection.update_one(query, update)
+
+async def load_seen_set(user_id: str) -> SeenSet:
+    """Fetch user_id's whole seen-set; at most one small document per BLOCK_BITS users"""
+    blocks = await swipe_exclusions_collection.find({"user_id": user_id}, {"_id": 0}).to_list(length=None)
+    return SeenSet.from_blocks(blocks)
+
+async def iter_unseen_users(user_id: str, query: dict, sort: list, projection: Optional[dict] = None,
+                            seen: Optional[SeenSet] = None) -> AsyncIterator[dict]:
+    """Stream users matching query in sort order, skipping self and anyone already swiped on
+
+    projection must keep user_id and user_seq.
+    """
+    if seen is None:
+        seen = await load_seen_set(user_id)
+
+    async for doc in users_collection.find(query, projection).sort(sort):
+        if doc["user_id"] == user_id:
+            continue
+        seq = doc.get("user_seq")
+        if seq is not None:
+            if seq in seen:
+                continue
+        # Users created before sequence numbers existed: fall back to an indexed probe
+        elif await swipes_collection.find_one({"swiper_id": user_id, "target_id": doc["user_id"]}, {"_id": 1}):
+            continue
+        yield doc
+
+async def drop_swiped_legacy_users(swiper_id: str, users: dict) -> list:
+    """Remove users without a user_seq that swiper_id already swiped on from {user_id: doc}
+
+    Users created before sequence numbers existed aren't covered by the seen-set.
+    Returns the ids that were checked.
+    """
+    legacy_ids = [uid for uid, user in users.items() if user.get("user_seq") is None]
+    if legacy_ids:
+        async for swipe in swipes_collection.find(
+            {"swiper_id": swiper_id, "target_id": {"$in": legacy_ids}}, {"_id": 0, "target_id": 1}
+        ):
+            users.pop(swipe["target_id"], None)
+    return legacy_ids
+
+async def find_unseen_users(user_id: str, query: dict, sort: list, limit: int) -> list:
+    """First `limit` unseen users in sort order, as full documents without _id"""
+    candidate_ids = []
+    candidates = iter_unseen_users(user_id, query, sort, projection={"_id": 0, "user_id": 1, "user_seq": 1})
+    try:
+        async for doc in candidates:
+            candidate_ids.append(doc["user_id"])
+            if len(candidate_ids) >= limit:
+                break
+    finally:
+        await candidates.aclose()
+
+    if not candidate_ids:
+        return []
+    users = {
+        user["user_id"]: user
+        async for user in users_collection.find({"user_id": {"$in": candidate_ids}}, {"_id": 0})
+    }
+    return [users[uid] for uid in candidate_ids if uid in users]
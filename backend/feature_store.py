@@ -0,0 +1,392 @@
+"""In-process store of encoded matching features for every complete profile.
+
+Recommendation scoring reads fixed-width array rows (see
+``matching.CandidateFeatures``) instead of raw user documents. Each row holds
+enum codes for the experience/style/risk/communication fields and 64-bit
+bitmasks for preferred_tokens and looking_for: under 64 bytes of arrays
+per user (``row_nbytes``), against kilobytes for the raw documents.
+
+The store loads lazily on first use. Profile updates handled by this process
+are applied immediately through ``apply_profile``. Updates made by other
+workers are picked up by an incremental sync on ``profile_updated_at`` at
+most every ``FEATURE_STORE_SYNC_SECONDS``.
+
+An inverted index maps each token and goal to a bitmap of the rows listing
+it (a bit per row per vocabulary member, 16 bytes per row at most). With
+``RECOMMENDATION_SHORTLIST`` on, recommendations only score the shortlist
+of users sharing a token or a related goal (the same goal or its
+complementary one), plus ``RECOMMENDATION_SHORTLIST_SAMPLE`` random others.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from database import users_collection
+from exclusions import SeenSet, drop_swiped_legacy_users
+from matching import (
+    MATCHING_FIELDS, AIMatchingService, BatchCompatibilityScorer, CandidateFeatures, ProfileEncoder,
+    UnencodableProfile, top_k_rows
+)
+from scoring_pool import SCORING_OFFLOAD_MIN, ScoringDeadlineExceeded, score_features
+
+FEATURE_STORE_SYNC_SECONDS = int(os.environ.get('FEATURE_STORE_SYNC_SECONDS', 30))
+RECOMMENDATION_SHORTLIST = os.environ.get('RECOMMENDATION_SHORTLIST', 'false').lower() == 'true'
+RECOMMENDATION_SHORTLIST_SAMPLE = int(os.environ.get('RECOMMENDATION_SHORTLIST_SAMPLE', 100))
+# Rows scored between time-budget checks in recommend_within
+ANYTIME_CHUNK_ROWS = int(os.environ.get('ANYTIME_CHUNK_ROWS', 2000))
+INITIAL_CAPACITY = 1024
+# Bitmask width for preferred_tokens / looking_for; profiles beyond it are scored per pair
+MAX_LIST_MEMBERS = 64
+
+FEATURE_PROJECTION = {
+    "_id": 0, "user_id": 1, "user_seq": 1, "profile_complete": 1, "last_activity": 1,
+    **{field: 1 for field in MATCHING_FIELDS}
+}
+
+class RowSnapshot(NamedTuple):
+    """Per-row state of some rows, copied out of the store
+
+    Rows are freed and reused by other users; a snapshot keeps naming the
+    users the rows held when it was taken, across awaits.
+    """
+    rows: np.ndarray
+    user_ids: np.ndarray
+    user_seq: np.ndarray
+    last_activity: np.ndarray
+
+    def take(self, selector) -> "RowSnapshot":
+        return RowSnapshot(*(column[selector] for column in self))
+
+    @classmethod
+    def concatenate(cls, snapshots: list) -> "RowSnapshot":
+        return cls(*(np.concatenate(columns) for columns in zip(*snapshots)))
+
+    def top(self, percentage: np.ndarray, k: int) -> "RowSnapshot":
+        """The k best, best compatibility first (ties by recent activity)"""
+        return self.take(top_k_rows(percentage, k, tiebreak=self.last_activity))
+
+class UserFeatureStore:
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.encoder = ProfileEncoder(max_code=np.iinfo(np.int16).max, max_members=MAX_LIST_MEMBERS)
+        self.features = CandidateFeatures(capacity, MAX_LIST_MEMBERS // 8, MAX_LIST_MEMBERS // 8)
+        self.user_seq = np.full(capacity, -1, dtype=np.int32)
+        # Tie-break for equal scores, as of the last load or update of the row
+        self.last_activity = np.full(capacity, -np.inf, dtype=np.float64)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.user_ids = []
+        self.rows = {}
+        self.free_rows = []
+        # row -> matching fields of profiles the arrays can't represent exactly
+        self.fallback = {}
+        # Inverted index: list field -> packed little-endian row bitmap per member bit position
+        self.postings = {
+            field: np.zeros((MAX_LIST_MEMBERS, CandidateFeatures.bytes_for(capacity)), dtype=np.uint8)
+            for field in ProfileEncoder.LIST_FIELDS
+        }
+        self.loaded = False
+        self.synced_at: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def row_nbytes(self) -> int:
+        """Array bytes per stored user"""
+        return self.features.row_nbytes + self.user_seq.itemsize + self.last_activity.itemsize + self.active.itemsize
+
+    def _grow(self):
+        capacity = self.features.capacity * 2
+        self.features = self.features.resized(capacity)
+        for name, fill in (("user_seq", -1), ("last_activity", -np.inf), ("active", False)):
+            old = getattr(self, name)
+            grown = np.full(capacity, fill, dtype=old.dtype)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+        for field, posting in self.postings.items():
+            grown = np.zeros((MAX_LIST_MEMBERS, CandidateFeatures.bytes_for(capacity)), dtype=np.uint8)
+            grown[:, :posting.shape[1]] = posting
+            self.postings[field] = grown
+
+    def _allocate_row(self, user_id: str) -> int:
+        if self.free_rows:
+            row = self.free_rows.pop()
+            self.user_ids[row] = user_id
+        else:
+            row = len(self.user_ids)
+            if row >= self.features.capacity:
+                self._grow()
+            self.user_ids.append(user_id)
+        self.rows[user_id] = row
+        return row
+
+    def upsert(self, profile: dict):
+        """Store or refresh one profile; incomplete profiles are dropped"""
+        user_id = profile["user_id"]
+        if not profile.get("profile_complete"):
+            self.remove(user_id)
+            return
+
+        row = self.rows.get(user_id)
+        if row is None:
+            row = self._allocate_row(user_id)
+        self._unindex(row)
+        try:
+            encoded = self.encoder.encode(profile, grow=True)
+            self.features.set_row(row, encoded)
+            self.fallback.pop(row, None)
+            self._index(row, encoded)
+        except UnencodableProfile:
+            # Not indexed; shortlists always include fallback rows
+            self.fallback[row] = {field: profile[field] for field in MATCHING_FIELDS if field in profile}
+        seq = profile.get("user_seq")
+        self.user_seq[row] = seq if seq is not None else -1
+        last_activity = profile.get("last_activity")
+        self.last_activity[row] = last_activity.timestamp() if isinstance(last_activity, datetime) else -np.inf
+        self.active[row] = True
+
+    def remove(self, user_id: str):
+        row = self.rows.pop(user_id, None)
+        if row is None:
+            return
+        self.active[row] = False
+        self.fallback.pop(row, None)
+        self._unindex(row)
+        self.user_ids[row] = None
+        self.free_rows.append(row)
+
+    def _index(self, row: int, encoded: dict):
+        for field in ProfileEncoder.LIST_FIELDS:
+            # Bit positions are distinct, so the fancy-indexed |= sets each once
+            self.postings[field][encoded[field], row >> 3] |= np.uint8(1 << (row & 7))
+
+    def _unindex(self, row: int):
+        """Drop row from the postings its token and goal bitsets list, and clear the bitsets"""
+        for field, bitset in (('preferred_tokens', self.features.tokens), ('looking_for', self.features.goals)):
+            positions = np.flatnonzero(np.unpackbits(bitset[row], bitorder="little"))
+            self.postings[field][positions, row >> 3] &= np.uint8(~(1 << (row & 7)) & 0xFF)
+            bitset[row] = 0
+
+    def shortlist(self, user: dict, sample: int = 0) -> np.ndarray:
+        """Sorted active rows sharing a token or a related goal with user, plus `sample` random others
+
+        Related goals are the user's own and their complementary
+        counterparts. Rows scored per pair are always included. Raises
+        UnencodableProfile when user's lists can't be read.
+        """
+        tokens = ProfileEncoder.members('preferred_tokens', user.get('preferred_tokens', [])) or []
+        goals = set(ProfileEncoder.members('looking_for', user.get('looking_for', [])) or [])
+        goals |= {goal2 for goal1, goal2 in AIMatchingService.COMPLEMENTARY_GOALS if goal1 in goals}
+
+        hits = np.zeros(self.postings['preferred_tokens'].shape[1], dtype=np.uint8)
+        for field, values in (('preferred_tokens', set(tokens)), ('looking_for', goals)):
+            positions = self.encoder.bit_positions(field, values, grow=False)
+            if positions:
+                hits |= np.bitwise_or.reduce(self.postings[field][positions], axis=0)
+        rows = np.flatnonzero(np.unpackbits(hits, bitorder="little")[:len(self.user_ids)]).astype(np.int64)
+        rows = np.union1d(rows, np.fromiter(self.fallback, dtype=np.int64, count=len(self.fallback)))
+
+        if sample > 0:
+            others = np.flatnonzero(self.active[:len(self.user_ids)])
+            others = others[~np.isin(others, rows)]
+            if len(others):
+                sampled = np.random.default_rng().choice(others, size=min(sample, len(others)), replace=False)
+                rows = np.union1d(rows, sampled)
+        return rows
+
+    def apply_profile(self, profile: dict):
+        """Hook for profile writes in this process; no-op until the store is loaded"""
+        if self.loaded:
+            self.upsert(profile)
+
+    async def sync(self):
+        """Load on first use, then pull profiles changed elsewhere since the last sync"""
+        now = datetime.utcnow()
+        if self.loaded and now - self.synced_at < timedelta(seconds=FEATURE_STORE_SYNC_SECONDS):
+            return
+        async with self._lock:
+            if self.loaded and now - self.synced_at < timedelta(seconds=FEATURE_STORE_SYNC_SECONDS):
+                return
+            started_at = datetime.utcnow()
+            if not self.loaded:
+                query = {"profile_complete": True}
+            else:
+                # Overlap slightly with the previous sync so no update slips between the two
+                query = {"profile_updated_at": {"$gte": self.synced_at - timedelta(seconds=1)}}
+            async for profile in users_collection.find(query, FEATURE_PROJECTION):
+                self.upsert(profile)
+            self.loaded = True
+            self.synced_at = started_at
+
+    def score(self, user: dict, seen: SeenSet, as_candidate: bool = False,
+              candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(eligible rows, their percentages) for user; excludes self and the seen-set
+
+        Scores every row, or only the sorted rows in candidates (see
+        shortlist). With as_candidate the percentages are each row's score
+        for user (see BatchCompatibilityScorer.score). Raises
+        UnencodableProfile when user's own profile can't be encoded.
+        """
+        if candidates is None:
+            candidates = np.arange(len(self.user_ids))
+            scorer = BatchCompatibilityScorer.from_features(
+                self.encoder, self.features, len(candidates), sorted(self.fallback.items())
+            )
+        else:
+            scorer = BatchCompatibilityScorer.from_features(
+                self.encoder, self.features.take(candidates), len(candidates), self._fallback_positions(candidates)
+            )
+        percentage = scorer.score(user, as_candidate)["compatibility_percentage"]
+        return self._eligible(user, seen, candidates, percentage)
+
+    async def score_async(self, user: dict, seen: SeenSet, as_candidate: bool = False,
+                          candidates: Optional[np.ndarray] = None,
+                          deadline: Optional[float] = None) -> Tuple[RowSnapshot, np.ndarray]:
+        """score(), in the scoring pool once there are SCORING_OFFLOAD_MIN candidates or more
+
+        Returns a snapshot of the eligible rows instead of row numbers:
+        while the pool scores, other requests may remove users and hand
+        their rows to new ones. Eligibility is decided before scoring starts.
+        Raises ScoringDeadlineExceeded past the deadline.
+        """
+        if candidates is None:
+            candidates = np.arange(len(self.user_ids))
+        if len(candidates) < SCORING_OFFLOAD_MIN:
+            rows, percentage = self.score(user, seen, as_candidate, candidates)
+            return self.snapshot(rows), percentage
+        eligible = self._eligible_mask(user, seen, candidates)
+        snapshot = self.snapshot(candidates[eligible])
+        percentage = await score_features(
+            user, self.encoder, self.features.take(candidates), self._fallback_positions(candidates),
+            as_candidate, deadline
+        )
+        return snapshot, percentage[eligible]
+
+    def snapshot(self, rows: np.ndarray) -> RowSnapshot:
+        return RowSnapshot(
+            rows, np.array(self.user_ids, dtype=object)[rows], self.user_seq[rows], self.last_activity[rows]
+        )
+
+    def _fallback_positions(self, candidates: np.ndarray) -> list:
+        """[(position in candidates, profile)] for the fallback rows among the sorted candidates"""
+        rows = sorted(self.fallback)
+        positions = np.searchsorted(candidates, rows)
+        return [
+            (int(position), self.fallback[row]) for position, row in zip(positions, rows)
+            if position < len(candidates) and candidates[position] == row
+        ]
+
+    def _eligible_mask(self, user: dict, seen: SeenSet, candidates: np.ndarray) -> np.ndarray:
+        """Active candidates other than user, not in the seen-set"""
+        eligible = self.active[candidates]
+        eligible &= candidates != self.rows.get(user["user_id"], -1)
+        seen_bits = np.unpackbits(np.frombuffer(bytes(seen.bits), dtype=np.uint8), bitorder="little")
+        seqs = self.user_seq[candidates]
+        has_seq = (seqs >= 0) & (seqs < len(seen_bits))
+        eligible[has_seq] &= seen_bits[seqs[has_seq]] == 0
+        return eligible
+
+    def _eligible(self, user: dict, seen: SeenSet, candidates: np.ndarray,
+                  percentage: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        eligible = self._eligible_mask(user, seen, candidates)
+        return candidates[eligible], percentage[eligible]
+
+    def top_rows(self, rows: np.ndarray, percentage: np.ndarray, k: int) -> np.ndarray:
+        """The k best of rows, best compatibility first (ties by recent activity)"""
+        return rows[top_k_rows(percentage, k, tiebreak=self.last_activity[rows])]
+
+    def rank(self, user: dict, seen: SeenSet, k: int) -> np.ndarray:
+        """Rows of the k best eligible candidates for user"""
+        return self.top_rows(*self.score(user, seen), k)
+
+    async def recommend(self, user: dict, seen: SeenSet, limit: int,
+                        shortlist: bool = RECOMMENDATION_SHORTLIST, deadline: Optional[float] = None) -> list:
+        """Current documents of the `limit` best candidates that still qualify
+
+        Only the top rows are ordered and fetched. When some of them turn
+        out deleted, incomplete or swiped (legacy users without a seq),
+        the selection widens geometrically. With shortlist, only the
+        shortlist is scored, and every row is scored only if it runs dry.
+        Large candidate sets are scored in the scoring pool; raises
+        ScoringDeadlineExceeded past the deadline.
+        """
+        if shortlist:
+            candidates = self.shortlist(user, RECOMMENDATION_SHORTLIST_SAMPLE)
+            results = await self._recommend(user, seen, limit, candidates, deadline)
+            if len(results) >= limit:
+                return results
+        return await self._recommend(user, seen, limit, None, deadline)
+
+    async def recommend_within(self, user: dict, seen: SeenSet, limit: int, budget: float,
+                               deadline: Optional[float] = None) -> Tuple[list, int, int]:
+        """Anytime recommend(): the best `limit` found within budget seconds of scoring
+
+        Eligible candidates are scored in chunks of ANYTIME_CHUNK_ROWS, most
+        recently active first, yielding to the event loop in between. The
+        first chunk is always scored, but if it goes to the scoring pool, it
+        can still hit the deadline. A later chunk that hits the deadline
+        ends the scoring like the budget does. Returns (documents,
+        candidates evaluated, eligible candidates).
+        """
+        started = time.monotonic()
+        candidates = np.arange(len(self.user_ids))
+        eligible = candidates[self._eligible_mask(user, seen, candidates)]
+        by_activity = eligible[np.argsort(-self.last_activity[eligible], kind="stable")]
+
+        scored, scored_percentage = [], []
+        evaluated = 0
+        while evaluated < len(by_activity):
+            if evaluated and time.monotonic() - started >= budget:
+                break
+            chunk = np.sort(by_activity[evaluated:evaluated + ANYTIME_CHUNK_ROWS])
+            try:
+                snapshot, percentage = await self.score_async(user, seen, candidates=chunk, deadline=deadline)
+            except ScoringDeadlineExceeded:
+                if not evaluated:
+                    raise
+                break
+            scored.append(snapshot)
+            scored_percentage.append(percentage)
+            evaluated += len(chunk)
+            await asyncio.sleep(0)
+
+        if not scored:
+            return [], 0, 0
+        results = await self._fetch_top(user, RowSnapshot.concatenate(scored), np.concatenate(scored_percentage), limit)
+        return results, evaluated, len(by_activity)
+
+    async def _recommend(self, user: dict, seen: SeenSet, limit: int, candidates: Optional[np.ndarray],
+                         deadline: Optional[float]) -> list:
+        scored, percentage = await self.score_async(user, seen, candidates=candidates, deadline=deadline)
+        return await self._fetch_top(user, scored, percentage, limit)
+
+    async def _fetch_top(self, user: dict, scored: RowSnapshot, percentage: np.ndarray, limit: int) -> list:
+        results = []
+        consumed = 0
+        k = limit
+        while len(results) < limit and consumed < len(scored.rows):
+            # Any top-k is a prefix of a larger top-k, so only the new tail needs fetching
+            chunk_ids = list(scored.top(percentage, k).user_ids[consumed:])
+            consumed = k
+            k *= 2
+            users = {
+                candidate["user_id"]: candidate
+                async for candidate in users_collection.find(
+                    {"user_id": {"$in": chunk_ids}, "profile_complete": True}, {"_id": 0}
+                )
+            }
+            legacy_ids = await drop_swiped_legacy_users(user["user_id"], users)
+
+            for uid in chunk_ids:
+                if uid in users:
+                    results.append(users[uid])
+                elif uid not in legacy_ids:
+                    # Deleted or no longer complete since this process last synced
+                    self.remove(uid)
+        return results[:limit]
+
+feature_store = UserFeatureStore()
@@ -0,0 +1,239 @@
+"""Declarative index registry for every Solm8 collection.
+
+Indexes are applied idempotently at startup (see ``server.startup_db_check``)
+or by hand:
+
+    python indexes.py apply    # create any missing indexes
+    python indexes.py report   # explain() every registered query, flag COLLSCAN
+"""
+import asyncio
+import sys
+from typing import List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from database import db
+
+# collection name -> indexes matching the query shapes used in server.py
+INDEX_REGISTRY = {
+    "users": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email"),
+        IndexModel([("username", ASCENDING)], name="username"),
+        IndexModel([("wallet_address", ASCENDING)], name="wallet_address"),
+        IndexModel([("twitter_id", ASCENDING)], name="twitter_id"),
+        IndexModel([("user_status", ASCENDING), ("last_activity", DESCENDING), ("user_id", DESCENDING)], name="status_activity"),
+        # Discovery / recommendations: complete profiles sorted by recency
+        IndexModel([("profile_complete", ASCENDING), ("created_at", DESCENDING)], name="complete_created"),
+        IndexModel([("profile_complete", ASCENDING), ("last_activity", DESCENDING)], name="complete_activity"),
+        IndexModel([("interested_in_token_launch", ASCENDING), ("profile_complete", ASCENDING), ("user_id", ASCENDING)], name="token_launchers_user"),
+        IndexModel([("profile_updated_at", ASCENDING)], name="profile_updated_at"),
+        IndexModel([("user_seq", ASCENDING)], name="user_seq_unique", unique=True,
+                   partialFilterExpression={"user_seq": {"$exists": True}}),
+    ],
+    "matches": [
+        IndexModel([("match_id", ASCENDING)], name="match_id_unique", unique=True),
+        # One match per pair of users (python migrations.py match_pair_keys)
+        IndexModel([("pair_key", ASCENDING)], name="pair_key_unique", unique=True,
+                   partialFilterExpression={"pair_key": {"$exists": True}}),
+        # Each $or branch of the "my matches" query gets its own index
+        IndexModel([("user1_id", ASCENDING), ("last_message_at", DESCENDING), ("match_id", DESCENDING)], name="user1_last_message_match"),
+        IndexModel([("user2_id", ASCENDING), ("last_message_at", DESCENDING), ("match_id", DESCENDING)], name="user2_last_message_match"),
+        IndexModel([("user1_id", ASCENDING), ("created_at", DESCENDING)], name="user1_created"),
+        IndexModel([("user2_id", ASCENDING), ("created_at", DESCENDING)], name="user2_created"),
+    ],
+    "messages": [
+        # Keyset pagination over (timestamp, message_id); also serves latest-message lookups
+        IndexModel([("match_id", ASCENDING), ("timestamp", DESCENDING), ("message_id", DESCENDING)], name="match_timestamp_message"),
+        IndexModel([("match_id", ASCENDING), ("sender_id", ASCENDING), ("timestamp", ASCENDING)], name="match_sender_timestamp"),
+        IndexModel([("sender_id", ASCENDING)], name="sender_id"),
+    ],
+    "swipes": [
+        # One swipe per pair; replaces the non-unique swiper_target (python migrations.py unique_swipes)
+        IndexModel([("swiper_id", ASCENDING), ("target_id", ASCENDING)], name="swiper_target_unique", unique=True),
+        # Rewind: a user's latest swipe
+        IndexModel([("swiper_id", ASCENDING), ("swiped_at", DESCENDING)], name="swiper_swiped_at"),
+        # "See Who Liked You": likes a user received, newest first, and their count
+        IndexModel([("target_id", ASCENDING), ("action", ASCENDING), ("swiped_at", DESCENDING), ("_id", DESCENDING)],
+                   name="target_action_swiped_at"),
+        IndexModel([("swiper_id", ASCENDING), ("action", ASCENDING)], name="swiper_action"),
+        IndexModel([("swipe_id", ASCENDING)], name="swipe_id"),
+    ],
+    "read_status": [
+        IndexModel([("user_id", ASCENDING), ("match_id", ASCENDING)], name="user_match_unique", unique=True),
+    ],
+    "swipe_exclusions": [
+        IndexModel([("user_id", ASCENDING), ("block", ASCENDING)], name="user_block_unique", unique=True),
+    ],
+    "discovery_queues": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "recommendations": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+        # Lists a user appears in, for incremental rescoring and account deletion
+        IndexModel([("recommendations.user_id", ASCENDING)], name="recommended_user_id"),
+    ],
+    "recommendation_jobs": [
+        IndexModel([("status", ASCENDING), ("started_at", DESCENDING)], name="status_started"),
+    ],
+    "swipe_quotas": [
+        # Daily buckets are looked up by _id; old days expire
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    "subscriptions": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    "profile_images": [
+        IndexModel([("image_id", ASCENDING)], name="image_id"),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    "trading_highlights": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("highlight_id", ASCENDING)], name="highlight_id"),
+    ],
+    "social_links": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    "token_launch_profiles": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    "referrals": [
+        IndexModel([("referral_code", ASCENDING), ("status", ASCENDING)], name="code_status"),
+        IndexModel([("referrer_user_id", ASCENDING), ("status", ASCENDING)], name="referrer_status"),
+        IndexModel([("referral_id", ASCENDING)], name="referral_id"),
+    ],
+    "portfolio_connections": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    "trading_signals": [
+        IndexModel([("sender_id", ASCENDING), ("created_at", DESCENDING), ("signal_id", DESCENDING)], name="sender_created_signal"),
+        IndexModel([("recipient_ids", ASCENDING), ("created_at", DESCENDING), ("signal_id", DESCENDING)], name="recipient_created_signal"),
+        IndexModel([("signal_id", ASCENDING)], name="signal_id"),
+    ],
+    "trading_groups": [
+        IndexModel([("group_id", ASCENDING)], name="group_id"),
+        IndexModel([("member_ids", ASCENDING)], name="member_ids"),
+        IndexModel([("creator_id", ASCENDING)], name="creator_id"),
+    ],
+    "trading_calendar": [
+        IndexModel([("creator_id", ASCENDING), ("start_time", ASCENDING), ("event_id", ASCENDING)], name="creator_start_event"),
+        IndexModel([("attendee_ids", ASCENDING), ("start_time", ASCENDING), ("event_id", ASCENDING)], name="attendee_start_event"),
+    ],
+    "analytics": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+}
+
+# Representative hot-path query shapes, checked by the report mode
+PROBE = "__index_probe__"
+QUERY_REGISTRY = [
+    {"collection": "users", "filter": {"user_id": PROBE}},
+    {"collection": "users", "filter": {"email": PROBE}},
+    {"collection": "users", "filter": {"username": PROBE}},
+    {"collection": "users", "filter": {"wallet_address": PROBE}},
+    {"collection": "users", "filter": {"twitter_id": PROBE}},
+    {"collection": "users", "filter": {"user_status": "active", "last_activity": {"$gte": 0}}, "sort": [("last_activity", DESCENDING), ("user_id", DESCENDING)]},
+    {"collection": "users", "filter": {"profile_complete": True}, "sort": [("created_at", DESCENDING)]},
+    {"collection": "users", "filter": {"profile_complete": True}, "sort": [("last_activity", DESCENDING)]},
+    {"collection": "users", "filter": {"interested_in_token_launch": True, "profile_complete": True}},
+    {"collection": "users", "filter": {"profile_updated_at": {"$gte": 0}}},
+    {"collection": "matches", "filter": {"match_id": PROBE}},
+    {"collection": "matches", "filter": {"pair_key": PROBE}},
+    {"collection": "matches", "filter": {"$or": [{"user1_id": PROBE}, {"user2_id": PROBE}]}, "sort": [("last_message_at", DESCENDING)]},
+    {"collection": "matches", "filter": {"$or": [{"user1_id": PROBE}, {"user2_id": PROBE}]}, "sort": [("created_at", DESCENDING)]},
+    {"collection": "messages", "filter": {"match_id": PROBE}, "sort": [("timestamp", DESCENDING)]},
+    {"collection": "messages", "filter": {"match_id": PROBE, "$or": [{"timestamp": {"$lt": 0}}, {"timestamp": 0, "message_id": {"$lt": PROBE}}]}, "sort": [("timestamp", DESCENDING), ("message_id", DESCENDING)]},
+    {"collection": "messages", "filter": {"match_id": PROBE, "sender_id": PROBE, "timestamp": {"$gt": 0}}},
+    {"collection": "swipes", "filter": {"swiper_id": PROBE}},
+    {"collection": "swipes", "filter": {"swiper_id": PROBE, "target_id": PROBE, "action": "like"}},
+    {"collection": "swipes", "filter": {"swiper_id": PROBE, "swiped_at": {"$gte": 0}}},
+    {"collection": "swipes", "filter": {"swiper_id": PROBE, "action": "like"}},
+    {"collection": "swipes", "filter": {"swiper_id": PROBE}, "sort": [("swiped_at", DESCENDING)]},
+    {"collection": "swipes", "filter": {"target_id": PROBE, "action": "like"}, "sort": [("swiped_at", DESCENDING), ("_id", DESCENDING)]},
+    {"collection": "swipes", "filter": {"$or": [{"swiper_id": PROBE}, {"target_id": PROBE}]}},
+    {"collection": "read_status", "filter": {"user_id": PROBE, "match_id": PROBE}},
+    {"collection": "swipe_exclusions", "filter": {"user_id": PROBE}},
+    {"collection": "discovery_queues", "filter": {"user_id": PROBE}},
+    {"collection": "recommendations", "filter": {"user_id": PROBE}},
+    {"collection": "recommendations", "filter": {"recommendations.user_id": PROBE}},
+    {"collection": "swipe_quotas", "filter": {"_id": PROBE}},
+    {"collection": "subscriptions", "filter": {"user_id": PROBE}},
+    {"collection": "profile_images", "filter": {"image_id": PROBE}},
+    {"collection": "trading_highlights", "filter": {"user_id": PROBE}},
+    {"collection": "social_links", "filter": {"user_id": PROBE}},
+    {"collection": "token_launch_profiles", "filter": {"user_id": PROBE}},
+    {"collection": "referrals", "filter": {"referral_code": PROBE, "status": "pending"}},
+    {"collection": "referrals", "filter": {"referrer_user_id": PROBE, "status": "completed"}},
+    {"collection": "portfolio_connections", "filter": {"user_id": PROBE}},
+    {"collection": "trading_signals", "filter": {"sender_id": PROBE}, "sort": [("created_at", DESCENDING)]},
+    {"collection": "trading_signals", "filter": {"recipient_ids": PROBE}, "sort": [("created_at", DESCENDING)]},
+    {"collection": "trading_groups", "filter": {"group_id": PROBE}},
+    {"collection": "trading_groups", "filter": {"member_ids": PROBE}},
+    {"collection": "trading_calendar", "filter": {"$or": [{"creator_id": PROBE}, {"attendee_ids": PROBE}]}, "sort": [("start_time", ASCENDING)]},
+    {"collection": "analytics", "filter": {"user_id": PROBE}},
+]
+
+async def ensure_indexes(database=db) -> dict:
+    """Create every registered index; safe to run repeatedly"""
+    results = {}
+    for collection_name, indexes in INDEX_REGISTRY.items():
+        try:
+            results[collection_name] = await database[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            # A conflicting or duplicate-key index must not stop the app from starting
+            print(f"⚠️ Index creation failed on {collection_name}: {e}")
+            results[collection_name] = {"error": str(e)}
+    return results
+
+def _plan_stages(plan: dict) -> List[str]:
+    """Flatten the stage names of a query plan tree"""
+    stages = [plan.get("stage", "")]
+    if "inputStage" in plan:
+        stages.extend(_plan_stages(plan["inputStage"]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+async def explain_registered_queries(database=db) -> List[dict]:
+    """Run explain() on every registered query and flag COLLSCAN plans"""
+    report = []
+    for query in QUERY_REGISTRY:
+        cursor = database[query["collection"]].find(query["filter"])
+        if query.get("sort"):
+            cursor = cursor.sort(query["sort"])
+        explanation = await cursor.explain()
+        winning_plan = explanation.get("queryPlanner", {}).get("winningPlan", {})
+        # Newer servers nest the classic plan under queryPlan
+        stages = _plan_stages(winning_plan.get("queryPlan", winning_plan))
+        report.append({
+            "collection": query["collection"],
+            "filter": query["filter"],
+            "sort": query.get("sort"),
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages
+        })
+    return report
+
+async def _main(command: str) -> int:
+    if command == "apply":
+        results = await ensure_indexes()
+        for collection_name, created in results.items():
+            print(f"{collection_name}: {created}")
+        return 0
+
+    if command == "report":
+        await ensure_indexes()
+        report = await explain_registered_queries()
+        collscans = [entry for entry in report if entry["collscan"]]
+        for entry in report:
+            marker = "❌ COLLSCAN" if entry["collscan"] else "✅"
+            print(f"{marker} {entry['collection']} {entry['filter']} sort={entry['sort']} -> {' > '.join(entry['stages'])}")
+        print(f"\n{len(report)} queries checked, {len(collscans)} collection scans")
+        return 1 if collscans else 0
+
+    print("Usage: python indexes.py [apply|report]")
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "apply")))
@@ -0,0 +1,92 @@
+"""Request-scoped batch loaders.
+
+Endpoints that enrich a list of rows with user data create one loader per
+request and ask it for each row's user. Keys requested in the same event-loop
+tick are fetched together with a single ``$in`` query instead of one
+``find_one`` per row.
+"""
+import asyncio
+from typing import Dict, Iterable, List, Optional
+
+from database import users_collection, token_launch_profiles_collection
+
+# Public card shown next to matches, likes, signals, groups and referrals
+USER_CARD_PROJECTION = {
+    "_id": 0,
+    "user_id": 1,
+    "username": 1,
+    "display_name": 1,
+    "avatar_url": 1,
+    "bio": 1,
+    "trading_experience": 1,
+    "preferred_tokens": 1,
+    "profile_complete": 1
+}
+
+# Full profile minus secrets, for screens that show the whole other user
+USER_PROFILE_PROJECTION = {"_id": 0, "password_hash": 0}
+
+# Batches being fetched; the event loop only keeps weak references to tasks
+_dispatch_tasks = set()
+
+class BatchLoader:
+    """DataLoader-style loader: collects keys, then fetches them in one query"""
+
+    def __init__(self, collection, key_field: str, projection: Optional[dict] = None, max_batch_size: int = 1000):
+        self.collection = collection
+        self.key_field = key_field
+        self.projection = projection
+        self.max_batch_size = max_batch_size
+        self._cache: Dict[str, asyncio.Future] = {}
+        self._queue: List[str] = []
+
+    def load(self, key: str) -> asyncio.Future:
+        """Return a future resolving to the document for key (or None)"""
+        if key in self._cache:
+            return self._cache[key]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._cache[key] = future
+        self._queue.append(key)
+
+        # First key of this tick schedules the batch; later keys just join it
+        if len(self._queue) == 1:
+            loop.call_soon(self._start_dispatch)
+        return future
+
+    async def load_many(self, keys: Iterable[str]) -> List[Optional[dict]]:
+        """Load several keys at once, preserving order"""
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _start_dispatch(self):
+        task = asyncio.ensure_future(self._dispatch())
+        _dispatch_tasks.add(task)
+        task.add_done_callback(_dispatch_tasks.discard)
+
+    async def _dispatch(self):
+        keys, self._queue = self._queue, []
+        for start in range(0, len(keys), self.max_batch_size):
+            batch = keys[start:start + self.max_batch_size]
+            try:
+                cursor = self.collection.find({self.key_field: {"$in": batch}}, self.projection)
+                docs = {doc[self.key_field]: doc async for doc in cursor}
+            except Exception as e:
+                for key in batch:
+                    self._cache[key].set_exception(e)
+                continue
+
+            for key in batch:
+                self._cache[key].set_result(docs.get(key))
+
+def user_card_loader() -> BatchLoader:
+    """Loader for the compact public user card"""
+    return BatchLoader(users_collection, "user_id", USER_CARD_PROJECTION)
+
+def user_profile_loader() -> BatchLoader:
+    """Loader for full user profiles without sensitive fields"""
+    return BatchLoader(users_collection, "user_id", USER_PROFILE_PROJECTION)
+
+def token_launch_profile_loader() -> BatchLoader:
+    """Loader for detailed token launch profiles"""
+    return BatchLoader(token_launch_profiles_collection, "user_id", {"_id": 0})
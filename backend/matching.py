@@ -0,0 +1,769 @@
+"""Compatibility scoring for AI recommendations.
+
+``AIMatchingService`` scores one pair of profiles and explains the result.
+``BatchCompatibilityScorer`` computes the same scores for one user against
+many candidates at once with numpy. Use it to rank candidates, then call
+the per-pair scorer only for the matches that are actually returned.
+"""
+from typing import List, Optional
+
+import numpy as np
+
+class AIMatchingService:
+    EXPERIENCE_LEVELS = {'Beginner': 1, 'Intermediate': 2, 'Advanced': 3, 'Expert': 4}
+    
+    # Complementary goal pairs that work well together
+    COMPLEMENTARY_GOALS = [
+        ('Learning', 'Teaching'),
+        ('Teaching', 'Learning'),
+        ('Alpha Sharing', 'Alpha Sharing'),
+        ('Research Partner', 'Research Partner'),
+        ('Risk Management', 'Teaching'),
+        ('Networking', 'Networking')
+    ]
+    
+    COMPATIBLE_STYLES = {
+        'Day Trader': ['Day Trader', 'Scalper'],
+        'Swing Trader': ['Swing Trader', 'Long-term Investor'],
+        'HODLer': ['HODLer', 'Long-term Investor'],
+        'Scalper': ['Scalper', 'Day Trader'],
+        'Long-term Investor': ['Long-term Investor', 'HODLer', 'Swing Trader'],
+        'Arbitrage': ['Arbitrage', 'Day Trader', 'Scalper']
+    }
+    
+    RISK_LEVELS = {'Conservative': 1, 'Moderate': 2, 'Aggressive': 3, 'YOLO': 4}
+    
+    COMPATIBLE_COMMUNICATION_STYLES = [
+        ('Professional', 'Technical'),
+        ('Technical', 'Professional'),
+        ('Casual', 'Friendly'),
+        ('Friendly', 'Casual')
+    ]
+    
+    @staticmethod
+    def calculate_compatibility_score(user1: dict, user2: dict) -> dict:
+        """Calculate AI compatibility score between two users"""
+        score_breakdown = {}
+        total_score = 0
+        max_possible_score = 0
+        
+        # 1. Experience Level Compatibility (Weight: 20)
+        experience_score = AIMatchingService._calculate_experience_compatibility(
+            user1.get('trading_experience', ''), 
+            user2.get('trading_experience', ''),
+            user1.get('years_trading', 0),
+            user2.get('years_trading', 0)
+        )
+        score_breakdown['experience'] = experience_score
+        total_score += experience_score['score']
+        max_possible_score += experience_score['max_score']
+        
+        # 2. Platform Compatibility (Weight: 25)
+        platform_score = AIMatchingService._calculate_platform_compatibility(
+            user1.get('preferred_trading_platform', ''),
+            user2.get('preferred_trading_platform', ''),
+            user1.get('preferred_communication_platform', ''),
+            user2.get('preferred_communication_platform', '')
+        )
+        score_breakdown['platform'] = platform_score
+        total_score += platform_score['score']
+        max_possible_score += platform_score['max_score']
+        
+        # 3. Token Interest Overlap (Weight: 20)
+        token_score = AIMatchingService._calculate_token_compatibility(
+            user1.get('preferred_tokens', []),
+            user2.get('preferred_tokens', [])
+        )
+        score_breakdown['tokens'] = token_score
+        total_score += token_score['score']
+        max_possible_score += token_score['max_score']
+        
+        # 4. Goal Alignment (Weight: 15)
+        goal_score = AIMatchingService._calculate_goal_compatibility(
+            user1.get('looking_for', []),
+            user2.get('looking_for', [])
+        )
+        score_breakdown['goals'] = goal_score
+        total_score += goal_score['score']
+        max_possible_score += goal_score['max_score']
+        
+        # 5. Trading Style & Risk Compatibility (Weight: 10)
+        style_score = AIMatchingService._calculate_style_compatibility(
+            user1.get('trading_style', ''),
+            user2.get('trading_style', ''),
+            user1.get('risk_tolerance', ''),
+            user2.get('risk_tolerance', '')
+        )
+        score_breakdown['style'] = style_score
+        total_score += style_score['score']
+        max_possible_score += style_score['max_score']
+        
+        # 6. Communication & Schedule Compatibility (Weight: 10)
+        communication_score = AIMatchingService._calculate_communication_compatibility(
+            user1.get('communication_style', ''),
+            user2.get('communication_style', ''),
+            user1.get('trading_hours', ''),
+            user2.get('trading_hours', '')
+        )
+        score_breakdown['communication'] = communication_score
+        total_score += communication_score['score']
+        max_possible_score += communication_score['max_score']
+        
+        # Calculate final percentage
+        compatibility_percentage = int((total_score / max_possible_score) * 100) if max_possible_score > 0 else 0
+        
+        return {
+            'compatibility_percentage': compatibility_percentage,
+            'total_score': total_score,
+            'max_possible_score': max_possible_score,
+            'breakdown': score_breakdown,
+            'recommendations': AIMatchingService._generate_recommendations(score_breakdown, user1, user2)
+        }
+    
+    @staticmethod
+    def _calculate_experience_compatibility(exp1: str, exp2: str, years1: int, years2: int) -> dict:
+        """Calculate experience level compatibility"""
+        level1 = AIMatchingService.EXPERIENCE_LEVELS.get(exp1, 0)
+        level2 = AIMatchingService.EXPERIENCE_LEVELS.get(exp2, 0)
+        
+        if level1 == 0 or level2 == 0:
+            return {'score': 0, 'max_score': 20, 'reason': 'Missing experience information'}
+        
+        diff = abs(level1 - level2)
+        
+        # Perfect for mentoring: beginner with intermediate+
+        if (level1 == 1 and level2 >= 2) or (level2 == 1 and level1 >= 2):
+            score = 18
+            reason = "Perfect for mentoring relationship"
+        # Same level - great for peer learning
+        elif diff == 0:
+            score = 20
+            reason = "Same experience level - ideal for peer collaboration"
+        # One level apart - good compatibility
+        elif diff == 1:
+            score = 15
+            reason = "Similar experience levels - good match"
+        # Two levels apart - some compatibility
+        elif diff == 2:
+            score = 10
+            reason = "Different experience levels - moderate match"
+        else:
+            score = 5
+            reason = "Very different experience levels"
+        
+        # Bonus for similar years of experience
+        year_diff = abs(years1 - years2)
+        if year_diff <= 1:
+            score = min(score + 2, 20)
+        
+        return {'score': score, 'max_score': 20, 'reason': reason}
+    
+    @staticmethod
+    def _calculate_platform_compatibility(trading_platform1: str, trading_platform2: str, 
+                                        comm_platform1: str, comm_platform2: str) -> dict:
+        """Calculate platform compatibility"""
+        score = 0
+        reasons = []
+        
+        # Trading platform compatibility (15 points)
+        if trading_platform1 and trading_platform2:
+            if trading_platform1 == trading_platform2:
+                score += 15
+                reasons.append(f"Both use {trading_platform1} for trading")
+            else:
+                score += 5
+                reasons.append("Different trading platforms")
+        else:
+            score += 3
+            reasons.append("Missing trading platform info")
+        
+        # Communication platform compatibility (10 points)
+        if comm_platform1 and comm_platform2:
+            if comm_platform1 == comm_platform2:
+                score += 10
+                reasons.append(f"Both prefer {comm_platform1} for communication")
+            else:
+                score += 3
+                reasons.append("Different communication preferences")
+        else:
+            score += 2
+            reasons.append("Missing communication platform info")
+        
+        return {'score': score, 'max_score': 25, 'reason': '; '.join(reasons)}
+    
+    @staticmethod
+    def _calculate_token_compatibility(tokens1: List[str], tokens2: List[str]) -> dict:
+        """Calculate token interest overlap"""
+        if not tokens1 or not tokens2:
+            return {'score': 5, 'max_score': 20, 'reason': 'Missing token preferences'}
+        
+        overlap = set(tokens1) & set(tokens2)
+        total_unique = set(tokens1) | set(tokens2)
+        
+        if not total_unique:
+            return {'score': 0, 'max_score': 20, 'reason': 'No token preferences specified'}
+        
+        overlap_ratio = len(overlap) / len(total_unique)
+        score = int(20 * overlap_ratio)
+        
+        if len(overlap) >= 3:
+            reason = f"Strong overlap in {len(overlap)} token categories"
+        elif len(overlap) >= 2:
+            reason = f"Good overlap in {len(overlap)} token categories"
+        elif len(overlap) == 1:
+            reason = f"Some overlap in token interests"
+        else:
+            reason = "Different token interests - good for diversification"
+            score = max(score, 5)  # Minimum score for diversity
+        
+        return {'score': score, 'max_score': 20, 'reason': reason}
+    
+    @staticmethod
+    def _calculate_goal_compatibility(goals1: List[str], goals2: List[str]) -> dict:
+        """Calculate goal alignment - complementary goals score higher"""
+        if not goals1 or not goals2:
+            return {'score': 3, 'max_score': 15, 'reason': 'Missing goal information'}
+        
+        score = 0
+        reasons = []
+        
+        # Check for perfect complementary matches
+        for goal1 in goals1:
+            for goal2 in goals2:
+                if (goal1, goal2) in AIMatchingService.COMPLEMENTARY_GOALS:
+                    score += 8
+                    if goal1 == goal2:
+                        reasons.append(f"Both interested in {goal1}")
+                    else:
+                        reasons.append(f"Perfect match: {goal1} ↔ {goal2}")
+        
+        # Check for any overlap
+        overlap = set(goals1) & set(goals2)
+        if overlap and not reasons:
+            score += len(overlap) * 3
+            reasons.append(f"Shared interests: {', '.join(overlap)}")
+        
+        # Minimum score for having goals
+        if not reasons:
+            score = 2
+            reasons.append("Different goals - potential for diverse perspectives")
+        
+        score = min(score, 15)  # Cap at max score
+        return {'score': score, 'max_score': 15, 'reason': '; '.join(reasons)}
+    
+    @staticmethod
+    def _calculate_style_compatibility(style1: str, style2: str, risk1: str, risk2: str) -> dict:
+        """Calculate trading style and risk compatibility"""
+        score = 0
+        reasons = []
+        
+        # Trading style compatibility (6 points)
+        if style1 and style2:
+            if style1 == style2:
+                score += 6
+                reasons.append(f"Same trading style: {style1}")
+            elif style2 in AIMatchingService.COMPATIBLE_STYLES.get(style1, []):
+                score += 4
+                reasons.append(f"Compatible trading styles")
+            else:
+                score += 2
+                reasons.append("Different trading styles")
+        
+        # Risk tolerance compatibility (4 points)
+        if risk1 and risk2:
+            level1 = AIMatchingService.RISK_LEVELS.get(risk1, 0)
+            level2 = AIMatchingService.RISK_LEVELS.get(risk2, 0)
+            
+            if level1 and level2:
+                diff = abs(level1 - level2)
+                if diff == 0:
+                    score += 4
+                    reasons.append(f"Same risk tolerance: {risk1}")
+                elif diff == 1:
+                    score += 3
+                    reasons.append("Similar risk tolerance")
+                else:
+                    score += 1
+                    reasons.append("Different risk tolerance")
+        
+        return {'score': score, 'max_score': 10, 'reason': '; '.join(reasons)}
+    
+    @staticmethod
+    def _calculate_communication_compatibility(comm_style1: str, comm_style2: str, 
+                                             hours1: str, hours2: str) -> dict:
+        """Calculate communication and schedule compatibility"""
+        score = 0
+        reasons = []
+        
+        # Communication style (6 points)
+        if comm_style1 and comm_style2:
+            if comm_style1 == comm_style2:
+                score += 6
+                reasons.append(f"Same communication style: {comm_style1}")
+            else:
+                if (comm_style1, comm_style2) in AIMatchingService.COMPATIBLE_COMMUNICATION_STYLES:
+                    score += 4
+                    reasons.append("Compatible communication styles")
+                else:
+                    score += 2
+                    reasons.append("Different communication styles")
+        
+        # Trading hours compatibility (4 points)
+        if hours1 and hours2:
+            if hours1 == hours2:
+                score += 4
+                reasons.append(f"Same trading hours: {hours1}")
+            elif hours1 == '24/7' or hours2 == '24/7':
+                score += 3
+                reasons.append("Flexible trading hours")
+            else:
+                # Check for overlapping time periods
+                overlap_score = 2
+                score += overlap_score
+                reasons.append("Different trading hours")
+        
+        return {'score': score, 'max_score': 10, 'reason': '; '.join(reasons)}
+    
+    @staticmethod
+    def _generate_recommendations(breakdown: dict, user1: dict, user2: dict) -> List[str]:
+        """Generate AI recommendations based on compatibility analysis"""
+        recommendations = []
+        
+        # Experience-based recommendations
+        exp_score = breakdown.get('experience', {}).get('score', 0)
+        if exp_score >= 18:
+            recommendations.append("🎯 Perfect for mentoring or peer collaboration")
+        elif exp_score >= 15:
+            recommendations.append("📈 Great match for skill development")
+        
+        # Platform-based recommendations
+        platform_score = breakdown.get('platform', {}).get('score', 0)
+        if platform_score >= 20:
+            recommendations.append("🔗 Same platforms - easy to share strategies")
+        elif platform_score >= 15:
+            recommendations.append("⚡ Compatible trading setup")
+        
+        # Token-based recommendations
+        token_score = breakdown.get('tokens', {}).get('score', 0)
+        if token_score >= 15:
+            recommendations.append("💎 Strong shared interest in token categories")
+        elif token_score <= 5:
+            recommendations.append("🌐 Different interests - great for diversification")
+        
+        # Goal-based recommendations
+        goal_score = breakdown.get('goals', {}).get('score', 0)
+        if goal_score >= 12:
+            recommendations.append("🤝 Perfectly aligned trading goals")
+        elif goal_score >= 8:
+            recommendations.append("📚 Complementary learning objectives")
+        
+        if not recommendations:
+            recommendations.append("🔍 Potential for unique trading perspectives")
+        
+        return recommendations[:3]  # Limit to top 3 recommendations
+
+COMPONENTS = ('experience', 'platform', 'tokens', 'goals', 'style', 'communication')
+
+# Profile fields read by calculate_compatibility_score
+MATCHING_FIELDS = (
+    'trading_experience', 'years_trading', 'preferred_trading_platform', 'preferred_communication_platform',
+    'preferred_tokens', 'looking_for', 'trading_style', 'risk_tolerance', 'communication_style', 'trading_hours'
+)
+
+# Bits set in each byte value, for popcounts over packed bitsets
+POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+class UnencodableProfile(Exception):
+    """A profile value the array encoding can't represent with identical semantics"""
+
+class ProfileEncoder:
+    """Vocabularies turning matching fields into integer codes and bit positions
+
+    Enum fields get a per-field code (0 for falsy values). preferred_tokens
+    and looking_for become sets of bit positions. Anything the arrays can't
+    mirror exactly raises UnencodableProfile; that includes vocabularies that have
+    outgrown max_code or max_members.
+    """
+
+    ENUM_FIELDS = (
+        'preferred_trading_platform', 'preferred_communication_platform',
+        'trading_style', 'communication_style', 'trading_hours'
+    )
+    LIST_FIELDS = ('preferred_tokens', 'looking_for')
+    # Goals of the complementary pairs (either side); their multiplicity drives the pair bonus
+    PAIR_GOALS = sorted({goal for pair in AIMatchingService.COMPLEMENTARY_GOALS for goal in pair})
+
+    def __init__(self, max_code: Optional[int] = None, max_members: Optional[int] = None):
+        self.vocab = {field: {} for field in self.ENUM_FIELDS + self.LIST_FIELDS}
+        self.max_code = max_code
+        self.max_members = max_members
+
+    def code(self, field: str, value, grow: bool) -> int:
+        """0 for falsy values, else a per-field id (-1 if unseen and not growing)"""
+        if value is None or value == '':
+            return 0
+        if not isinstance(value, str):
+            raise UnencodableProfile(field)
+        vocab = self.vocab[field]
+        if value not in vocab:
+            if not grow:
+                return -1
+            if self.max_code is not None and len(vocab) + 1 > self.max_code:
+                raise UnencodableProfile(field)
+            vocab[value] = len(vocab) + 1
+        return vocab[value]
+
+    @staticmethod
+    def members(field: str, value) -> Optional[list]:
+        """List field -> its elements, or None when falsy"""
+        if not value:
+            return None
+        if not isinstance(value, (list, tuple)) or not all(isinstance(item, str) for item in value):
+            raise UnencodableProfile(field)
+        return list(value)
+
+    def bit_positions(self, field: str, members: set, grow: bool) -> list:
+        """Bit positions of members in field's vocabulary; unseen members are skipped unless growing"""
+        vocab = self.vocab[field]
+        positions = []
+        for member in members:
+            if member not in vocab:
+                if not grow:
+                    continue
+                if self.max_members is not None and len(vocab) >= self.max_members:
+                    raise UnencodableProfile(field)
+                vocab[member] = len(vocab)
+            positions.append(vocab[member])
+        return positions
+
+    def encode(self, profile: dict, grow: bool) -> dict:
+        """Encode one profile's matching fields"""
+        encoded = {}
+        for field, levels, key in (
+            ('trading_experience', AIMatchingService.EXPERIENCE_LEVELS, 'experience'),
+            ('risk_tolerance', AIMatchingService.RISK_LEVELS, 'risk'),
+        ):
+            value = profile.get(field, '')
+            if value is not None and not isinstance(value, str):
+                raise UnencodableProfile(field)
+            encoded[key] = levels.get(value, 0)
+
+        years = profile.get('years_trading', 0)
+        if not isinstance(years, (int, float)) or (isinstance(years, int) and abs(years) > 2 ** 53):
+            raise UnencodableProfile('years_trading')
+        encoded['years'] = years
+
+        for field in self.ENUM_FIELDS:
+            encoded[field] = self.code(field, profile.get(field, ''), grow)
+
+        tokens = self.members('preferred_tokens', profile.get('preferred_tokens', []))
+        encoded['has_tokens'] = tokens is not None
+        encoded['token_set'] = set(tokens or ())
+        encoded['preferred_tokens'] = self.bit_positions('preferred_tokens', encoded['token_set'], grow)
+
+        goals = self.members('looking_for', profile.get('looking_for', []))
+        encoded['has_goals'] = goals is not None
+        encoded['goal_list'] = goals or []
+        encoded['looking_for'] = self.bit_positions('looking_for', set(goals or ()), grow)
+        encoded['pair_goal_counts'] = [encoded['goal_list'].count(goal) for goal in self.PAIR_GOALS]
+        if max(encoded['pair_goal_counts']) > 255:
+            # Stored as uint8
+            raise UnencodableProfile('looking_for')
+        return encoded
+
+class CandidateFeatures:
+    """Column arrays holding encoded candidate profiles, one row per candidate
+
+    Per row: int8 experience and risk levels, float64 years, int16 enum codes,
+    bool list flags, uint8 pair-goal counts, and packed little-endian bitsets
+    for tokens and goals.
+    """
+
+    def __init__(self, capacity: int, token_bytes: int, goal_bytes: int):
+        self.experience = np.zeros(capacity, dtype=np.int8)
+        self.risk = np.zeros(capacity, dtype=np.int8)
+        self.years = np.zeros(capacity, dtype=np.float64)
+        self.codes = {field: np.zeros(capacity, dtype=np.int16) for field in ProfileEncoder.ENUM_FIELDS}
+        self.has_tokens = np.zeros(capacity, dtype=bool)
+        self.has_goals = np.zeros(capacity, dtype=bool)
+        self.pair_goal_counts = np.zeros((capacity, len(ProfileEncoder.PAIR_GOALS)), dtype=np.uint8)
+        self.tokens = np.zeros((capacity, token_bytes), dtype=np.uint8)
+        self.goals = np.zeros((capacity, goal_bytes), dtype=np.uint8)
+
+    def columns(self) -> list:
+        return [self.experience, self.risk, self.years, *self.codes.values(), self.has_tokens,
+                self.has_goals, self.pair_goal_counts, self.tokens, self.goals]
+
+    @property
+    def capacity(self) -> int:
+        return len(self.experience)
+
+    @property
+    def row_nbytes(self) -> int:
+        return sum(column.itemsize * (column.shape[1] if column.ndim > 1 else 1) for column in self.columns())
+
+    def resized(self, capacity: int) -> "CandidateFeatures":
+        grown = CandidateFeatures(capacity, self.tokens.shape[1], self.goals.shape[1])
+        count = min(capacity, self.capacity)
+        for old, new in zip(self.columns(), grown.columns()):
+            new[:count] = old[:count]
+        return grown
+
+    def set_row(self, row: int, encoded: dict):
+        self.experience[row] = encoded['experience']
+        self.risk[row] = encoded['risk']
+        self.years[row] = encoded['years']
+        for field in ProfileEncoder.ENUM_FIELDS:
+            self.codes[field][row] = encoded[field]
+        self.has_tokens[row] = encoded['has_tokens']
+        self.has_goals[row] = encoded['has_goals']
+        self.pair_goal_counts[row] = encoded['pair_goal_counts']
+        for bitset, positions in ((self.tokens, encoded['preferred_tokens']), (self.goals, encoded['looking_for'])):
+            bitset[row] = 0
+            for position in positions:
+                bitset[row, position >> 3] |= 1 << (position & 7)
+
+    def take(self, rows: np.ndarray) -> "CandidateFeatures":
+        """Copy of the given rows, in that order"""
+        subset = CandidateFeatures(0, self.tokens.shape[1], self.goals.shape[1])
+        subset.experience, subset.risk, subset.years = self.experience[rows], self.risk[rows], self.years[rows]
+        subset.codes = {field: codes[rows] for field, codes in self.codes.items()}
+        subset.has_tokens, subset.has_goals = self.has_tokens[rows], self.has_goals[rows]
+        subset.pair_goal_counts = self.pair_goal_counts[rows]
+        subset.tokens, subset.goals = self.tokens[rows], self.goals[rows]
+        return subset
+
+    @staticmethod
+    def bytes_for(bits: int) -> int:
+        return (bits + 7) // 8
+
+def top_k_rows(percentage: np.ndarray, k: int, tiebreak: Optional[np.ndarray] = None) -> np.ndarray:
+    """Indices of the k highest percentages, best first
+
+    Ties go to the larger tiebreak value, then to the lower index, so any
+    top-k is a prefix of every larger top-k. Selection uses a partial sort
+    (np.partition); only the rows at or above the k-th score are ordered.
+    """
+    n = len(percentage)
+    if k <= 0 or n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < n:
+        threshold = np.partition(percentage, n - k)[n - k]
+        rows = np.flatnonzero(percentage >= threshold)
+    else:
+        rows = np.arange(n)
+    keys = [rows] if tiebreak is None else [rows, -tiebreak[rows]]
+    order = np.lexsort(keys + [-percentage[rows]])
+    return rows[order[:k]]
+
+class BatchCompatibilityScorer:
+    """Vectorized AIMatchingService scores of one user against many candidates
+
+    Candidates are encoded once into CandidateFeatures: integer codes for
+    enum fields and packed bitsets for token and goal lists. score() then
+    evaluates every sub-score for all candidates in a few array operations.
+    Totals and percentages are identical to calculate_compatibility_score.
+    Candidates with values the encoding can't represent (non-string enums,
+    non-numeric years) are scored by the per-pair path instead.
+    """
+
+    def __init__(self, candidates: List[dict]):
+        encoder = ProfileEncoder(max_code=np.iinfo(np.int16).max, max_members=None)
+        encoded_rows, fallback = [], []
+        for row, candidate in enumerate(candidates):
+            try:
+                encoded_rows.append(encoder.encode(candidate, grow=True))
+            except UnencodableProfile:
+                encoded_rows.append(None)
+                fallback.append((row, candidate))
+
+        features = CandidateFeatures(
+            len(candidates),
+            CandidateFeatures.bytes_for(len(encoder.vocab['preferred_tokens'])),
+            CandidateFeatures.bytes_for(len(encoder.vocab['looking_for']))
+        )
+        for row, encoded in enumerate(encoded_rows):
+            if encoded is not None:
+                features.set_row(row, encoded)
+        self._attach(encoder, features, len(candidates), fallback)
+        self.profiles = candidates
+
+    @classmethod
+    def from_features(cls, encoder: ProfileEncoder, features: CandidateFeatures, size: int,
+                      fallback: list) -> "BatchCompatibilityScorer":
+        """Score the first size rows of already encoded features; fallback is [(row, profile)]"""
+        scorer = cls.__new__(cls)
+        scorer._attach(encoder, features, size, fallback)
+        scorer.profiles = None
+        return scorer
+
+    def _attach(self, encoder: ProfileEncoder, features: CandidateFeatures, size: int, fallback: list):
+        self.encoder = encoder
+        self.size = size
+        # (row, profile) pairs scored by AIMatchingService directly
+        self.fallback = fallback
+        self.experience = features.experience[:size]
+        self.risk = features.risk[:size]
+        self.years = features.years[:size]
+        self.codes = {field: codes[:size] for field, codes in features.codes.items()}
+        self.has_tokens = features.has_tokens[:size]
+        self.has_goals = features.has_goals[:size]
+        self.pair_goal_counts = features.pair_goal_counts[:size]
+        self.tokens = features.tokens[:size]
+        self.goals = features.goals[:size]
+
+    @staticmethod
+    def _user_bits(positions: list, packed: np.ndarray) -> np.ndarray:
+        """The user's members of a list field as a (1, bytes) packed bitset, broadcastable against packed"""
+        bits = np.zeros(packed.shape[1] * 8, dtype=bool)
+        bits[positions] = True
+        return np.packbits(bits, bitorder='little').reshape(1, -1)
+
+    def score(self, user: dict, as_candidate: bool = False) -> dict:
+        """Scores of user against every candidate, as arrays aligned with the candidate rows
+
+        Raises UnencodableProfile for an unusual user profile when the scorer
+        was built from stored features (no raw candidate profiles to fall back on).
+        Returns {'compatibility_percentage', 'total_score', 'max_possible_score', 'breakdown'}
+        like calculate_compatibility_score, without reasons or recommendations.
+        With as_candidate, every row is scored as user1 against user, i.e.
+        calculate_compatibility_score(candidate, user); goal and style pairs
+        are not symmetric.
+        """
+        try:
+            u = self.encoder.encode(user, grow=False)
+        except UnencodableProfile:
+            if self.profiles is None:
+                # Built from stored features, without the raw profiles to fall back on
+                raise
+            return self._score_rows(user, list(enumerate(self.profiles)), self._empty_result(), as_candidate)
+
+        breakdown = {
+            'experience': self._experience_scores(u),
+            'platform': self._platform_scores(user, u),
+            'tokens': self._token_scores(u),
+            'goals': self._goal_scores(u, as_candidate),
+            'style': self._style_scores(user, u, as_candidate),
+            'communication': self._communication_scores(user, u, as_candidate),
+        }
+        result = self._empty_result()
+        result['breakdown'] = breakdown
+        result['total_score'] = sum(breakdown[component] for component in COMPONENTS)
+        result['compatibility_percentage'] = self._percentage(result['total_score'], result['max_possible_score'])
+        return self._score_rows(user, self.fallback, result, as_candidate)
+
+    def _empty_result(self) -> dict:
+        return {
+            'compatibility_percentage': np.zeros(self.size, dtype=np.int64),
+            'total_score': np.zeros(self.size, dtype=np.int64),
+            # Every sub-score has a fixed max_score, so the total is the same for every pair
+            'max_possible_score': 20 + 25 + 20 + 15 + 10 + 10,
+            'breakdown': {component: np.zeros(self.size, dtype=np.int64) for component in COMPONENTS},
+        }
+
+    @staticmethod
+    def _percentage(total: np.ndarray, max_possible_score: int) -> np.ndarray:
+        # Same float operations as int((total_score / max_possible_score) * 100)
+        return np.trunc((total.astype(np.float64) / max_possible_score) * 100).astype(np.int64)
+
+    def _score_rows(self, user: dict, rows: list, result: dict, as_candidate: bool) -> dict:
+        """Overwrite rows with AIMatchingService's own scores"""
+        for row, candidate in rows:
+            if as_candidate:
+                pair = AIMatchingService.calculate_compatibility_score(candidate, user)
+            else:
+                pair = AIMatchingService.calculate_compatibility_score(user, candidate)
+            result['compatibility_percentage'][row] = pair['compatibility_percentage']
+            result['total_score'][row] = pair['total_score']
+            for component in COMPONENTS:
+                result['breakdown'][component][row] = pair['breakdown'][component]['score']
+        return result
+
+    def _experience_scores(self, u: dict) -> np.ndarray:
+        level1, level2 = u['experience'], self.experience.astype(np.int64)
+        if level1 == 0:
+            return np.zeros(len(level2), dtype=np.int64)
+        diff = np.abs(level1 - level2)
+        mentoring = ((level1 == 1) & (level2 >= 2)) | ((level2 == 1) & (level1 >= 2))
+        score = np.select([mentoring, diff == 0, diff == 1, diff == 2], [18, 20, 15, 10], 5)
+        score = np.where(np.abs(u['years'] - self.years) <= 1, np.minimum(score + 2, 20), score)
+        return np.where(level2 == 0, 0, score)
+
+    def _platform_scores(self, user: dict, u: dict) -> np.ndarray:
+        score = np.zeros(self.size, dtype=np.int64)
+        for field, same, different, missing in (
+            ('preferred_trading_platform', 15, 5, 3),
+            ('preferred_communication_platform', 10, 3, 2),
+        ):
+            codes = self.codes[field]
+            if u[field]:
+                score += np.where(codes != 0, np.where(codes == u[field], same, different), missing)
+            else:
+                score += missing
+        return score
+
+    def _token_scores(self, u: dict) -> np.ndarray:
+        if not u['has_tokens']:
+            return np.full(self.size, 5, dtype=np.int64)
+        user_bits = self._user_bits(u['preferred_tokens'], self.tokens)
+        # User tokens no candidate has still count towards the union
+        unseen = len(u['token_set']) - len(u['preferred_tokens'])
+        overlap = POPCOUNT8[self.tokens & user_bits].sum(axis=1, dtype=np.int64)
+        union = POPCOUNT8[self.tokens | user_bits].sum(axis=1, dtype=np.int64) + unseen
+        with np.errstate(divide='ignore', invalid='ignore'):
+            score = np.trunc(20 * (overlap / union)).astype(np.int64)
+        score = np.where(overlap == 0, np.maximum(score, 5), score)
+        return np.where(self.has_tokens, score, 5)
+
+    def _goal_scores(self, u: dict, as_candidate: bool) -> np.ndarray:
+        if not u['has_goals']:
+            return np.full(self.size, 3, dtype=np.int64)
+        pair_count = np.zeros(self.size, dtype=np.int64)
+        for goal1, goal2 in AIMatchingService.COMPLEMENTARY_GOALS:
+            user_goal, row_goal = (goal2, goal1) if as_candidate else (goal1, goal2)
+            multiplicity = u['goal_list'].count(user_goal)
+            if multiplicity:
+                pair_count += multiplicity * self.pair_goal_counts[:, ProfileEncoder.PAIR_GOALS.index(row_goal)].astype(np.int64)
+        user_bits = self._user_bits(u['looking_for'], self.goals)
+        overlap = POPCOUNT8[self.goals & user_bits].sum(axis=1, dtype=np.int64)
+        score = np.where(pair_count > 0, 8 * pair_count, np.where(overlap > 0, 3 * overlap, 2))
+        return np.where(self.has_goals, np.minimum(score, 15), 3)
+
+    def _compatible_codes(self, field: str, values) -> list:
+        vocab = self.encoder.vocab[field]
+        return [vocab[value] for value in values if value in vocab]
+
+    def _style_scores(self, user: dict, u: dict, as_candidate: bool) -> np.ndarray:
+        score = np.zeros(self.size, dtype=np.int64)
+        codes = self.codes['trading_style']
+        if u['trading_style']:
+            style = user.get('trading_style')
+            if as_candidate:
+                compatible_styles = [
+                    style1 for style1, styles in AIMatchingService.COMPATIBLE_STYLES.items() if style in styles
+                ]
+            else:
+                compatible_styles = AIMatchingService.COMPATIBLE_STYLES.get(style, [])
+            compatible = np.isin(codes, self._compatible_codes('trading_style', compatible_styles))
+            score += np.where(codes != 0, np.where(codes == u['trading_style'], 6, np.where(compatible, 4, 2)), 0)
+        if u['risk']:
+            diff = np.abs(u['risk'] - self.risk.astype(np.int64))
+            score += np.where(self.risk != 0, np.select([diff == 0, diff == 1], [4, 3], 1), 0)
+        return score
+
+    def _communication_scores(self, user: dict, u: dict, as_candidate: bool) -> np.ndarray:
+        score = np.zeros(self.size, dtype=np.int64)
+        codes = self.codes['communication_style']
+        if u['communication_style']:
+            style = user.get('communication_style')
+            compatible = np.isin(codes, self._compatible_codes('communication_style', [
+                (style1 if as_candidate else style2)
+                for style1, style2 in AIMatchingService.COMPATIBLE_COMMUNICATION_STYLES
+                if (style2 if as_candidate else style1) == style
+            ]))
+            score += np.where(codes != 0, np.where(codes == u['communication_style'], 6, np.where(compatible, 4, 2)), 0)
+        hours = self.codes['trading_hours']
+        if u['trading_hours']:
+            flexible = (user.get('trading_hours') == '24/7') | (hours == self.encoder.vocab['trading_hours'].get('24/7', -1))
+            score += np.where(hours != 0, np.where(hours == u['trading_hours'], 4, np.where(flexible, 3, 2)), 0)
+        return score
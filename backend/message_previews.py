@@ -0,0 +1,16 @@
+"""Last-message previews stored on matches.
+
+Each match carries a compact copy of its latest message in ``last_message``,
+so the conversation list renders without reading ``messages``. The chat
+endpoints write it as messages arrive; migrations rebuild it from history.
+"""
+
+LAST_MESSAGE_PREVIEW_LENGTH = 100
+
+def last_message_snapshot(msg: dict) -> dict:
+    """Compact preview of a message, stored on its match for the conversation list"""
+    return {
+        "content": msg["content"][:LAST_MESSAGE_PREVIEW_LENGTH],
+        "sender_id": msg["sender_id"],
+        "timestamp": msg["timestamp"]
+    }
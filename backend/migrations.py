@@ -0,0 +1,312 @@
+"""One-off data migrations for denormalized fields.
+
+Each migration is idempotent and can be re-run safely:
+
+    python migrations.py unread_counters
+    python migrations.py last_message_snapshots
+    python migrations.py swipe_exclusions
+    python migrations.py swipe_quotas
+    python migrations.py unique_swipes
+    python migrations.py match_pair_keys
+    python migrations.py swipe_records   # after unique_swipes
+    python migrations.py last_activity
+"""
+import asyncio
+import sys
+import uuid
+from datetime import datetime, timezone
+
+from pymongo import ReturnDocument, UpdateOne
+
+from database import (
+    counters_collection, likes_received_collection, matches_collection, messages_collection, read_status_collection,
+    swipe_exclusions_collection, swipe_history_collection, swipe_quotas_collection, swipes_collection,
+    users_collection
+)
+from exclusions import seen_update
+from indexes import INDEX_REGISTRY
+from message_previews import last_message_snapshot
+from swipe_quota import QUOTA_RETENTION, quota_day, quota_key
+
+BULK_WRITE_BATCH = 1000
+
+async def refresh_unread_counters(match: dict) -> int:
+    """Recount read_status.unread_count for both users of match from its messages"""
+    for reader_id, sender_id in ((match["user1_id"], match["user2_id"]), (match["user2_id"], match["user1_id"])):
+        read_status = await read_status_collection.find_one({"user_id": reader_id, "match_id": match["match_id"]})
+
+        unread_query = {"match_id": match["match_id"], "sender_id": sender_id}
+        if read_status and read_status.get("last_read_at"):
+            unread_query["timestamp"] = {"$gt": read_status["last_read_at"]}
+        unread_count = await messages_collection.count_documents(unread_query)
+
+        await read_status_collection.update_one(
+            {"user_id": reader_id, "match_id": match["match_id"]},
+            {"$set": {"unread_count": unread_count}},
+            upsert=True
+        )
+    return 2
+
+async def refresh_last_message_snapshot(match_id: str) -> int:
+    """Store the latest message preview on match_id; 0 if it has no messages"""
+    latest_message = await messages_collection.find_one(
+        {"match_id": match_id},
+        sort=[("timestamp", -1)]
+    )
+    if not latest_message:
+        return 0
+
+    await matches_collection.update_one(
+        {"match_id": match_id},
+        {"$set": {
+            "last_message_at": latest_message["timestamp"],
+            "last_message": last_message_snapshot(latest_message)
+        }}
+    )
+    return 1
+
+async def backfill_unread_counters() -> int:
+    """Seed read_status.unread_count for both users of every match from the message history"""
+    updated = 0
+    async for match in matches_collection.find({}, {"_id": 0, "match_id": 1, "user1_id": 1, "user2_id": 1}):
+        updated += await refresh_unread_counters(match)
+    return updated
+
+async def backfill_last_message_snapshots() -> int:
+    """Store the latest message preview on every match that has messages"""
+    updated = 0
+    async for match in matches_collection.find({}, {"_id": 0, "match_id": 1}):
+        updated += await refresh_last_message_snapshot(match["match_id"])
+    return updated
+
+async def backfill_swipe_exclusions() -> int:
+    """Number users without a user_seq (oldest first) and rebuild every seen-set from swipes"""
+    missing = await users_collection.count_documents({"user_seq": {"$exists": False}})
+    if missing:
+        # Reserve the whole range with one counter bump
+        counter = await counters_collection.find_one_and_update(
+            {"_id": "user_seq"},
+            {"$inc": {"value": missing}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        next_seq = counter["value"] - missing + 1
+        async for user in users_collection.find(
+            {"user_seq": {"$exists": False}}, {"_id": 0, "user_id": 1}
+        ).sort("created_at", 1).limit(missing):
+            await users_collection.update_one({"user_id": user["user_id"]}, {"$set": {"user_seq": next_seq}})
+            next_seq += 1
+
+    user_seqs = {
+        user["user_id"]: user["user_seq"]
+        async for user in users_collection.find({"user_seq": {"$exists": True}}, {"_id": 0, "user_id": 1, "user_seq": 1})
+    }
+
+    updated = 0
+    operations = []
+    async for swipe in swipes_collection.find({}, {"_id": 0, "swiper_id": 1, "target_id": 1}):
+        seq = user_seqs.get(swipe["target_id"])
+        if seq is None:
+            continue
+        query, update = seen_update(swipe["swiper_id"], seq)
+        operations.append(UpdateOne(query, update, upsert=True))
+        if len(operations) >= BULK_WRITE_BATCH:
+            await swipe_exclusions_collection.bulk_write(operations, ordered=False)
+            updated += len(operations)
+            operations = []
+    if operations:
+        await swipe_exclusions_collection.bulk_write(operations, ordered=False)
+        updated += len(operations)
+    return updated
+
+async def backfill_swipe_quotas() -> int:
+    """Seed today's quota buckets from the swipes already made today"""
+    day = quota_day()
+    day_start = datetime.strptime(day, "%Y-%m-%d")
+    operations = []
+    async for row in swipes_collection.aggregate([
+        {"$match": {"swiped_at": {"$gte": day_start}}},
+        {"$group": {"_id": "$swiper_id", "count": {"$sum": 1}}}
+    ]):
+        operations.append(UpdateOne(
+            {"_id": quota_key(row["_id"], day)},
+            {
+                # Swipes counted live since the deploy are already in the bucket
+                "$max": {"count": row["count"]},
+                "$setOnInsert": {"user_id": row["_id"], "day": day, "expires_at": day_start + QUOTA_RETENTION}
+            },
+            upsert=True
+        ))
+    updated = 0
+    for start in range(0, len(operations), BULK_WRITE_BATCH):
+        batch = operations[start:start + BULK_WRITE_BATCH]
+        await swipe_quotas_collection.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    return updated
+
+async def dedupe_swipes() -> int:
+    """Keep the newest swipe per (swiper, target) and switch swipes to the unique pair index"""
+    removed = 0
+    async for group in swipes_collection.aggregate([
+        {"$sort": {"timestamp": -1}},
+        {"$group": {"_id": {"swiper_id": "$swiper_id", "target_id": "$target_id"}, "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}}
+    ], allowDiskUse=True):
+        result = await swipes_collection.delete_many({"_id": {"$in": group["ids"][1:]}})
+        removed += result.deleted_count
+
+    # The unique index can't be built while the old non-unique one covers the same keys
+    if "swiper_target" in await swipes_collection.index_information():
+        await swipes_collection.drop_index("swiper_target")
+    await swipes_collection.create_indexes(INDEX_REGISTRY["swipes"])
+    return removed
+
+async def backfill_match_pair_keys() -> int:
+    """Key every match by its sorted user pair, merging duplicate matches of a pair into one
+
+    The match that already has a pair_key (or else the oldest) is kept. The
+    others' messages move to it, their read markers are dropped and the
+    kept match's unread counters and last message are recomputed.
+    """
+    updated = 0
+    async for group in matches_collection.aggregate([
+        {"$sort": {"created_at": 1}},
+        {"$group": {
+            # Same order as server.match_pair_key
+            "_id": {"$cond": [
+                {"$lte": ["$user1_id", "$user2_id"]},
+                {"$concat": ["$user1_id", ":", "$user2_id"]},
+                {"$concat": ["$user2_id", ":", "$user1_id"]}
+            ]},
+            "matches": {"$push": {
+                "match_id": "$match_id", "pair_key": "$pair_key", "user1_id": "$user1_id", "user2_id": "$user2_id"
+            }}
+        }}
+    ], allowDiskUse=True):
+        matches = group["matches"]
+        keep = next((match for match in matches if match.get("pair_key")), matches[0])
+        duplicate_ids = [match["match_id"] for match in matches if match is not keep]
+        if duplicate_ids:
+            await messages_collection.update_many(
+                {"match_id": {"$in": duplicate_ids}}, {"$set": {"match_id": keep["match_id"]}}
+            )
+            await read_status_collection.delete_many({"match_id": {"$in": duplicate_ids}})
+            await matches_collection.delete_many({"match_id": {"$in": duplicate_ids}})
+            await refresh_unread_counters(keep)
+            await refresh_last_message_snapshot(keep["match_id"])
+            updated += len(duplicate_ids)
+        if not keep.get("pair_key"):
+            await matches_collection.update_one({"match_id": keep["match_id"]}, {"$set": {"pair_key": group["_id"]}})
+            updated += 1
+    return updated
+
+async def _upsert_swipes(documents) -> int:
+    """Add swipes for pairs that don't have one yet, in BULK_WRITE_BATCH batches"""
+    updated = 0
+    operations = []
+    async for swipe in documents:
+        operations.append(UpdateOne(
+            {"swiper_id": swipe["swiper_id"], "target_id": swipe["target_id"]},
+            {"$setOnInsert": swipe},
+            upsert=True
+        ))
+        if len(operations) >= BULK_WRITE_BATCH:
+            result = await swipes_collection.bulk_write(operations, ordered=False)
+            updated += result.upserted_count
+            operations = []
+    if operations:
+        result = await swipes_collection.bulk_write(operations, ordered=False)
+        updated += result.upserted_count
+    return updated
+
+async def _history_swipes():
+    async for entry in swipe_history_collection.find({"swipe_data": {"$exists": True}}, {"_id": 0, "swipe_data": 1}):
+        swipe = entry["swipe_data"]
+        swipe.pop("_id", None)
+        swipe.setdefault("swiped_at", swipe.get("timestamp"))
+        yield swipe
+
+async def _received_likes():
+    async for like in likes_received_collection.find({}, {"_id": 0}):
+        yield {
+            "swipe_id": str(uuid.uuid4()),
+            "swiper_id": like["liked_by_user_id"],
+            "target_id": like["user_id"],
+            "action": "like",
+            "swiped_at": like["liked_at"],
+            "timestamp": like["liked_at"]
+        }
+
+async def collapse_swipe_records() -> int:
+    """Fold swipe_history and likes_received into swipes, then drop them
+
+    swipes becomes the single swipe record: rewind reads the latest by
+    swiped_at and "See Who Liked You" reads likes by target_id. Pairs that
+    only survive in the history or in likes_received are added; existing
+    swipes win. Needs the unique pair index (run unique_swipes first).
+    """
+    # Rewind sorts on swiped_at, which early swipes only have as timestamp
+    result = await swipes_collection.update_many(
+        {"swiped_at": {"$exists": False}},
+        [{"$set": {"swiped_at": "$timestamp"}}]
+    )
+    updated = result.modified_count
+    updated += await _upsert_swipes(_history_swipes())
+    updated += await _upsert_swipes(_received_likes())
+    await swipe_history_collection.drop()
+    await likes_received_collection.drop()
+    return updated
+
+def _parse_last_activity(value) -> datetime:
+    """A stored last_activity as a naive UTC datetime; missing or unreadable values count as now"""
+    if isinstance(value, datetime):
+        return value
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return datetime.utcnow()
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+async def normalize_last_activity() -> int:
+    """Store every last_activity as a datetime, so range queries on it see every user
+
+    Users without one (the active-users list used to treat them as active
+    now) get the migration time and age out like everyone else.
+    """
+    operations = []
+    async for user in users_collection.find(
+        {"$or": [{"last_activity": {"$exists": False}}, {"last_activity": {"$not": {"$type": "date"}}}]},
+        {"_id": 0, "user_id": 1, "last_activity": 1}
+    ):
+        operations.append(UpdateOne(
+            {"user_id": user["user_id"]},
+            {"$set": {"last_activity": _parse_last_activity(user.get("last_activity"))}}
+        ))
+    updated = 0
+    for start in range(0, len(operations), BULK_WRITE_BATCH):
+        batch = operations[start:start + BULK_WRITE_BATCH]
+        await users_collection.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    return updated
+
+MIGRATIONS = {
+    "unread_counters": backfill_unread_counters,
+    "last_message_snapshots": backfill_last_message_snapshots,
+    "swipe_exclusions": backfill_swipe_exclusions,
+    "swipe_quotas": backfill_swipe_quotas,
+    "unique_swipes": dedupe_swipes,
+    "match_pair_keys": backfill_match_pair_keys,
+    "swipe_records": collapse_swipe_records,
+    "last_activity": normalize_last_activity,
+}
+
+async def _main(name: str) -> int:
+    if name not in MIGRATIONS:
+        print(f"Usage: python migrations.py [{'|'.join(MIGRATIONS)}]")
+        return 2
+    result = await MIGRATIONS[name]()
+    print(f"✅ {name}: {result} documents updated")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "")))
@@ -0,0 +1,79 @@
+"""Cursor pagination contract shared by list endpoints.
+
+Clients pass ``cursor`` and ``limit`` query parameters. Response bodies keep
+their existing shape; the opaque cursor for the following page comes back in
+the ``X-Next-Cursor`` header and is omitted on the last page.
+"""
+import base64
+from typing import Optional, Tuple
+
+from bson import json_util
+from fastapi import HTTPException, Response
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+PREV_CURSOR_HEADER = "X-Prev-Cursor"
+CURSOR_HEADERS = [NEXT_CURSOR_HEADER, PREV_CURSOR_HEADER]
+
+def clamp_page_size(limit: Optional[int], default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE) -> int:
+    """Bound a client-supplied page size to [1, maximum]"""
+    if not limit:
+        return default
+    return max(1, min(limit, maximum))
+
+def encode_cursor(position: dict) -> str:
+    """Serialize a keyset position (sort key values) into an opaque token"""
+    return base64.urlsafe_b64encode(json_util.dumps(position).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str) -> dict:
+    """Inverse of encode_cursor; a malformed token is a client error"""
+    try:
+        position = json_util.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(position, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+def keyset_filter(position: dict, fields: list, descending: bool) -> dict:
+    """Filter selecting rows strictly after position in (fields...) sort order
+
+    For fields [a, b] descending this is: a < pa OR (a == pa AND b < pb).
+    """
+    op = "$lt" if descending else "$gt"
+    clauses = []
+    for i, field in enumerate(fields):
+        clause = {prev: position[prev] for prev in fields[:i]}
+        clause[field] = {op: position[field]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+def set_cursor_headers(response: Response, next_cursor: Optional[str] = None, prev_cursor: Optional[str] = None):
+    """Attach cursors to the response"""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if prev_cursor:
+        response.headers[PREV_CURSOR_HEADER] = prev_cursor
+
+async def paginate(collection, query: dict, sort_fields: list, descending: bool, limit: int,
+                   cursor: Optional[str] = None, projection: Optional[dict] = None) -> Tuple[list, Optional[str]]:
+    """Fetch one keyset page; returns (rows, next_cursor)
+
+    sort_fields must end with a unique field so positions are unambiguous.
+    """
+    if cursor:
+        query = {"$and": [query, keyset_filter(decode_cursor(cursor), sort_fields, descending)]}
+
+    sort_order = -1 if descending else 1
+    # Ask for one extra row to learn whether another page exists
+    rows = await collection.find(query, projection).sort(
+        [(field, sort_order) for field in sort_fields]
+    ).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({field: rows[-1][field] for field in sort_fields})
+    return rows, next_cursor
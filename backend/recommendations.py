@@ -0,0 +1,364 @@
+"""Precomputed AI recommendations.
+
+An offline job scores every complete profile against the candidate pool
+and stores each user's top N in ``recommendations``:
+
+    {"user_id": ..., "recommendations": [{"user_id", "user_seq", "compatibility_percentage", "last_activity_ts"}, ...],
+     "profile_version": ..., "min_percentage": ..., "generated_at": ..., "run_id": ...}
+
+Scoring runs in a process pool, one block of users per task, using the same
+batch scorer as live recommendations. The job checkpoints after every
+window of blocks in ``recommendation_jobs``. An interrupted run resumes
+where it stopped:
+
+    python recommendations.py                 # start or resume
+    python recommendations.py --restart       # abandon an unfinished run
+    python recommendations.py --workers 8 --block-size 500 --top-n 100
+
+``/api/ai-recommendations`` reads the stored list, drops users already
+swiped on, and only scores live when the entry is missing, stale or
+exhausted.
+
+Between runs, a change to a user's matching fields bumps their
+``profile_version`` and ``schedule_rescore`` re-scores only that user
+against the feature store: their own list is rebuilt, and they are
+moved into, within or out of everyone else's list.
+
+Response bodies keep their shape. The endpoint reports where the results
+came from in the ``X-Recommendation-Source`` header. With a time budget, it
+also reports in ``X-Candidates-Evaluated`` / ``X-Candidates-Total`` how much
+of the candidate pool was actually scored.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import numpy as np
+from fastapi import Response
+from pymongo import UpdateMany, UpdateOne
+
+from database import recommendation_jobs_collection, recommendations_collection, users_collection
+from exclusions import SeenSet, drop_swiped_legacy_users
+from feature_store import FEATURE_PROJECTION, feature_store
+from matching import MATCHING_FIELDS, BatchCompatibilityScorer, UnencodableProfile, top_k_rows
+
+RECOMMENDATIONS_TOP_N = int(os.environ.get('RECOMMENDATIONS_TOP_N', 100))
+RECOMMENDATIONS_MAX_AGE = timedelta(hours=int(os.environ.get('RECOMMENDATIONS_MAX_AGE_HOURS', 24)))
+# Lists addressed per incremental update, which bounds the size of its $in
+RESCORE_CHUNK_SIZE = int(os.environ.get('RESCORE_CHUNK_SIZE', 1000))
+
+PROFILE_PROJECTION = {
+    "_id": 0, "user_id": 1, "user_seq": 1, "last_activity": 1, "profile_version": 1,
+    **{field: 1 for field in MATCHING_FIELDS}
+}
+
+SOURCE_HEADER = "X-Recommendation-Source"
+EVALUATED_HEADER = "X-Candidates-Evaluated"
+TOTAL_HEADER = "X-Candidates-Total"
+RECOMMENDATION_HEADERS = [SOURCE_HEADER, EVALUATED_HEADER, TOTAL_HEADER]
+
+# user_id -> whether another rescore was requested while one is running
+_rescoring = {}
+# Running rescore tasks; the event loop only keeps weak references to tasks
+_rescore_tasks = set()
+
+def _item(user_id: str, user_seq: Optional[int], percentage: int, last_activity: float) -> dict:
+    """One stored recommendation; last_activity_ts breaks score ties like top_k_rows"""
+    return {
+        "user_id": user_id,
+        "user_seq": user_seq,
+        "compatibility_percentage": percentage,
+        "last_activity_ts": float(last_activity) if np.isfinite(last_activity) else None
+    }
+
+def _entry(user: dict, recommendations: List[dict], top_n: int) -> dict:
+    return {
+        "user_id": user["user_id"],
+        "recommendations": recommendations,
+        # Profile the list was scored for; a newer version makes it stale
+        "profile_version": user.get("profile_version", 0),
+        # Lowest score a candidate needs to get into the list; -1 while it has room
+        "min_percentage": recommendations[-1]["compatibility_percentage"] if len(recommendations) >= top_n else -1,
+    }
+
+# Candidate pool of a worker process, set once by _init_worker
+_pool = {}
+
+def _init_worker(candidates: List[dict]):
+    _pool["scorer"] = BatchCompatibilityScorer(candidates)
+    _pool["user_ids"] = [candidate["user_id"] for candidate in candidates]
+    _pool["user_seqs"] = [candidate.get("user_seq") for candidate in candidates]
+    _pool["rows"] = {candidate["user_id"]: row for row, candidate in enumerate(candidates)}
+    _pool["last_activity"] = np.array([
+        candidate["last_activity"].timestamp() if isinstance(candidate.get("last_activity"), datetime) else -np.inf
+        for candidate in candidates
+    ])
+
+def _score_block(users: List[dict], top_n: int) -> List[dict]:
+    """Top-N candidate lists for a block of users (runs in a worker process)"""
+    scorer = _pool["scorer"]
+    entries = []
+    for user in users:
+        percentage = scorer.score(user)["compatibility_percentage"]
+        eligible = np.ones(len(percentage), dtype=bool)
+        own_row = _pool["rows"].get(user["user_id"])
+        if own_row is not None:
+            eligible[own_row] = False
+        rows = np.flatnonzero(eligible)
+        # Keep the swiped-on users; the read path filters them against the live seen-set
+        top = rows[top_k_rows(percentage[rows], top_n, tiebreak=_pool["last_activity"][rows])]
+        entries.append(_entry(user, [
+            _item(_pool["user_ids"][row], _pool["user_seqs"][row], int(percentage[row]), _pool["last_activity"][row])
+            for row in top
+        ], top_n))
+    return entries
+
+async def _current_run(restart: bool) -> dict:
+    """The unfinished run to resume, or a new one"""
+    unfinished = await recommendation_jobs_collection.find_one({"status": "running"}, sort=[("started_at", -1)])
+    if unfinished and restart:
+        await recommendation_jobs_collection.update_one({"_id": unfinished["_id"]}, {"$set": {"status": "abandoned"}})
+        unfinished = None
+    if unfinished:
+        print(f"↻ Resuming run {unfinished['_id']} after {unfinished['processed_users']} users")
+        return unfinished
+
+    run = {
+        "_id": str(uuid.uuid4()),
+        "status": "running",
+        "started_at": datetime.utcnow(),
+        "last_user_id": None,
+        "processed_users": 0,
+        "total_users": await users_collection.count_documents({"profile_complete": True}),
+    }
+    await recommendation_jobs_collection.insert_one(run)
+    return run
+
+async def run_job(workers: Optional[int] = None, block_size: int = 500, top_n: int = RECOMMENDATIONS_TOP_N,
+                  restart: bool = False) -> dict:
+    """Generate stored recommendations for every complete profile; resumable"""
+    run = await _current_run(restart)
+    workers = workers or os.cpu_count() or 1
+
+    candidates = await users_collection.find({"profile_complete": True}, PROFILE_PROJECTION).to_list(length=None)
+    print(f"🧮 Scoring against {len(candidates)} candidates with {workers} workers")
+
+    query = {"profile_complete": True}
+    if run["last_user_id"] is not None:
+        query["user_id"] = {"$gt": run["last_user_id"]}
+    cursor = users_collection.find(query, PROFILE_PROJECTION).sort("user_id", 1)
+
+    loop = asyncio.get_running_loop()
+    processed = run["processed_users"]
+    started = time.monotonic()
+    resumed_at = processed
+
+    # Workers start from a fresh interpreter rather than a fork of this process and its motor client
+    pool_context = multiprocessing.get_context("forkserver")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context, initializer=_init_worker,
+                             initargs=(candidates,)) as pool:
+        while True:
+            # One window keeps every worker busy; the checkpoint moves only after the whole window is stored
+            window = []
+            for _ in range(workers):
+                block = await cursor.to_list(length=block_size)
+                if not block:
+                    break
+                window.append(block)
+            if not window:
+                break
+
+            results = await asyncio.gather(*[
+                loop.run_in_executor(pool, _score_block, block, top_n) for block in window
+            ])
+            generated_at = datetime.utcnow()
+            await recommendations_collection.bulk_write([
+                UpdateOne(
+                    {"user_id": entry["user_id"]},
+                    {"$set": {**entry, "generated_at": generated_at, "run_id": run["_id"]}},
+                    upsert=True
+                )
+                for entries in results for entry in entries
+            ], ordered=False)
+
+            processed += sum(len(block) for block in window)
+            await recommendation_jobs_collection.update_one(
+                {"_id": run["_id"]},
+                {"$set": {"last_user_id": window[-1][-1]["user_id"], "processed_users": processed}}
+            )
+
+            elapsed = time.monotonic() - started
+            rate = (processed - resumed_at) / elapsed if elapsed else 0
+            remaining = max(run["total_users"] - processed, 0)
+            eta = f"{remaining / rate:.0f}s" if rate else "?"
+            print(f"  {processed}/{run['total_users']} users  {rate:.0f} users/s  eta {eta}")
+
+    await recommendation_jobs_collection.update_one(
+        {"_id": run["_id"]},
+        {"$set": {"status": "completed", "completed_at": datetime.utcnow(), "processed_users": processed}}
+    )
+    print(f"✅ Run {run['_id']} completed: {processed} users")
+    return {"run_id": run["_id"], "processed_users": processed}
+
+def _min_percentage_update(top_n: int) -> list:
+    """Pipeline update recomputing min_percentage from the stored (sorted) list, as _entry does"""
+    return [{"$set": {"min_percentage": {"$cond": [
+        {"$gte": [{"$size": "$recommendations"}, top_n]},
+        {"$arrayElemAt": ["$recommendations.compatibility_percentage", -1]},
+        -1
+    ]}}}]
+
+async def remove_from_recommendations(user_id: str):
+    """Drop user_id from every stored list; each of them has room again"""
+    await recommendations_collection.update_many(
+        {"recommendations.user_id": user_id},
+        {"$pull": {"recommendations": {"user_id": user_id}}, "$set": {"min_percentage": -1}}
+    )
+
+async def rescore_user(user_id: str, top_n: int = RECOMMENDATIONS_TOP_N):
+    """Bring stored recommendations in line with user_id's current profile
+
+    Only pairs involving user_id are scored, in both directions, against
+    the feature store. Lists of other users only take user_id in when it
+    beats their lowest stored score; $push keeps them sorted and at top_n,
+    and min_percentage is recomputed right after.
+    """
+    profile = await users_collection.find_one({"user_id": user_id}, {**FEATURE_PROJECTION, "profile_version": 1})
+    await remove_from_recommendations(user_id)
+    if not profile or not profile.get("profile_complete"):
+        await recommendations_collection.delete_many({"user_id": user_id})
+        return
+
+    await feature_store.sync()
+    feature_store.upsert(profile)
+    last_activity = feature_store.last_activity[feature_store.rows[user_id]] if user_id in feature_store.rows else -np.inf
+    seen = SeenSet()
+    try:
+        scored, percentage = await feature_store.score_async(profile, seen)
+        candidates, candidate_percentage = await feature_store.score_async(profile, seen, as_candidate=True)
+    except UnencodableProfile:
+        # Scored live on the read path until the next job run
+        await recommendations_collection.delete_many({"user_id": user_id})
+        return
+
+    top = top_k_rows(percentage, top_n, tiebreak=scored.last_activity)
+    recommendations = []
+    for i in top:
+        seq = int(scored.user_seq[i])
+        recommendations.append(_item(
+            scored.user_ids[i], seq if seq >= 0 else None, int(percentage[i]), scored.last_activity[i]
+        ))
+    await recommendations_collection.update_one(
+        {"user_id": user_id},
+        {"$set": {**_entry(profile, recommendations, top_n), "generated_at": datetime.utcnow(), "run_id": None}},
+        upsert=True
+    )
+
+    # Percentages take at most 101 values; per value, the lists whose gate admits it, RESCORE_CHUNK_SIZE at a time
+    operations = []
+    for value in np.unique(candidate_percentage):
+        value = int(value)
+        item = _item(user_id, profile.get("user_seq"), value, last_activity)
+        ids = [candidates.user_ids[i] for i in np.flatnonzero(candidate_percentage == value)]
+        for start in range(0, len(ids), RESCORE_CHUNK_SIZE):
+            query = {"user_id": {"$in": ids[start:start + RESCORE_CHUNK_SIZE]}, "min_percentage": {"$lte": value}}
+            operations.append(UpdateMany(query, {"$push": {"recommendations": {
+                "$each": [item],
+                "$sort": {"compatibility_percentage": -1, "last_activity_ts": -1},
+                "$slice": top_n
+            }}}))
+            # Still matches: the list's new lowest score is at most value
+            operations.append(UpdateMany(query, _min_percentage_update(top_n)))
+    if operations:
+        # Ordered, so each chunk's gate is recomputed after its push
+        await recommendations_collection.bulk_write(operations)
+
+async def _rescore_in_background(user_id: str):
+    try:
+        while True:
+            await rescore_user(user_id)
+            if not _rescoring[user_id]:
+                break
+            # The profile changed again mid-rescore
+            _rescoring[user_id] = False
+    except Exception as e:
+        print(f"Recommendation rescore failed for {user_id}: {e}")
+    finally:
+        _rescoring.pop(user_id, None)
+
+def schedule_rescore(user_id: str):
+    """Rescore user_id off the request path; an already running rescore runs once more instead"""
+    if user_id in _rescoring:
+        _rescoring[user_id] = True
+        return
+    _rescoring[user_id] = False
+    task = asyncio.create_task(_rescore_in_background(user_id))
+    _rescore_tasks.add(task)
+    task.add_done_callback(_rescore_tasks.discard)
+
+def is_stale(entry: dict, user: dict) -> bool:
+    """Too old, or scored for an earlier version of the user's profile"""
+    if datetime.utcnow() - entry["generated_at"] > RECOMMENDATIONS_MAX_AGE:
+        return True
+    return entry.get("profile_version", 0) != user.get("profile_version", 0)
+
+async def precomputed_recommendations(user: dict, seen: SeenSet, limit: int) -> Optional[list]:
+    """Current documents of the best stored recommendations not swiped on yet
+
+    None means the caller should score live: no entry, a stale entry, or
+    too few unswiped users left in it.
+    """
+    if limit <= 0:
+        return []
+    entry = await recommendations_collection.find_one({"user_id": user["user_id"]}, {"_id": 0})
+    if not entry or is_stale(entry, user):
+        return None
+
+    unseen_ids = [
+        rec["user_id"] for rec in entry["recommendations"]
+        if rec.get("user_seq") is None or rec["user_seq"] not in seen
+    ]
+    results = []
+    for start in range(0, len(unseen_ids), limit):
+        chunk_ids = unseen_ids[start:start + limit]
+        users = {
+            candidate["user_id"]: candidate
+            async for candidate in users_collection.find(
+                {"user_id": {"$in": chunk_ids}, "profile_complete": True}, {"_id": 0}
+            )
+        }
+        await drop_swiped_legacy_users(user["user_id"], users)
+        results.extend(users[uid] for uid in chunk_ids if uid in users)
+        if len(results) >= limit:
+            return results[:limit]
+    # Exhausted before filling the page; live scoring can still find more
+    return None
+
+def set_recommendation_headers(response: Response, source: str, evaluated: Optional[int] = None,
+                               total: Optional[int] = None):
+    """Attach where recommendations came from and, for budgeted scoring, how far it got"""
+    response.headers[SOURCE_HEADER] = source
+    if evaluated is not None:
+        response.headers[EVALUATED_HEADER] = str(evaluated)
+    if total is not None:
+        response.headers[TOTAL_HEADER] = str(total)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--block-size", type=int, default=500, help="Users per worker task")
+    parser.add_argument("--top-n", type=int, default=RECOMMENDATIONS_TOP_N)
+    parser.add_argument("--restart", action="store_true", help="Abandon an unfinished run and start over")
+    args = parser.parse_args()
+    asyncio.run(run_job(args.workers, args.block_size, args.top_n, args.restart))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
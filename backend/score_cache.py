@@ -0,0 +1,97 @@
+"""Bounded LRU/TTL cache of pairwise compatibility scores.
+
+calculate_compatibility_score only reads the matching fields, and every
+change to those bumps the user's ``profile_version``. So a score stays
+valid for as long as both versions do. Entries are keyed by
+
+    (user_a, version_a, user_b, version_b)
+
+with the two users in sorted order, so (a, b) and (b, a) share one entry.
+The score itself is directional (goal and style pairs are not symmetric),
+so an entry keeps one result per direction. The TTL bounds staleness for
+writes that change matching fields without bumping the version.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from matching import AIMatchingService
+
+COMPATIBILITY_CACHE_SIZE = int(os.environ.get('COMPATIBILITY_CACHE_SIZE', 50000))
+COMPATIBILITY_CACHE_TTL_SECONDS = float(os.environ.get('COMPATIBILITY_CACHE_TTL_SECONDS', 3600))
+
+class CompatibilityCache:
+    def __init__(self, max_entries: int = COMPATIBILITY_CACHE_SIZE,
+                 ttl_seconds: float = COMPATIBILITY_CACHE_TTL_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        # key -> (expires_at, {forward: result})
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(user_a: dict, user_b: dict) -> Tuple[tuple, bool]:
+        """(canonical key, whether user_a comes first in it)"""
+        a = (user_a["user_id"], user_a.get("profile_version", 0))
+        b = (user_b["user_id"], user_b.get("profile_version", 0))
+        forward = a[0] <= b[0]
+        return (a + b if forward else b + a), forward
+
+    def get(self, user_a: dict, user_b: dict) -> Optional[dict]:
+        """Cached calculate_compatibility_score(user_a, user_b), or None"""
+        key, forward = self.key(user_a, user_b)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= self.clock():
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+        if entry is None or forward not in entry[1]:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1][forward]
+
+    def put(self, user_a: dict, user_b: dict, result: dict):
+        key, forward = self.key(user_a, user_b)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = (self.clock() + self.ttl_seconds, {})
+            self._entries[key] = entry
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._entries.move_to_end(key)
+        entry[1][forward] = result
+
+    def score(self, user_a: dict, user_b: dict) -> dict:
+        """calculate_compatibility_score(user_a, user_b) through the cache; treat the result as read-only"""
+        result = self.get(user_a, user_b)
+        if result is None:
+            result = AIMatchingService.calculate_compatibility_score(user_a, user_b)
+            self.put(user_a, user_b, result)
+        return result
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+compatibility_cache = CompatibilityCache()
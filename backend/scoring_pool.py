@@ -0,0 +1,100 @@
+"""Process pool for CPU-bound compatibility scoring.
+
+Scoring a large candidate set on the event loop stalls every other request
+and websocket on the worker. Live recommendation scoring above
+``SCORING_OFFLOAD_MIN`` candidates runs here instead. The candidates are
+split into chunks of ``SCORING_CHUNK_SIZE`` and scored in a
+``ProcessPoolExecutor`` of ``SCORING_POOL_WORKERS`` processes, so one
+request spreads across cores. Callers pass the request's deadline as a
+``time.monotonic()`` instant, so every scoring call of one request shares
+it; without one, a call gets ``SCORING_DEADLINE_SECONDS``. Scoring still
+running at the deadline raises ``ScoringDeadlineExceeded``, and its chunks
+that haven't started are cancelled.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from matching import MATCHING_FIELDS, BatchCompatibilityScorer, CandidateFeatures, ProfileEncoder
+
+SCORING_POOL_WORKERS = int(os.environ.get('SCORING_POOL_WORKERS', os.cpu_count() or 1))
+SCORING_CHUNK_SIZE = int(os.environ.get('SCORING_CHUNK_SIZE', 5000))
+SCORING_DEADLINE_SECONDS = float(os.environ.get('SCORING_DEADLINE_SECONDS', 5))
+# Below this, pickling candidates to the pool costs more than scoring inline
+SCORING_OFFLOAD_MIN = int(os.environ.get('SCORING_OFFLOAD_MIN', 20000))
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+class ScoringDeadlineExceeded(Exception):
+    """Scoring didn't finish within the request's deadline"""
+
+def get_executor() -> ProcessPoolExecutor:
+    """The shared pool, started on first use"""
+    global _executor
+    if _executor is None:
+        # Forking the server would copy its event loop, motor client and their threads into every worker
+        _executor = ProcessPoolExecutor(
+            max_workers=SCORING_POOL_WORKERS, mp_context=multiprocessing.get_context("forkserver")
+        )
+    return _executor
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def _score_profiles(user: dict, candidates: List[dict], as_candidate: bool) -> np.ndarray:
+    return BatchCompatibilityScorer(candidates).score(user, as_candidate)['compatibility_percentage']
+
+def _score_features(user: dict, encoder: ProfileEncoder, features: CandidateFeatures, fallback: list,
+                    as_candidate: bool) -> np.ndarray:
+    scorer = BatchCompatibilityScorer.from_features(encoder, features, features.capacity, fallback)
+    return scorer.score(user, as_candidate)['compatibility_percentage']
+
+async def _run_chunks(function: Callable, chunks: List[tuple], deadline: Optional[float]) -> np.ndarray:
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    futures = [loop.run_in_executor(executor, function, *args) for args in chunks]
+    timeout = SCORING_DEADLINE_SECONDS if deadline is None else max(deadline - time.monotonic(), 0)
+    try:
+        results = await asyncio.wait_for(asyncio.gather(*futures), timeout)
+    except asyncio.TimeoutError:
+        for future in futures:
+            future.cancel()
+        raise ScoringDeadlineExceeded()
+    return np.concatenate(results) if results else np.zeros(0, dtype=np.int64)
+
+async def score_profiles(user: dict, candidates: List[dict], as_candidate: bool = False,
+                         deadline: Optional[float] = None) -> np.ndarray:
+    """Percentages of user against raw candidate documents, aligned with candidates"""
+    if len(candidates) < SCORING_OFFLOAD_MIN:
+        return _score_profiles(user, candidates, as_candidate)
+    user = {field: user[field] for field in MATCHING_FIELDS if field in user}
+    # Workers only need the matching fields
+    profiles = [{field: c[field] for field in MATCHING_FIELDS if field in c} for c in candidates]
+    return await _run_chunks(_score_profiles, [
+        (user, profiles[start:start + SCORING_CHUNK_SIZE], as_candidate)
+        for start in range(0, len(profiles), SCORING_CHUNK_SIZE)
+    ], deadline)
+
+async def score_features(user: dict, encoder: ProfileEncoder, features: CandidateFeatures, fallback: list,
+                         as_candidate: bool = False, deadline: Optional[float] = None) -> np.ndarray:
+    """Percentages of user against every row of features, always in the pool
+
+    fallback is [(row, profile)] as in from_features. Callers holding
+    features in-process score small sets inline instead (see SCORING_OFFLOAD_MIN).
+    """
+    size = features.capacity
+    user = {field: user[field] for field in MATCHING_FIELDS if field in user}
+    chunks = []
+    for start in range(0, size, SCORING_CHUNK_SIZE):
+        stop = min(start + SCORING_CHUNK_SIZE, size)
+        chunk_fallback = [(row - start, profile) for row, profile in fallback if start <= row < stop]
+        chunks.append((user, encoder, features.take(np.arange(start, stop)), chunk_fallback, as_candidate))
+    return await _run_chunks(_score_features, chunks, deadline)
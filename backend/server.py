@@ -5,63 +5,52 @@ import hashlib
 import secrets
 from datetime import datetime, timedelta, timedelta
 from typing import List, Optional
-from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect, UploadFile, File
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse, JSONResponse
 from fastapi.exceptions import RequestValidationError
 from pydantic import BaseModel, EmailStr
-from pymongo import MongoClient
 import asyncio
 import json
+import time
 from authlib.integrations.starlette_client import OAuth
 from starlette.config import Config
 import bcrypt
-
-# Database setup
-MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-DB_NAME = os.environ.get('DB_NAME', 'solm8_db')
-
-# Handle MongoDB Atlas connection with proper SSL and authentication
-try:
-    if 'mongodb+srv://' in MONGO_URL or 'mongodb.net' in MONGO_URL:
-        # MongoDB Atlas connection
-        client = MongoClient(MONGO_URL, tls=True, tlsAllowInvalidCertificates=False)
-    else:
-        # Local MongoDB connection
-        client = MongoClient(MONGO_URL)
-    
-    # Test connection
-    client.admin.command('ping')
-    print(f"✅ MongoDB connected successfully to: {MONGO_URL}")
-    
-    # Use environment variable for database name
-    db = client[DB_NAME]
-    
-except Exception as e:
-    print(f"❌ MongoDB connection failed: {e}")
-    print(f"MONGO_URL: {MONGO_URL}")
-    print(f"DB_NAME: {DB_NAME}")
-    # Re-raise to prevent app from starting with broken DB
-    raise
-
-# Collections
-users_collection = db.users
-matches_collection = db.matches
-messages_collection = db.messages
-swipes_collection = db.swipes
-profile_images_collection = db.profile_images
-trading_highlights_collection = db.trading_highlights
-social_links_collection = db.social_links
-token_launch_profiles_collection = db.token_launch_profiles
-referrals_collection = db.referrals
-subscriptions_collection = db.subscriptions
-swipe_history_collection = db.swipe_history
-likes_received_collection = db.likes_received
-portfolio_connections_collection = db.portfolio_connections
-trading_signals_collection = db.trading_signals
-trading_groups_collection = db.trading_groups
-trading_calendar_collection = db.trading_calendar
-analytics_collection = db.analytics
+import numpy as np
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from database import (
+    client, db, DB_NAME, verify_connection, fetch_all,
+    users_collection, matches_collection, messages_collection, swipes_collection,
+    profile_images_collection, trading_highlights_collection, social_links_collection,
+    token_launch_profiles_collection, referrals_collection, subscriptions_collection,
+    portfolio_connections_collection,
+    trading_signals_collection, trading_groups_collection, trading_calendar_collection,
+    analytics_collection, read_status_collection, swipe_exclusions_collection, discovery_queues_collection,
+    recommendations_collection, swipe_quotas_collection
+)
+from discovery_queue import (
+    discovery_query, next_candidates, pop_candidate, pop_candidates, push_candidate_front, schedule_refill
+)
+from matching import MATCHING_FIELDS, UnencodableProfile, top_k_rows
+from score_cache import compatibility_cache
+from feature_store import ANYTIME_CHUNK_ROWS, feature_store
+from recommendations import (
+    RECOMMENDATION_HEADERS, precomputed_recommendations, remove_from_recommendations, schedule_rescore,
+    set_recommendation_headers
+)
+import scoring_pool
+from scoring_pool import ScoringDeadlineExceeded, score_profiles
+from swipe_quota import FREE_DAILY_SWIPE_LIMIT, consume_swipe, consume_swipes, refund_swipe, swipes_used_today
+from exclusions import seen_update, next_user_seq, mark_seen, unmark_seen, load_seen_set, iter_unseen_users, find_unseen_users
+from indexes import ensure_indexes
+from loaders import user_card_loader, user_profile_loader, token_launch_profile_loader
+from message_previews import last_message_snapshot
+from pagination import (
+    CURSOR_HEADERS, DEFAULT_PAGE_SIZE, clamp_page_size, encode_cursor, decode_cursor, keyset_filter,
+    set_cursor_headers, paginate
+)
 
 # Authentication utilities
 def hash_password(password: str) -> str:
@@ -131,6 +120,7 @@ if ENVIRONMENT == 'production':
         allow_credentials=True,
         allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
         allow_headers=["*"],
+        expose_headers=CURSOR_HEADERS + RECOMMENDATION_HEADERS,
     )
 else:
     # More permissive CORS for development
@@ -140,8 +130,19 @@ else:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=CURSOR_HEADERS + RECOMMENDATION_HEADERS,
     )
 
+@app.on_event("startup")
+async def startup_db_check():
+    """Verify MongoDB connectivity and apply the index registry before serving requests"""
+    await verify_connection()
+    await ensure_indexes()
+
+@app.on_event("shutdown")
+async def shutdown_scoring_pool():
+    scoring_pool.shutdown()
+
 # Global exception handlers for production
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -244,6 +245,14 @@ class SwipeAction(BaseModel):
     target_id: str
     action: str  # "like" or "pass"
 
+class QueuedSwipe(BaseModel):
+    target_id: str
+    action: str  # "like" or "pass"
+
+class SwipeBatch(BaseModel):
+    swiper_id: str
+    swipes: List[QueuedSwipe]  # in the order they were made
+
 class ChatMessage(BaseModel):
     match_id: str
     sender_id: str
@@ -357,9 +366,9 @@ class UserAnalytics(BaseModel):
     last_updated: datetime
 
 # Premium utility functions
-def get_user_subscription(user_id: str) -> dict:
+async def get_user_subscription(user_id: str) -> dict:
     """Get user's current subscription status"""
-    subscription = subscriptions_collection.find_one({"user_id": user_id})
+    subscription = await subscriptions_collection.find_one({"user_id": user_id})
     if not subscription:
         # Create free tier entry if doesn't exist
         free_sub = {
@@ -369,13 +378,13 @@ def get_user_subscription(user_id: str) -> dict:
             "created_at": datetime.utcnow(),
             "expires_at": None
         }
-        subscriptions_collection.insert_one(free_sub)
+        await subscriptions_collection.insert_one(free_sub)
         return free_sub
     
     # Check if premium subscription is expired
     if subscription.get("expires_at") and subscription["expires_at"] < datetime.utcnow():
         # Downgrade to free
-        subscriptions_collection.update_one(
+        await subscriptions_collection.update_one(
             {"user_id": user_id},
             {"$set": {"plan_type": "free", "status": "expired"}}
         )
@@ -384,25 +393,21 @@ def get_user_subscription(user_id: str) -> dict:
     
     return subscription
 
-def check_swipe_limit(user_id: str) -> dict:
+async def check_swipe_limit(user_id: str) -> dict:
     """Check if user has reached daily swipe limit"""
-    subscription = get_user_subscription(user_id)
+    subscription = await get_user_subscription(user_id)
     
+    # Check daily swipe count for free users
+    today_swipes = await swipes_used_today(user_id) if subscription["plan_type"] == "free" else 0
+    return swipe_limit_status(subscription, today_swipes)
+
+def swipe_limit_status(subscription: dict, today_swipes: int) -> dict:
+    """Daily swipe allowance for a subscription that has already swiped today_swipes times"""
     # Premium users have unlimited swipes
     if subscription["plan_type"] != "free":
         return {"can_swipe": True, "swipes_remaining": "unlimited", "is_premium": True}
     
-    # Check daily swipe count for free users
-    today = datetime.utcnow().strftime("%Y-%m-%d")
-    today_swipes = swipes_collection.count_documents({
-        "swiper_id": user_id,
-        "swiped_at": {
-            "$gte": datetime.strptime(today, "%Y-%m-%d"),
-            "$lt": datetime.strptime(today, "%Y-%m-%d") + timedelta(days=1)
-        }
-    })
-    
-    daily_limit = 20  # Free tier limit
+    daily_limit = FREE_DAILY_SWIPE_LIMIT
     swipes_remaining = max(0, daily_limit - today_swipes)
     
     return {
@@ -413,50 +418,50 @@ def check_swipe_limit(user_id: str) -> dict:
         "is_premium": False
     }
 
-def can_see_likes(user_id: str) -> bool:
+async def can_see_likes(user_id: str) -> bool:
     """Check if user can see who liked them"""
-    subscription = get_user_subscription(user_id)
+    subscription = await get_user_subscription(user_id)
     return subscription["plan_type"] != "free"
 
-def can_rewind_swipe(user_id: str) -> bool:
+async def can_rewind_swipe(user_id: str) -> bool:
     """Check if user can rewind last swipe"""
-    subscription = get_user_subscription(user_id)
+    subscription = await get_user_subscription(user_id)
     return subscription["plan_type"] != "free"
 
-def get_priority_boost(user_id: str) -> bool:
+async def get_priority_boost(user_id: str) -> bool:
     """Check if user gets priority in discovery"""
-    subscription = get_user_subscription(user_id)
+    subscription = await get_user_subscription(user_id)
     return subscription["plan_type"] != "free"
 
-def can_send_trading_signals(user_id: str) -> bool:
+async def can_send_trading_signals(user_id: str) -> bool:
     """Check if user can send trading signals (Pro Trader feature)"""
-    subscription = get_user_subscription(user_id)
+    subscription = await get_user_subscription(user_id)
     return subscription["plan_type"] == "pro_trader"
 
-def can_create_groups(user_id: str) -> bool:
+async def can_create_groups(user_id: str) -> bool:
     """Check if user can create trading groups (Pro Trader feature)"""
-    subscription = get_user_subscription(user_id)
+    subscription = await get_user_subscription(user_id)
     return subscription["plan_type"] == "pro_trader"
 
-def can_schedule_events(user_id: str) -> bool:
+async def can_schedule_events(user_id: str) -> bool:
     """Check if user can schedule trading events (Pro Trader feature)"""
-    subscription = get_user_subscription(user_id)
+    subscription = await get_user_subscription(user_id)
     return subscription["plan_type"] == "pro_trader"
 
-def can_view_analytics(user_id: str) -> bool:
+async def can_view_analytics(user_id: str) -> bool:
     """Check if user can view performance analytics (Pro Trader feature)"""
-    subscription = get_user_subscription(user_id)
+    subscription = await get_user_subscription(user_id)
     return subscription["plan_type"] == "pro_trader"
 
-def can_connect_portfolio(user_id: str) -> bool:
+async def can_connect_portfolio(user_id: str) -> bool:
     """Check if user can connect portfolio (Pro Trader feature)"""
-    subscription = get_user_subscription(user_id)
+    subscription = await get_user_subscription(user_id)
     return subscription["plan_type"] == "pro_trader"
 
-def update_user_analytics(user_id: str, action_type: str):
+async def update_user_analytics(user_id: str, action_type: str):
     """Update user analytics for Pro Trader features"""
     try:
-        current_analytics = analytics_collection.find_one({"user_id": user_id})
+        current_analytics = await analytics_collection.find_one({"user_id": user_id})
         
         if not current_analytics:
             # Create new analytics entry
@@ -470,7 +475,7 @@ def update_user_analytics(user_id: str, action_type: str):
                 "match_success_rate": 0.0,
                 "last_updated": datetime.utcnow()
             }
-            analytics_collection.insert_one(analytics_data)
+            await analytics_collection.insert_one(analytics_data)
             current_analytics = analytics_data
         
         # Update based on action type
@@ -488,12 +493,12 @@ def update_user_analytics(user_id: str, action_type: str):
             update_data["groups_created"] = current_analytics.get("groups_created", 0) + 1
         
         # Calculate match success rate
-        swipes_made = swipes_collection.count_documents({"swiper_id": user_id, "action": "like"})
+        swipes_made = await swipes_collection.count_documents({"swiper_id": user_id, "action": "like"})
         matches_made = current_analytics.get("matches_made", 0)
         if swipes_made > 0:
             update_data["match_success_rate"] = round((matches_made / swipes_made) * 100, 2)
         
-        analytics_collection.update_one(
+        await analytics_collection.update_one(
             {"user_id": user_id},
             {"$set": update_data}
         )
@@ -502,14 +507,14 @@ def update_user_analytics(user_id: str, action_type: str):
         print(f"Error updating analytics: {e}")
 
 # Referral utility functions
-def generate_referral_code(user_id: str) -> str:
+async def generate_referral_code(user_id: str) -> str:
     """Generate a unique referral code for a user"""
     # Create a unique code based on user ID and random string
     import hashlib
     import time
     
     # Get user data to create a more personalized code
-    user = users_collection.find_one({"user_id": user_id})
+    user = await users_collection.find_one({"user_id": user_id})
     if user:
         username = user.get('username', '')
         # Create code: first 3 letters of username + 4 random chars
@@ -523,7 +528,7 @@ def generate_referral_code(user_id: str) -> str:
         referral_code = f"{prefix}{timestamp}"
         
         # Ensure it's unique
-        while referrals_collection.find_one({"referral_code": referral_code}):
+        while await referrals_collection.find_one({"referral_code": referral_code}):
             timestamp = str(int(time.time() * 1000))[-4:]
             referral_code = f"{prefix}{timestamp}"
         
@@ -532,7 +537,7 @@ def generate_referral_code(user_id: str) -> str:
         # Fallback random code
         return f"SOL{secrets.token_hex(4)[:6].upper()}"
 
-def create_referral_entry(user_id: str, referral_code: str) -> dict:
+async def create_referral_entry(user_id: str, referral_code: str) -> dict:
     """Create a referral entry in the database"""
     referral_data = {
         "referral_id": str(uuid.uuid4()),
@@ -545,14 +550,14 @@ def create_referral_entry(user_id: str, referral_code: str) -> dict:
         "bonus_awarded": False
     }
     
-    referrals_collection.insert_one(referral_data)
+    await referrals_collection.insert_one(referral_data)
     return referral_data
 
-def process_referral_signup(referred_user_id: str, referral_code: str) -> bool:
+async def process_referral_signup(referred_user_id: str, referral_code: str) -> bool:
     """Process a referral when someone signs up with a referral code"""
     try:
         # Find the referral entry
-        referral = referrals_collection.find_one({
+        referral = await referrals_collection.find_one({
             "referral_code": referral_code,
             "status": "pending"
         })
@@ -561,7 +566,7 @@ def process_referral_signup(referred_user_id: str, referral_code: str) -> bool:
             return False
         
         # Update the referral with the new user
-        referrals_collection.update_one(
+        await referrals_collection.update_one(
             {"referral_id": referral["referral_id"]},
             {
                 "$set": {
@@ -596,359 +601,6 @@ class WalletAuth(BaseModel):
     signature: str
     message: str
 
-# AI Matching Algorithm
-class AIMatchingService:
-    @staticmethod
-    def calculate_compatibility_score(user1: dict, user2: dict) -> dict:
-        """Calculate AI compatibility score between two users"""
-        score_breakdown = {}
-        total_score = 0
-        max_possible_score = 0
-        
-        # 1. Experience Level Compatibility (Weight: 20)
-        experience_score = AIMatchingService._calculate_experience_compatibility(
-            user1.get('trading_experience', ''), 
-            user2.get('trading_experience', ''),
-            user1.get('years_trading', 0),
-            user2.get('years_trading', 0)
-        )
-        score_breakdown['experience'] = experience_score
-        total_score += experience_score['score']
-        max_possible_score += experience_score['max_score']
-        
-        # 2. Platform Compatibility (Weight: 25)
-        platform_score = AIMatchingService._calculate_platform_compatibility(
-            user1.get('preferred_trading_platform', ''),
-            user2.get('preferred_trading_platform', ''),
-            user1.get('preferred_communication_platform', ''),
-            user2.get('preferred_communication_platform', '')
-        )
-        score_breakdown['platform'] = platform_score
-        total_score += platform_score['score']
-        max_possible_score += platform_score['max_score']
-        
-        # 3. Token Interest Overlap (Weight: 20)
-        token_score = AIMatchingService._calculate_token_compatibility(
-            user1.get('preferred_tokens', []),
-            user2.get('preferred_tokens', [])
-        )
-        score_breakdown['tokens'] = token_score
-        total_score += token_score['score']
-        max_possible_score += token_score['max_score']
-        
-        # 4. Goal Alignment (Weight: 15)
-        goal_score = AIMatchingService._calculate_goal_compatibility(
-            user1.get('looking_for', []),
-            user2.get('looking_for', [])
-        )
-        score_breakdown['goals'] = goal_score
-        total_score += goal_score['score']
-        max_possible_score += goal_score['max_score']
-        
-        # 5. Trading Style & Risk Compatibility (Weight: 10)
-        style_score = AIMatchingService._calculate_style_compatibility(
-            user1.get('trading_style', ''),
-            user2.get('trading_style', ''),
-            user1.get('risk_tolerance', ''),
-            user2.get('risk_tolerance', '')
-        )
-        score_breakdown['style'] = style_score
-        total_score += style_score['score']
-        max_possible_score += style_score['max_score']
-        
-        # 6. Communication & Schedule Compatibility (Weight: 10)
-        communication_score = AIMatchingService._calculate_communication_compatibility(
-            user1.get('communication_style', ''),
-            user2.get('communication_style', ''),
-            user1.get('trading_hours', ''),
-            user2.get('trading_hours', '')
-        )
-        score_breakdown['communication'] = communication_score
-        total_score += communication_score['score']
-        max_possible_score += communication_score['max_score']
-        
-        # Calculate final percentage
-        compatibility_percentage = int((total_score / max_possible_score) * 100) if max_possible_score > 0 else 0
-        
-        return {
-            'compatibility_percentage': compatibility_percentage,
-            'total_score': total_score,
-            'max_possible_score': max_possible_score,
-            'breakdown': score_breakdown,
-            'recommendations': AIMatchingService._generate_recommendations(score_breakdown, user1, user2)
-        }
-    
-    @staticmethod
-    def _calculate_experience_compatibility(exp1: str, exp2: str, years1: int, years2: int) -> dict:
-        """Calculate experience level compatibility"""
-        experience_levels = {'Beginner': 1, 'Intermediate': 2, 'Advanced': 3, 'Expert': 4}
-        
-        level1 = experience_levels.get(exp1, 0)
-        level2 = experience_levels.get(exp2, 0)
-        
-        if level1 == 0 or level2 == 0:
-            return {'score': 0, 'max_score': 20, 'reason': 'Missing experience information'}
-        
-        diff = abs(level1 - level2)
-        
-        # Perfect for mentoring: beginner with intermediate+
-        if (level1 == 1 and level2 >= 2) or (level2 == 1 and level1 >= 2):
-            score = 18
-            reason = "Perfect for mentoring relationship"
-        # Same level - great for peer learning
-        elif diff == 0:
-            score = 20
-            reason = "Same experience level - ideal for peer collaboration"
-        # One level apart - good compatibility
-        elif diff == 1:
-            score = 15
-            reason = "Similar experience levels - good match"
-        # Two levels apart - some compatibility
-        elif diff == 2:
-            score = 10
-            reason = "Different experience levels - moderate match"
-        else:
-            score = 5
-            reason = "Very different experience levels"
-        
-        # Bonus for similar years of experience
-        year_diff = abs(years1 - years2)
-        if year_diff <= 1:
-            score = min(score + 2, 20)
-        
-        return {'score': score, 'max_score': 20, 'reason': reason}
-    
-    @staticmethod
-    def _calculate_platform_compatibility(trading_platform1: str, trading_platform2: str, 
-                                        comm_platform1: str, comm_platform2: str) -> dict:
-        """Calculate platform compatibility"""
-        score = 0
-        reasons = []
-        
-        # Trading platform compatibility (15 points)
-        if trading_platform1 and trading_platform2:
-            if trading_platform1 == trading_platform2:
-                score += 15
-                reasons.append(f"Both use {trading_platform1} for trading")
-            else:
-                score += 5
-                reasons.append("Different trading platforms")
-        else:
-            score += 3
-            reasons.append("Missing trading platform info")
-        
-        # Communication platform compatibility (10 points)
-        if comm_platform1 and comm_platform2:
-            if comm_platform1 == comm_platform2:
-                score += 10
-                reasons.append(f"Both prefer {comm_platform1} for communication")
-            else:
-                score += 3
-                reasons.append("Different communication preferences")
-        else:
-            score += 2
-            reasons.append("Missing communication platform info")
-        
-        return {'score': score, 'max_score': 25, 'reason': '; '.join(reasons)}
-    
-    @staticmethod
-    def _calculate_token_compatibility(tokens1: List[str], tokens2: List[str]) -> dict:
-        """Calculate token interest overlap"""
-        if not tokens1 or not tokens2:
-            return {'score': 5, 'max_score': 20, 'reason': 'Missing token preferences'}
-        
-        overlap = set(tokens1) & set(tokens2)
-        total_unique = set(tokens1) | set(tokens2)
-        
-        if not total_unique:
-            return {'score': 0, 'max_score': 20, 'reason': 'No token preferences specified'}
-        
-        overlap_ratio = len(overlap) / len(total_unique)
-        score = int(20 * overlap_ratio)
-        
-        if len(overlap) >= 3:
-            reason = f"Strong overlap in {len(overlap)} token categories"
-        elif len(overlap) >= 2:
-            reason = f"Good overlap in {len(overlap)} token categories"
-        elif len(overlap) == 1:
-            reason = f"Some overlap in token interests"
-        else:
-            reason = "Different token interests - good for diversification"
-            score = max(score, 5)  # Minimum score for diversity
-        
-        return {'score': score, 'max_score': 20, 'reason': reason}
-    
-    @staticmethod
-    def _calculate_goal_compatibility(goals1: List[str], goals2: List[str]) -> dict:
-        """Calculate goal alignment - complementary goals score higher"""
-        if not goals1 or not goals2:
-            return {'score': 3, 'max_score': 15, 'reason': 'Missing goal information'}
-        
-        # Complementary pairs that work well together
-        complementary_pairs = [
-            ('Learning', 'Teaching'),
-            ('Teaching', 'Learning'),
-            ('Alpha Sharing', 'Alpha Sharing'),
-            ('Research Partner', 'Research Partner'),
-            ('Risk Management', 'Teaching'),
-            ('Networking', 'Networking')
-        ]
-        
-        score = 0
-        reasons = []
-        
-        # Check for perfect complementary matches
-        for goal1 in goals1:
-            for goal2 in goals2:
-                if (goal1, goal2) in complementary_pairs:
-                    score += 8
-                    if goal1 == goal2:
-                        reasons.append(f"Both interested in {goal1}")
-                    else:
-                        reasons.append(f"Perfect match: {goal1} ↔ {goal2}")
-        
-        # Check for any overlap
-        overlap = set(goals1) & set(goals2)
-        if overlap and not reasons:
-            score += len(overlap) * 3
-            reasons.append(f"Shared interests: {', '.join(overlap)}")
-        
-        # Minimum score for having goals
-        if not reasons:
-            score = 2
-            reasons.append("Different goals - potential for diverse perspectives")
-        
-        score = min(score, 15)  # Cap at max score
-        return {'score': score, 'max_score': 15, 'reason': '; '.join(reasons)}
-    
-    @staticmethod
-    def _calculate_style_compatibility(style1: str, style2: str, risk1: str, risk2: str) -> dict:
-        """Calculate trading style and risk compatibility"""
-        score = 0
-        reasons = []
-        
-        # Trading style compatibility (6 points)
-        compatible_styles = {
-            'Day Trader': ['Day Trader', 'Scalper'],
-            'Swing Trader': ['Swing Trader', 'Long-term Investor'],
-            'HODLer': ['HODLer', 'Long-term Investor'],
-            'Scalper': ['Scalper', 'Day Trader'],
-            'Long-term Investor': ['Long-term Investor', 'HODLer', 'Swing Trader'],
-            'Arbitrage': ['Arbitrage', 'Day Trader', 'Scalper']
-        }
-        
-        if style1 and style2:
-            if style1 == style2:
-                score += 6
-                reasons.append(f"Same trading style: {style1}")
-            elif style2 in compatible_styles.get(style1, []):
-                score += 4
-                reasons.append(f"Compatible trading styles")
-            else:
-                score += 2
-                reasons.append("Different trading styles")
-        
-        # Risk tolerance compatibility (4 points)
-        risk_levels = {'Conservative': 1, 'Moderate': 2, 'Aggressive': 3, 'YOLO': 4}
-        
-        if risk1 and risk2:
-            level1 = risk_levels.get(risk1, 0)
-            level2 = risk_levels.get(risk2, 0)
-            
-            if level1 and level2:
-                diff = abs(level1 - level2)
-                if diff == 0:
-                    score += 4
-                    reasons.append(f"Same risk tolerance: {risk1}")
-                elif diff == 1:
-                    score += 3
-                    reasons.append("Similar risk tolerance")
-                else:
-                    score += 1
-                    reasons.append("Different risk tolerance")
-        
-        return {'score': score, 'max_score': 10, 'reason': '; '.join(reasons)}
-    
-    @staticmethod
-    def _calculate_communication_compatibility(comm_style1: str, comm_style2: str, 
-                                             hours1: str, hours2: str) -> dict:
-        """Calculate communication and schedule compatibility"""
-        score = 0
-        reasons = []
-        
-        # Communication style (6 points)
-        if comm_style1 and comm_style2:
-            if comm_style1 == comm_style2:
-                score += 6
-                reasons.append(f"Same communication style: {comm_style1}")
-            else:
-                compatible_pairs = [
-                    ('Professional', 'Technical'),
-                    ('Technical', 'Professional'),
-                    ('Casual', 'Friendly'),
-                    ('Friendly', 'Casual')
-                ]
-                if (comm_style1, comm_style2) in compatible_pairs:
-                    score += 4
-                    reasons.append("Compatible communication styles")
-                else:
-                    score += 2
-                    reasons.append("Different communication styles")
-        
-        # Trading hours compatibility (4 points)
-        if hours1 and hours2:
-            if hours1 == hours2:
-                score += 4
-                reasons.append(f"Same trading hours: {hours1}")
-            elif hours1 == '24/7' or hours2 == '24/7':
-                score += 3
-                reasons.append("Flexible trading hours")
-            else:
-                # Check for overlapping time periods
-                overlap_score = 2
-                score += overlap_score
-                reasons.append("Different trading hours")
-        
-        return {'score': score, 'max_score': 10, 'reason': '; '.join(reasons)}
-    
-    @staticmethod
-    def _generate_recommendations(breakdown: dict, user1: dict, user2: dict) -> List[str]:
-        """Generate AI recommendations based on compatibility analysis"""
-        recommendations = []
-        
-        # Experience-based recommendations
-        exp_score = breakdown.get('experience', {}).get('score', 0)
-        if exp_score >= 18:
-            recommendations.append("🎯 Perfect for mentoring or peer collaboration")
-        elif exp_score >= 15:
-            recommendations.append("📈 Great match for skill development")
-        
-        # Platform-based recommendations
-        platform_score = breakdown.get('platform', {}).get('score', 0)
-        if platform_score >= 20:
-            recommendations.append("🔗 Same platforms - easy to share strategies")
-        elif platform_score >= 15:
-            recommendations.append("⚡ Compatible trading setup")
-        
-        # Token-based recommendations
-        token_score = breakdown.get('tokens', {}).get('score', 0)
-        if token_score >= 15:
-            recommendations.append("💎 Strong shared interest in token categories")
-        elif token_score <= 5:
-            recommendations.append("🌐 Different interests - great for diversification")
-        
-        # Goal-based recommendations
-        goal_score = breakdown.get('goals', {}).get('score', 0)
-        if goal_score >= 12:
-            recommendations.append("🤝 Perfectly aligned trading goals")
-        elif goal_score >= 8:
-            recommendations.append("📚 Complementary learning objectives")
-        
-        if not recommendations:
-            recommendations.append("🔍 Potential for unique trading perspectives")
-        
-        return recommendations[:3]  # Limit to top 3 recommendations
-
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
@@ -977,14 +629,14 @@ async def email_signup(signup_data: EmailSignup):
     """Sign up with email and password"""
     try:
         # Check if email already exists
-        existing_user = users_collection.find_one({"email": signup_data.email})
+        existing_user = await users_collection.find_one({"email": signup_data.email})
         if existing_user:
             raise HTTPException(status_code=400, detail="Email already registered")
         
         # Validate referral code if provided
         referral_valid = False
         if signup_data.referral_code:
-            referral = referrals_collection.find_one({
+            referral = await referrals_collection.find_one({
                 "referral_code": signup_data.referral_code,
                 "status": "pending"
             })
@@ -1006,13 +658,14 @@ async def email_signup(signup_data: EmailSignup):
         
         # Add password hash (not stored in main profile for security)
         user_data["password_hash"] = hashed_password
+        user_data["user_seq"] = await next_user_seq()
         
         # Insert user
-        users_collection.insert_one(user_data)
+        await users_collection.insert_one(user_data)
         
         # Process referral if valid
         if referral_valid and signup_data.referral_code:
-            process_referral_signup(user_data["user_id"], signup_data.referral_code)
+            await process_referral_signup(user_data["user_id"], signup_data.referral_code)
         
         # Remove sensitive data before returning
         user_data.pop('_id', None)
@@ -1035,7 +688,7 @@ async def email_login(login_data: EmailLogin):
     """Login with email and password"""
     try:
         # Find user by email
-        user = users_collection.find_one({"email": login_data.email})
+        user = await users_collection.find_one({"email": login_data.email})
         if not user:
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
@@ -1044,7 +697,7 @@ async def email_login(login_data: EmailLogin):
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
         # Update last activity
-        users_collection.update_one(
+        await users_collection.update_one(
             {"email": login_data.email},
             {"$set": {"last_active": datetime.utcnow(), "user_status": "active"}}
         )
@@ -1070,11 +723,11 @@ async def wallet_connect(wallet_data: WalletAuth):
             raise HTTPException(status_code=400, detail="Invalid wallet address")
         
         # Check if wallet already exists
-        existing_user = users_collection.find_one({"wallet_address": wallet_data.wallet_address})
+        existing_user = await users_collection.find_one({"wallet_address": wallet_data.wallet_address})
         
         if existing_user:
             # Update last activity
-            users_collection.update_one(
+            await users_collection.update_one(
                 {"wallet_address": wallet_data.wallet_address},
                 {"$set": {"last_active": datetime.utcnow(), "user_status": "active"}}
             )
@@ -1090,9 +743,10 @@ async def wallet_connect(wallet_data: WalletAuth):
                 "username": f"wallet_{secrets.token_hex(4)}",
                 "auth_method": "wallet"
             })
+            user_data["user_seq"] = await next_user_seq()
             
             # Insert user
-            users_collection.insert_one(user_data)
+            await users_collection.insert_one(user_data)
             
             # Remove sensitive data before returning
             user_data.pop('_id', None)
@@ -1116,17 +770,17 @@ async def get_wallet_message():
 @app.get("/api/public-profile/{username}")
 async def get_public_profile(username: str):
     """Get public profile by username for sharing"""
-    user = users_collection.find_one({"username": username})
+    user = await users_collection.find_one({"username": username})
     if not user:
         raise HTTPException(status_code=404, detail="Profile not found")
     
     # Get user's trading highlights
-    highlights = list(trading_highlights_collection.find({"user_id": user["user_id"]}))
+    highlights = await fetch_all(trading_highlights_collection.find({"user_id": user["user_id"]}))
     for highlight in highlights:
         highlight.pop('_id', None)
     
     # Get user's social links
-    social_links = social_links_collection.find_one({"user_id": user["user_id"]})
+    social_links = await social_links_collection.find_one({"user_id": user["user_id"]})
     if social_links:
         social_links.pop('_id', None)
     
@@ -1170,7 +824,7 @@ async def upload_trading_highlight(user_id: str, file: UploadFile = File(...)):
     """Upload a trading highlight image (PnL screenshot, achievement, etc.)"""
     try:
         # Validate user exists
-        user = users_collection.find_one({"user_id": user_id})
+        user = await users_collection.find_one({"user_id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -1200,7 +854,7 @@ async def save_trading_highlight(user_id: str, highlight_data: dict):
     """Save trading highlight with details"""
     try:
         # Validate user exists
-        user = users_collection.find_one({"user_id": user_id})
+        user = await users_collection.find_one({"user_id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -1217,7 +871,7 @@ async def save_trading_highlight(user_id: str, highlight_data: dict):
             "created_at": datetime.utcnow()
         }
         
-        trading_highlights_collection.insert_one(highlight)
+        await trading_highlights_collection.insert_one(highlight)
         highlight.pop('_id', None)
         
         return {"message": "Trading highlight saved successfully", "highlight": highlight}
@@ -1228,7 +882,7 @@ async def save_trading_highlight(user_id: str, highlight_data: dict):
 @app.get("/api/trading-highlights/{user_id}")
 async def get_trading_highlights(user_id: str):
     """Get all trading highlights for a user"""
-    highlights = list(trading_highlights_collection.find({"user_id": user_id}))
+    highlights = await fetch_all(trading_highlights_collection.find({"user_id": user_id}))
     for highlight in highlights:
         highlight.pop('_id', None)
     return highlights
@@ -1236,7 +890,7 @@ async def get_trading_highlights(user_id: str):
 @app.delete("/api/trading-highlights/{highlight_id}")
 async def delete_trading_highlight(highlight_id: str):
     """Delete a trading highlight"""
-    result = trading_highlights_collection.delete_one({"highlight_id": highlight_id})
+    result = await trading_highlights_collection.delete_one({"highlight_id": highlight_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Highlight not found")
     return {"message": "Highlight deleted successfully"}
@@ -1246,7 +900,7 @@ async def update_social_links(user_id: str, social_data: dict):
     """Update user's social media links"""
     try:
         # Validate user exists
-        user = users_collection.find_one({"user_id": user_id})
+        user = await users_collection.find_one({"user_id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -1261,7 +915,7 @@ async def update_social_links(user_id: str, social_data: dict):
         }
         
         # Upsert social links
-        social_links_collection.replace_one(
+        await social_links_collection.replace_one(
             {"user_id": user_id},
             social_links,
             upsert=True
@@ -1275,7 +929,7 @@ async def update_social_links(user_id: str, social_data: dict):
 @app.get("/api/social-links/{user_id}")
 async def get_social_links(user_id: str):
     """Get user's social media links"""
-    social_links = social_links_collection.find_one({"user_id": user_id})
+    social_links = await social_links_collection.find_one({"user_id": user_id})
     if social_links:
         social_links.pop('_id', None)
         return social_links
@@ -1288,7 +942,7 @@ async def update_user_status(user_id: str, status_update: UserStatusUpdate):
     """Update user's online/offline status"""
     try:
         # Validate user exists
-        user = users_collection.find_one({"user_id": user_id})
+        user = await users_collection.find_one({"user_id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -1297,7 +951,7 @@ async def update_user_status(user_id: str, status_update: UserStatusUpdate):
             raise HTTPException(status_code=400, detail="Status must be 'active' or 'offline'")
         
         # Update user status and last activity
-        users_collection.update_one(
+        await users_collection.update_one(
             {"user_id": user_id},
             {
                 "$set": {
@@ -1315,7 +969,7 @@ async def update_user_status(user_id: str, status_update: UserStatusUpdate):
 @app.get("/api/user-status/{user_id}")
 async def get_user_status(user_id: str):
     """Get user's current status"""
-    user = users_collection.find_one({"user_id": user_id})
+    user = await users_collection.find_one({"user_id": user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -1328,7 +982,7 @@ async def get_user_status(user_id: str):
     
     if last_activity < inactive_threshold and user.get('user_status') == 'active':
         # Auto-switch to offline
-        users_collection.update_one(
+        await users_collection.update_one(
             {"user_id": user_id},
             {"$set": {"user_status": "offline"}}
         )
@@ -1343,51 +997,48 @@ async def get_user_status(user_id: str):
     }
 
 @app.get("/api/users/active")
-async def get_active_users():
-    """Get list of currently active users"""
+async def get_active_users(response: Response, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    """Get a page of currently active users, most recently active first
+
+    Filters and pages on last_activity as a date; users stored with a
+    missing or string last_activity need ``python migrations.py last_activity``.
+    """
     try:
-        # Get all users who are marked as active
-        active_users = list(users_collection.find({"user_status": "active"}))
-        
-        # Filter out users who have been inactive for more than 30 minutes
+        # Users inactive for more than 30 minutes are switched to offline in bulk
         inactive_threshold = datetime.utcnow() - timedelta(minutes=30)
-        truly_active_users = []
-        users_to_update = []
+        await users_collection.update_many(
+            {"user_status": "active", "last_activity": {"$lt": inactive_threshold}},
+            {"$set": {"user_status": "offline"}}
+        )
+        
+        active_users, next_cursor = await paginate(
+            users_collection,
+            {"user_status": "active", "last_activity": {"$gte": inactive_threshold}},
+            ["last_activity", "user_id"],
+            descending=True,
+            limit=clamp_page_size(limit),
+            cursor=cursor,
+            projection={"_id": 0, "password_hash": 0, "twitter_id": 0}
+        )
+        set_cursor_headers(response, next_cursor=next_cursor)
         
+        truly_active_users = []
         for user in active_users:
-            last_activity = user.get('last_activity', datetime.utcnow())
-            if isinstance(last_activity, str):
-                last_activity = datetime.fromisoformat(last_activity.replace('Z', '+00:00'))
-            
-            if last_activity >= inactive_threshold:
-                # Remove sensitive data and MongoDB ObjectId
-                user.pop('_id', None)
-                user.pop('twitter_id', None)
-                truly_active_users.append({
-                    "user_id": user['user_id'],
-                    "username": user['username'],
-                    "display_name": user['display_name'],
-                    "avatar_url": user['avatar_url'],
-                    "bio": user.get('bio', ''),
-                    "location": user.get('location', ''),
-                    "timezone": user.get('timezone', ''),
-                    "trading_experience": user.get('trading_experience', ''),
-                    "trading_style": user.get('trading_style', ''),
-                    "preferred_tokens": user.get('preferred_tokens', []),
-                    "looking_for": user.get('looking_for', []),
-                    "interested_in_token_launch": user.get('interested_in_token_launch', False),
-                    "last_activity": user.get('last_activity')
-                })
-            else:
-                # Mark for status update
-                users_to_update.append(user['user_id'])
-        
-        # Bulk update inactive users to offline status
-        if users_to_update:
-            users_collection.update_many(
-                {"user_id": {"$in": users_to_update}},
-                {"$set": {"user_status": "offline"}}
-            )
+            truly_active_users.append({
+                "user_id": user['user_id'],
+                "username": user['username'],
+                "display_name": user['display_name'],
+                "avatar_url": user['avatar_url'],
+                "bio": user.get('bio', ''),
+                "location": user.get('location', ''),
+                "timezone": user.get('timezone', ''),
+                "trading_experience": user.get('trading_experience', ''),
+                "trading_style": user.get('trading_style', ''),
+                "preferred_tokens": user.get('preferred_tokens', []),
+                "looking_for": user.get('looking_for', []),
+                "interested_in_token_launch": user.get('interested_in_token_launch', False),
+                "last_activity": user.get('last_activity')
+            })
         
         return {
             "active_users": truly_active_users,
@@ -1395,6 +1046,8 @@ async def get_active_users():
             "last_updated": datetime.utcnow()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get active users: {str(e)}")
 
@@ -1402,7 +1055,7 @@ async def get_active_users():
 async def update_user_activity(user_id: str):
     """Update user's last activity timestamp (called on app usage)"""
     try:
-        result = users_collection.update_one(
+        result = await users_collection.update_one(
             {"user_id": user_id},
             {"$set": {"last_activity": datetime.utcnow()}}
         )
@@ -1422,12 +1075,12 @@ async def update_token_launch_profile(user_id: str, token_profile: TokenLaunchPr
     """Update user's token launch interests and profile"""
     try:
         # Validate user exists
-        user = users_collection.find_one({"user_id": user_id})
+        user = await users_collection.find_one({"user_id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Update user's token launch fields in main profile
-        users_collection.update_one(
+        await users_collection.update_one(
             {"user_id": user_id},
             {
                 "$set": {
@@ -1453,7 +1106,7 @@ async def update_token_launch_profile(user_id: str, token_profile: TokenLaunchPr
         }
         
         # Upsert token launch profile
-        token_launch_profiles_collection.replace_one(
+        await token_launch_profiles_collection.replace_one(
             {"user_id": user_id},
             token_launch_data,
             upsert=True
@@ -1467,13 +1120,13 @@ async def update_token_launch_profile(user_id: str, token_profile: TokenLaunchPr
 @app.get("/api/token-launch-profile/{user_id}")
 async def get_token_launch_profile(user_id: str):
     """Get user's token launch profile"""
-    token_profile = token_launch_profiles_collection.find_one({"user_id": user_id})
+    token_profile = await token_launch_profiles_collection.find_one({"user_id": user_id})
     if token_profile:
         token_profile.pop('_id', None)
         return token_profile
     
     # Return basic info from user profile if detailed profile doesn't exist
-    user = users_collection.find_one({"user_id": user_id})
+    user = await users_collection.find_one({"user_id": user_id})
     if user:
         return {
             "user_id": user_id,
@@ -1488,24 +1141,31 @@ async def get_token_launch_profile(user_id: str):
     raise HTTPException(status_code=404, detail="User not found")
 
 @app.get("/api/users/token-launchers")
-async def get_token_launchers():
-    """Get users interested in token launches"""
+async def get_token_launchers(response: Response, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    """Get a page of users interested in token launches"""
     try:
         # Get users who are interested in token launches
-        token_launchers = list(users_collection.find({
-            "interested_in_token_launch": True,
-            "profile_complete": True
-        }))
+        token_launchers, next_cursor = await paginate(
+            users_collection,
+            {"interested_in_token_launch": True, "profile_complete": True},
+            ["user_id"],
+            descending=False,
+            limit=clamp_page_size(limit),
+            cursor=cursor
+        )
+        set_cursor_headers(response, next_cursor=next_cursor)
+        
+        # Get detailed token launch profiles in one batch
+        token_profiles = await token_launch_profile_loader().load_many(
+            [user['user_id'] for user in token_launchers]
+        )
         
         result_users = []
-        for user in token_launchers:
+        for user, token_profile in zip(token_launchers, token_profiles):
             # Remove sensitive data
             user.pop('_id', None)
             user.pop('twitter_id', None)
             
-            # Get detailed token launch profile if exists
-            token_profile = token_launch_profiles_collection.find_one({"user_id": user['user_id']})
-            
             user_data = {
                 "user_id": user['user_id'],
                 "username": user['username'],
@@ -1537,6 +1197,8 @@ async def get_token_launchers():
             "count": len(result_users)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get token launchers: {str(e)}")
 
@@ -1547,12 +1209,12 @@ async def generate_user_referral_code(user_id: str):
     """Generate a referral code for a user"""
     try:
         # Check if user exists
-        user = users_collection.find_one({"user_id": user_id})
+        user = await users_collection.find_one({"user_id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Check if user already has an active referral code
-        existing_referral = referrals_collection.find_one({
+        existing_referral = await referrals_collection.find_one({
             "referrer_user_id": user_id,
             "status": "pending"
         })
@@ -1565,8 +1227,8 @@ async def generate_user_referral_code(user_id: str):
             }
         
         # Generate new referral code
-        referral_code = generate_referral_code(user_id)
-        referral_data = create_referral_entry(user_id, referral_code)
+        referral_code = await generate_referral_code(user_id)
+        referral_data = await create_referral_entry(user_id, referral_code)
         
         # Remove MongoDB _id
         referral_data.pop('_id', None)
@@ -1587,36 +1249,38 @@ async def get_referral_stats(user_id: str):
     """Get referral statistics for a user"""
     try:
         # Check if user exists
-        user = users_collection.find_one({"user_id": user_id})
+        user = await users_collection.find_one({"user_id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Get user's referral code
-        user_referral = referrals_collection.find_one({
+        user_referral = await referrals_collection.find_one({
             "referrer_user_id": user_id,
             "status": "pending"
         })
         
         # Get completed referrals (people who signed up using their code)
-        completed_referrals = list(referrals_collection.find({
+        completed_referrals = await fetch_all(referrals_collection.find({
             "referrer_user_id": user_id,
             "status": "completed"
         }))
         
         # Get details of referred users
         referred_users = []
-        for referral in completed_referrals:
-            if referral.get("referred_user_id"):
-                referred_user = users_collection.find_one({"user_id": referral["referred_user_id"]})
-                if referred_user:
-                    referred_users.append({
-                        "user_id": referred_user["user_id"],
-                        "username": referred_user["username"],
-                        "display_name": referred_user["display_name"],
-                        "avatar_url": referred_user["avatar_url"],
-                        "joined_at": referral["used_at"],
-                        "profile_complete": referred_user.get("profile_complete", False)
-                    })
+        referrals_with_user = [r for r in completed_referrals if r.get("referred_user_id")]
+        referred_cards = await user_card_loader().load_many(
+            [r["referred_user_id"] for r in referrals_with_user]
+        )
+        for referral, referred_user in zip(referrals_with_user, referred_cards):
+            if referred_user:
+                referred_users.append({
+                    "user_id": referred_user["user_id"],
+                    "username": referred_user["username"],
+                    "display_name": referred_user["display_name"],
+                    "avatar_url": referred_user["avatar_url"],
+                    "joined_at": referral["used_at"],
+                    "profile_complete": referred_user.get("profile_complete", False)
+                })
         
         return {
             "referral_code": user_referral["referral_code"] if user_referral else None,
@@ -1636,7 +1300,7 @@ async def get_referral_stats(user_id: str):
 async def validate_referral_code(referral_code: str):
     """Validate a referral code"""
     try:
-        referral = referrals_collection.find_one({
+        referral = await referrals_collection.find_one({
             "referral_code": referral_code,
             "status": "pending"
         })
@@ -1645,7 +1309,7 @@ async def validate_referral_code(referral_code: str):
             return {"valid": False, "message": "Invalid or expired referral code"}
         
         # Get referrer user info
-        referrer = users_collection.find_one({"user_id": referral["referrer_user_id"]})
+        referrer = await users_collection.find_one({"user_id": referral["referrer_user_id"]})
         if not referrer:
             return {"valid": False, "message": "Referrer user not found"}
         
@@ -1674,7 +1338,7 @@ async def change_password(request_data: dict):
             raise HTTPException(status_code=400, detail="Missing required fields")
         
         # Find user
-        user = users_collection.find_one({"user_id": user_id})
+        user = await users_collection.find_one({"user_id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -1690,7 +1354,7 @@ async def change_password(request_data: dict):
         new_password_hash = hash_password(new_password)
         
         # Update password
-        users_collection.update_one(
+        await users_collection.update_one(
             {"user_id": user_id},
             {"$set": {"password_hash": new_password_hash, "last_activity": datetime.utcnow()}}
         )
@@ -1707,14 +1371,14 @@ async def health_check():
     """Enhanced health check for production deployment"""
     try:
         # Test database connectivity
-        client.admin.command('ping')
+        await client.admin.command('ping')
         db_status = "healthy"
         
         # Get database info
         db_info = {
             "name": DB_NAME,
             "connected": True,
-            "collections": len(db.list_collection_names())
+            "collections": len(await db.list_collection_names())
         }
         
     except Exception as e:
@@ -1731,6 +1395,7 @@ async def health_check():
         "version": "1.0.0",
         "environment": ENVIRONMENT,
         "database": db_info,
+        "compatibility_cache": compatibility_cache.stats(),
         "timestamp": datetime.utcnow().isoformat()
     }
 
@@ -1739,25 +1404,25 @@ async def health_check():
 @app.get("/api/subscription/{user_id}")
 async def get_subscription_status(user_id: str):
     """Get user's subscription status and limits"""
-    subscription = get_user_subscription(user_id)
-    swipe_status = check_swipe_limit(user_id)
+    subscription = await get_user_subscription(user_id)
+    swipe_status = await check_swipe_limit(user_id)
     
     # Define features by plan type
     premium_features = {
         "unlimited_swipes": subscription["plan_type"] != "free",
-        "see_who_liked_you": can_see_likes(user_id),
-        "rewind_swipes": can_rewind_swipe(user_id),
-        "priority_discovery": get_priority_boost(user_id),
+        "see_who_liked_you": await can_see_likes(user_id),
+        "rewind_swipes": await can_rewind_swipe(user_id),
+        "priority_discovery": await get_priority_boost(user_id),
         "advanced_filters": subscription["plan_type"] != "free"
     }
     
     # Pro Trader specific features
     pro_trader_features = {
-        "portfolio_integration": can_connect_portfolio(user_id),
-        "trading_signals": can_send_trading_signals(user_id),
-        "group_chats": can_create_groups(user_id),
-        "trading_calendar": can_schedule_events(user_id),
-        "performance_analytics": can_view_analytics(user_id)
+        "portfolio_integration": await can_connect_portfolio(user_id),
+        "trading_signals": await can_send_trading_signals(user_id),
+        "group_chats": await can_create_groups(user_id),
+        "trading_calendar": await can_schedule_events(user_id),
+        "performance_analytics": await can_view_analytics(user_id)
     }
     
     return {
@@ -1777,7 +1442,7 @@ async def get_subscription_status(user_id: str):
 async def upgrade_subscription(user_id: str, plan_data: dict):
     """Upgrade user to premium subscription"""
     try:
-        user = users_collection.find_one({"user_id": user_id})
+        user = await users_collection.find_one({"user_id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -1796,7 +1461,7 @@ async def upgrade_subscription(user_id: str, plan_data: dict):
         }
         
         # Upsert subscription
-        subscriptions_collection.replace_one(
+        await subscriptions_collection.replace_one(
             {"user_id": user_id},
             subscription_data,
             upsert=True
@@ -1817,12 +1482,17 @@ async def upgrade_subscription(user_id: str, plan_data: dict):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upgrade subscription: {str(e)}")
 
+def likes_received_filter(user_id: str) -> dict:
+    """Swipes that liked user_id"""
+    return {"target_id": user_id, "action": "like"}
+
 @app.get("/api/likes-received/{user_id}")
-async def get_likes_received(user_id: str):
-    """Get users who liked this user (Premium feature)"""
-    if not can_see_likes(user_id):
+async def get_likes_received(user_id: str, response: Response, cursor: Optional[str] = None,
+                             limit: int = DEFAULT_PAGE_SIZE):
+    """Get a page of users who liked this user, newest first (Premium feature)"""
+    if not await can_see_likes(user_id):
         # Return teaser for free users
-        like_count = likes_received_collection.count_documents({"user_id": user_id})
+        like_count = await swipes_collection.count_documents(likes_received_filter(user_id))
         return {
             "premium_required": True,
             "like_count": like_count,
@@ -1831,14 +1501,22 @@ async def get_likes_received(user_id: str):
         }
     
     # Get actual likes for premium users
-    likes = list(likes_received_collection.find({"user_id": user_id}).sort("liked_at", -1))
+    likes, next_cursor = await paginate(
+        swipes_collection,
+        likes_received_filter(user_id),
+        ["swiped_at", "_id"],
+        descending=True,
+        limit=clamp_page_size(limit),
+        cursor=cursor
+    )
+    set_cursor_headers(response, next_cursor=next_cursor)
+    
+    # Get user details for all likes in one batch
+    liked_user_cards = await user_card_loader().load_many([like["swiper_id"] for like in likes])
     
-    # Get user details for each like
     liked_users = []
-    for like in likes:
-        liked_user = users_collection.find_one({"user_id": like["liked_by_user_id"]})
+    for like, liked_user in zip(likes, liked_user_cards):
         if liked_user:
-            liked_user.pop('_id', None)
             liked_users.append({
                 "user_id": liked_user["user_id"],
                 "username": liked_user["username"],
@@ -1847,53 +1525,43 @@ async def get_likes_received(user_id: str):
                 "bio": liked_user.get("bio", ""),
                 "trading_experience": liked_user.get("trading_experience", ""),
                 "preferred_tokens": liked_user.get("preferred_tokens", []),
-                "liked_at": like["liked_at"]
+                "liked_at": like["swiped_at"]
             })
     
     return {
         "premium_required": False,
         "liked_users": liked_users,
-        "total_likes": len(liked_users)
+        "total_likes": await swipes_collection.count_documents(likes_received_filter(user_id))
     }
 
 @app.post("/api/rewind-swipe/{user_id}")
 async def rewind_last_swipe(user_id: str):
     """Rewind the last swipe (Premium feature)"""
-    if not can_rewind_swipe(user_id):
+    if not await can_rewind_swipe(user_id):
         return {
             "premium_required": True,
             "message": "Rewind is a Premium feature. Upgrade to undo your last swipe!",
             "upgrade_url": "/premium"
         }
     
-    # Get last swipe
-    last_swipe_history = swipe_history_collection.find_one(
-        {"user_id": user_id},
-        sort=[("_id", -1)]
+    # Take back the last swipe; the like (if it was one) goes with it
+    last_swipe = await swipes_collection.find_one_and_delete(
+        {"swiper_id": user_id},
+        sort=[("swiped_at", -1)]
     )
     
-    if not last_swipe_history:
+    if not last_swipe:
         return {"error": "No swipes to rewind"}
     
-    last_swipe = last_swipe_history["swipe_data"]
-    
-    # Remove the swipe from swipes collection
-    swipes_collection.delete_one({"swipe_id": last_swipe["swipe_id"]})
-    
-    # Remove from likes_received if it was a like
-    if last_swipe["action"] == "like":
-        likes_received_collection.delete_one({
-            "user_id": last_swipe["target_id"],
-            "liked_by_user_id": last_swipe["swiper_id"]
-        })
-    
-    # Remove from swipe history
-    swipe_history_collection.delete_one({"_id": last_swipe_history["_id"]})
+    await refund_swipe(user_id, last_swipe["swiped_at"])
     
     # Get the target user info to return
-    target_user = users_collection.find_one({"user_id": last_swipe["target_id"]})
+    target_user = await users_collection.find_one({"user_id": last_swipe["target_id"]})
     if target_user:
         target_user.pop('_id', None)
+        # Let the rewound user show up in discovery again
+        await unmark_seen(user_id, target_user.get("user_seq"))
+        await push_candidate_front(user_id, last_swipe["target_id"])
     
     return {
         "success": True,
@@ -1905,48 +1573,22 @@ async def rewind_last_swipe(user_id: str):
 @app.get("/api/discover/{user_id}")
 async def discover_users(user_id: str, limit: int = 10, filters: dict = None):
     """Get potential matches for swiping with premium filters"""
-    current_user = users_collection.find_one({"user_id": user_id})
+    current_user = await users_collection.find_one({"user_id": user_id})
     if not current_user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    subscription = get_user_subscription(user_id)
+    subscription = await get_user_subscription(user_id)
     
-    # Get users already swiped on
-    swiped_user_ids = [doc["target_id"] for doc in swipes_collection.find({"swiper_id": user_id})]
-    swiped_user_ids.append(user_id)  # Exclude self
-    
-    # Base query
-    query = {
-        "user_id": {"$nin": swiped_user_ids},
-        "profile_complete": True
-    }
-    
-    # Apply premium filters if available
-    if subscription["plan_type"] != "free" and filters:
-        if filters.get("portfolio_size"):
-            query["portfolio_size"] = filters["portfolio_size"]
-        if filters.get("trading_experience"):
-            query["trading_experience"] = filters["trading_experience"]
-        if filters.get("preferred_tokens"):
-            query["preferred_tokens"] = {"$in": filters["preferred_tokens"]}
-        if filters.get("years_trading_min"):
-            query["years_trading"] = {"$gte": filters["years_trading_min"]}
-        if filters.get("location"):
-            query["location"] = {"$regex": filters["location"], "$options": "i"}
-    
-    # Premium users get priority (more recent activity first)
-    # Free users get standard sorting
-    sort_criteria = "last_activity" if subscription["plan_type"] != "free" else "created_at"
-    
-    potential_matches = list(users_collection.find(query).sort(sort_criteria, -1).limit(limit))
-    
-    # Remove MongoDB _id fields
-    for user in potential_matches:
-        user.pop('_id', None)
+    # Serve the precomputed queue; fall back to the live scan while it is (re)built
+    potential_matches = await next_candidates(user_id, subscription["plan_type"], filters, limit)
+    if potential_matches is None:
+        # Self and users already swiped on are skipped via the swiper's seen-set
+        query, sort = discovery_query(subscription["plan_type"], filters)
+        potential_matches = await find_unseen_users(user_id, query, sort, limit)
     
     # Track profile views for analytics (for the users being discovered)
     for user in potential_matches:
-        update_user_analytics(user["user_id"], "profile_view")
+        await update_user_analytics(user["user_id"], "profile_view")
     
     # Add premium indicator to response
     return {
@@ -1960,7 +1602,7 @@ async def discover_users(user_id: str, limit: int = 10, filters: dict = None):
 @app.post("/api/portfolio/connect/{user_id}")
 async def connect_portfolio(user_id: str, portfolio_data: dict):
     """Connect wallet/exchange for portfolio verification (Pro Trader feature)"""
-    if not can_connect_portfolio(user_id):
+    if not await can_connect_portfolio(user_id):
         return {
             "pro_trader_required": True,
             "message": "Portfolio integration is a Pro Trader feature. Upgrade to connect your wallet/exchange!",
@@ -1986,14 +1628,14 @@ async def connect_portfolio(user_id: str, portfolio_data: dict):
         }
         
         # Upsert portfolio connection
-        portfolio_connections_collection.replace_one(
+        await portfolio_connections_collection.replace_one(
             {"user_id": user_id},
             portfolio_connection,
             upsert=True
         )
         
         # Update user profile with verified status
-        users_collection.update_one(
+        await users_collection.update_one(
             {"user_id": user_id},
             {"$set": {"portfolio_verified": True, "last_active": datetime.utcnow()}}
         )
@@ -2010,7 +1652,7 @@ async def connect_portfolio(user_id: str, portfolio_data: dict):
 @app.get("/api/portfolio/{user_id}")
 async def get_portfolio_info(user_id: str):
     """Get portfolio connection info"""
-    portfolio = portfolio_connections_collection.find_one({"user_id": user_id})
+    portfolio = await portfolio_connections_collection.find_one({"user_id": user_id})
     if portfolio:
         portfolio.pop('_id', None)
         return portfolio
@@ -2022,7 +1664,7 @@ async def send_trading_signal(signal_data: dict):
     """Send trading signal to matched users (Pro Trader feature)"""
     sender_id = signal_data.get("sender_id")
     
-    if not can_send_trading_signals(sender_id):
+    if not await can_send_trading_signals(sender_id):
         return {
             "pro_trader_required": True,
             "message": "Trading signals are a Pro Trader feature. Upgrade to share alpha with your network!",
@@ -2046,10 +1688,10 @@ async def send_trading_signal(signal_data: dict):
             "created_at": datetime.utcnow()
         }
         
-        trading_signals_collection.insert_one(signal)
+        await trading_signals_collection.insert_one(signal)
         
         # Update analytics
-        update_user_analytics(sender_id, "signal_sent")
+        await update_user_analytics(sender_id, "signal_sent")
         
         # Notify recipients via WebSocket (if connected)
         for recipient_id in signal["recipient_ids"]:
@@ -2073,21 +1715,29 @@ async def send_trading_signal(signal_data: dict):
         raise HTTPException(status_code=500, detail=f"Failed to send trading signal: {str(e)}")
 
 @app.get("/api/trading-signals/{user_id}")
-async def get_trading_signals(user_id: str, signal_type: str = "received"):
-    """Get trading signals for user (sent or received)"""
+async def get_trading_signals(user_id: str, response: Response, signal_type: str = "received",
+                              cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    """Get a page of trading signals for user (sent or received), newest first"""
     try:
-        if signal_type == "sent":
-            signals = list(trading_signals_collection.find({"sender_id": user_id}).sort("created_at", -1))
-        else:
-            signals = list(trading_signals_collection.find({"recipient_ids": user_id}).sort("created_at", -1))
+        query = {"sender_id": user_id} if signal_type == "sent" else {"recipient_ids": user_id}
+        signals, next_cursor = await paginate(
+            trading_signals_collection,
+            query,
+            ["created_at", "signal_id"],
+            descending=True,
+            limit=clamp_page_size(limit),
+            cursor=cursor
+        )
+        set_cursor_headers(response, next_cursor=next_cursor)
+        
+        # Get sender info for all signals in one batch
+        senders = await user_card_loader().load_many([signal["sender_id"] for signal in signals])
         
-        # Remove MongoDB _id and get sender info for received signals
+        # Remove MongoDB _id and attach sender info
         enriched_signals = []
-        for signal in signals:
+        for signal, sender in zip(signals, senders):
             signal.pop('_id', None)
             
-            # Get sender info
-            sender = users_collection.find_one({"user_id": signal["sender_id"]})
             if sender:
                 signal["sender_info"] = {
                     "display_name": sender["display_name"],
@@ -2103,6 +1753,8 @@ async def get_trading_signals(user_id: str, signal_type: str = "received"):
             "type": signal_type
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get trading signals: {str(e)}")
 
@@ -2111,7 +1763,7 @@ async def create_trading_group(group_data: dict):
     """Create trading group (Pro Trader feature)"""
     creator_id = group_data.get("creator_id")
     
-    if not can_create_groups(creator_id):
+    if not await can_create_groups(creator_id):
         return {
             "pro_trader_required": True,
             "message": "Trading groups are a Pro Trader feature. Upgrade to create groups with your trading network!",
@@ -2120,7 +1772,7 @@ async def create_trading_group(group_data: dict):
     
     try:
         # Check if user has reached group limit (5 groups for Pro Trader)
-        user_groups = trading_groups_collection.count_documents({"creator_id": creator_id})
+        user_groups = await trading_groups_collection.count_documents({"creator_id": creator_id})
         if user_groups >= 5:
             return {
                 "error": "group_limit_reached",
@@ -2140,10 +1792,10 @@ async def create_trading_group(group_data: dict):
             "created_at": datetime.utcnow()
         }
         
-        trading_groups_collection.insert_one(group)
+        await trading_groups_collection.insert_one(group)
         
         # Update analytics
-        update_user_analytics(creator_id, "group_created")
+        await update_user_analytics(creator_id, "group_created")
         
         group.pop('_id', None)
         return {
@@ -2160,7 +1812,7 @@ async def join_trading_group(group_id: str, user_data: dict):
     user_id = user_data.get("user_id")
     
     try:
-        group = trading_groups_collection.find_one({"group_id": group_id})
+        group = await trading_groups_collection.find_one({"group_id": group_id})
         if not group:
             raise HTTPException(status_code=404, detail="Trading group not found")
         
@@ -2180,7 +1832,7 @@ async def join_trading_group(group_id: str, user_data: dict):
             }
         
         # Add user to group
-        trading_groups_collection.update_one(
+        await trading_groups_collection.update_one(
             {"group_id": group_id},
             {"$push": {"member_ids": user_id}}
         )
@@ -2210,16 +1862,19 @@ async def get_user_trading_groups(user_id: str):
     """Get trading groups for user"""
     try:
         # Get groups where user is a member
-        groups = list(trading_groups_collection.find({"member_ids": user_id}))
+        groups = await fetch_all(trading_groups_collection.find({"member_ids": user_id}))
+        
+        # Members of every group are resolved through one shared batch
+        member_loader = user_card_loader()
+        member_cards = await asyncio.gather(*(member_loader.load_many(group["member_ids"]) for group in groups))
         
         enriched_groups = []
-        for group in groups:
+        for group, group_members in zip(groups, member_cards):
             group.pop('_id', None)
             
             # Get member info
             members = []
-            for member_id in group["member_ids"]:
-                member = users_collection.find_one({"user_id": member_id})
+            for member in group_members:
                 if member:
                     members.append({
                         "user_id": member["user_id"],
@@ -2245,7 +1900,7 @@ async def schedule_trading_event(event_data: dict):
     """Schedule trading event (Pro Trader feature)"""
     creator_id = event_data.get("creator_id")
     
-    if not can_schedule_events(creator_id):
+    if not await can_schedule_events(creator_id):
         return {
             "pro_trader_required": True,
             "message": "Trading calendar is a Pro Trader feature. Upgrade to schedule trading sessions!",
@@ -2267,7 +1922,7 @@ async def schedule_trading_event(event_data: dict):
             "created_at": datetime.utcnow()
         }
         
-        trading_calendar_collection.insert_one(event)
+        await trading_calendar_collection.insert_one(event)
         
         event.pop('_id', None)
         return {
@@ -2279,32 +1934,39 @@ async def schedule_trading_event(event_data: dict):
         raise HTTPException(status_code=500, detail=f"Failed to schedule event: {str(e)}")
 
 @app.get("/api/trading-events/{user_id}")
-async def get_trading_events(user_id: str):
-    """Get trading events for user"""
+async def get_trading_events(user_id: str, response: Response, cursor: Optional[str] = None,
+                             limit: int = DEFAULT_PAGE_SIZE):
+    """Get a page of trading events for user, soonest first"""
     try:
         # Get events where user is creator or attendee
-        events = list(trading_calendar_collection.find({
-            "$or": [
+        events, next_cursor = await paginate(
+            trading_calendar_collection,
+            {"$or": [
                 {"creator_id": user_id},
                 {"attendee_ids": user_id}
-            ]
-        }).sort("start_time", 1))
-        
-        for event in events:
-            event.pop('_id', None)
+            ]},
+            ["start_time", "event_id"],
+            descending=False,
+            limit=clamp_page_size(limit),
+            cursor=cursor,
+            projection={"_id": 0}
+        )
+        set_cursor_headers(response, next_cursor=next_cursor)
         
         return {
             "events": events,
             "count": len(events)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get trading events: {str(e)}")
 
 @app.get("/api/analytics/{user_id}")
 async def get_user_analytics(user_id: str):
     """Get performance analytics (Pro Trader feature)"""
-    if not can_view_analytics(user_id):
+    if not await can_view_analytics(user_id):
         return {
             "pro_trader_required": True,
             "message": "Performance analytics are a Pro Trader feature. Upgrade to track your trading network success!",
@@ -2312,7 +1974,7 @@ async def get_user_analytics(user_id: str):
         }
     
     try:
-        analytics = analytics_collection.find_one({"user_id": user_id})
+        analytics = await analytics_collection.find_one({"user_id": user_id})
         if not analytics:
             # Create empty analytics
             analytics = {
@@ -2325,13 +1987,13 @@ async def get_user_analytics(user_id: str):
                 "match_success_rate": 0.0,
                 "last_updated": datetime.utcnow()
             }
-            analytics_collection.insert_one(analytics)
+            await analytics_collection.insert_one(analytics)
         
         analytics.pop('_id', None)
         
         # Add additional calculated metrics
-        total_swipes = swipes_collection.count_documents({"swiper_id": user_id})
-        total_likes_received = likes_received_collection.count_documents({"user_id": user_id})
+        total_swipes = await swipes_collection.count_documents({"swiper_id": user_id})
+        total_likes_received = await swipes_collection.count_documents(likes_received_filter(user_id))
         
         analytics["total_swipes"] = total_swipes
         analytics["likes_received"] = total_likes_received
@@ -2347,16 +2009,16 @@ async def delete_user_account(user_id: str):
     """Delete user account and all associated data"""
     try:
         # Verify user exists
-        user = users_collection.find_one({"user_id": user_id})
+        user = await users_collection.find_one({"user_id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
         # Delete all user-related data
         # 1. Delete user profile
-        users_collection.delete_one({"user_id": user_id})
+        await users_collection.delete_one({"user_id": user_id})
         
         # 2. Delete matches where user is involved
-        matches_collection.delete_many({
+        await matches_collection.delete_many({
             "$or": [
                 {"user1_id": user_id},
                 {"user2_id": user_id}
@@ -2364,66 +2026,70 @@ async def delete_user_account(user_id: str):
         })
         
         # 3. Delete messages sent by user
-        messages_collection.delete_many({"sender_id": user_id})
+        await messages_collection.delete_many({"sender_id": user_id})
         
-        # 4. Delete swipes made by user
-        swipes_collection.delete_many({"swiper_id": user_id})
-        
-        # 5. Delete likes received by user
-        likes_received_collection.delete_many({"user_id": user_id})
-        
-        # 6. Delete likes made by user
-        likes_received_collection.delete_many({"liked_by_user_id": user_id})
+        # 4. Delete swipes made by user, and swipes (likes) received
+        await swipes_collection.delete_many({
+            "$or": [
+                {"swiper_id": user_id},
+                {"target_id": user_id}
+            ]
+        })
         
-        # 7. Delete swipe history
-        swipe_history_collection.delete_many({"user_id": user_id})
+        # 5. Delete swipe quotas and discovery state
+        await swipe_quotas_collection.delete_many({"user_id": user_id})
+        await swipe_exclusions_collection.delete_many({"user_id": user_id})
+        await discovery_queues_collection.delete_many({"user_id": user_id})
+        feature_store.remove(user_id)
+        await recommendations_collection.delete_many({"user_id": user_id})
+        await remove_from_recommendations(user_id)
         
-        # 8. Delete profile images
-        profile_images_collection.delete_many({"user_id": user_id})
+        # 6. Delete profile images
+        await profile_images_collection.delete_many({"user_id": user_id})
         
-        # 9. Delete trading highlights
-        trading_highlights_collection.delete_many({"user_id": user_id})
+        # 7. Delete trading highlights
+        await trading_highlights_collection.delete_many({"user_id": user_id})
         
-        # 10. Delete social links
-        social_links_collection.delete_many({"user_id": user_id})
+        # 8. Delete social links
+        await social_links_collection.delete_many({"user_id": user_id})
         
-        # 11. Delete subscription
-        subscriptions_collection.delete_many({"user_id": user_id})
+        # 9. Delete subscription
+        await subscriptions_collection.delete_many({"user_id": user_id})
         
-        # 12. Delete portfolio connections
-        portfolio_connections_collection.delete_many({"user_id": user_id})
+        # 10. Delete portfolio connections
+        await portfolio_connections_collection.delete_many({"user_id": user_id})
         
-        # 13. Delete trading signals (sent and received)
-        trading_signals_collection.delete_many({
+        # 11. Delete trading signals (sent and received)
+        await trading_signals_collection.delete_many({
             "$or": [
                 {"sender_id": user_id},
                 {"recipient_ids": user_id}
             ]
         })
         
-        # 14. Delete trading groups created by user
-        trading_groups_collection.delete_many({"creator_id": user_id})
+        # 12. Delete trading groups created by user
+        await trading_groups_collection.delete_many({"creator_id": user_id})
         
-        # 15. Remove user from trading groups
-        trading_groups_collection.update_many(
+        # 13. Remove user from trading groups
+        await trading_groups_collection.update_many(
             {"member_ids": user_id},
             {"$pull": {"member_ids": user_id}}
         )
         
-        # 16. Delete trading events created by user
-        trading_calendar_collection.delete_many({"creator_id": user_id})
+        # 14. Delete trading events created by user
+        await trading_calendar_collection.delete_many({"creator_id": user_id})
         
-        # 17. Remove user from trading events
-        trading_calendar_collection.update_many(
+        # 15. Remove user from trading events
+        await trading_calendar_collection.update_many(
             {"attendee_ids": user_id},
             {"$pull": {"attendee_ids": user_id}}
         )
         
-        # 18. Delete analytics
-        analytics_collection.delete_many({"user_id": user_id})
+        # 16. Delete analytics
+        await analytics_collection.delete_many({"user_id": user_id})
         
-        # 19. Delete referrals
-        referrals_collection.delete_many({
+        # 17. Delete referrals
+        await referrals_collection.delete_many({
             "$or": [
                 {"referrer_id": user_id},
                 {"referred_id": user_id}
@@ -2445,7 +2111,7 @@ async def delete_user_account(user_id: str):
 async def upgrade_subscription(user_id: str, plan_data: dict):
     """Upgrade user to premium subscription"""
     try:
-        user = users_collection.find_one({"user_id": user_id})
+        user = await users_collection.find_one({"user_id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -2470,7 +2136,7 @@ async def upgrade_subscription(user_id: str, plan_data: dict):
         }
         
         # Upsert subscription
-        subscriptions_collection.replace_one(
+        await subscriptions_collection.replace_one(
             {"user_id": user_id},
             subscription_data,
             upsert=True
@@ -2536,11 +2202,11 @@ async def twitter_callback(request: Request):
         twitter_user = user_resp.json()
         
         # Check if user already exists
-        existing_user = users_collection.find_one({"twitter_id": twitter_user['id_str']})
+        existing_user = await users_collection.find_one({"twitter_id": twitter_user['id_str']})
         
         if existing_user:
             # Update last active
-            users_collection.update_one(
+            await users_collection.update_one(
                 {"twitter_id": twitter_user['id_str']},
                 {"$set": {"last_active": datetime.utcnow()}}
             )
@@ -2557,7 +2223,8 @@ async def twitter_callback(request: Request):
                 "twitter_username": twitter_user['screen_name'],
                 "auth_method": "twitter"
             })
-            users_collection.insert_one(user_data)
+            user_data["user_seq"] = await next_user_seq()
+            await users_collection.insert_one(user_data)
         
         # Redirect to frontend with user data
         frontend_url = f"https://5ab0f635-9ff1-4325-81ed-c868d2618fac.preview.emergentagent.com/app?auth_success=true&user_id={user_data['user_id']}"
@@ -2571,7 +2238,7 @@ async def upload_profile_image(user_id: str, file: UploadFile = File(...)):
     """Upload a profile image for a user"""
     try:
         # Validate user exists
-        user = users_collection.find_one({"user_id": user_id})
+        user = await users_collection.find_one({"user_id": user_id})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -2591,12 +2258,12 @@ async def upload_profile_image(user_id: str, file: UploadFile = File(...)):
             "data": base64.b64encode(contents).decode('utf-8'),
             "uploaded_at": datetime.utcnow()
         }
-        profile_images_collection.insert_one(image_data)
+        await profile_images_collection.insert_one(image_data)
         
         # Update user's avatar URL to point to our image endpoint
         new_avatar_url = f"{os.environ.get('REACT_APP_BACKEND_URL', 'https://5ab0f635-9ff1-4325-81ed-c868d2618fac.preview.emergentagent.com')}/api/profile-image/{image_data['image_id']}"
         
-        users_collection.update_one(
+        await users_collection.update_one(
             {"user_id": user_id},
             {"$set": {"avatar_url": new_avatar_url, "last_active": datetime.utcnow()}}
         )
@@ -2611,7 +2278,7 @@ async def get_profile_image(image_id: str):
     """Get a profile image by ID"""
     from fastapi.responses import Response
     
-    image_data = profile_images_collection.find_one({"image_id": image_id})
+    image_data = await profile_images_collection.find_one({"image_id": image_id})
     if not image_data:
         raise HTTPException(status_code=404, detail="Image not found")
     
@@ -2627,7 +2294,7 @@ async def get_profile_image(image_id: str):
 @app.get("/api/user/{user_id}")
 async def get_user(user_id: str):
     """Get user profile"""
-    user = users_collection.find_one({"user_id": user_id})
+    user = await users_collection.find_one({"user_id": user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -2638,7 +2305,7 @@ async def get_user(user_id: str):
 @app.put("/api/user/{user_id}")
 async def update_user_profile(user_id: str, profile_data: dict):
     """Update user profile"""
-    user = users_collection.find_one({"user_id": user_id})
+    user = await users_collection.find_one({"user_id": user_id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -2663,57 +2330,184 @@ async def update_user_profile(user_id: str, profile_data: dict):
     )
     update_data["profile_complete"] = profile_complete
     
-    users_collection.update_one(
-        {"user_id": user_id},
-        {"$set": update_data}
+    # Only changes that can move a compatibility score invalidate stored recommendations
+    matching_changed = profile_complete != bool(user.get("profile_complete")) or any(
+        field in update_data and update_data[field] != user.get(field) for field in MATCHING_FIELDS
     )
+    if matching_changed:
+        # Lets other workers' feature stores pick the change up
+        update_data["profile_updated_at"] = update_data["last_active"]
+        await users_collection.update_one(
+            {"user_id": user_id},
+            {"$set": update_data, "$inc": {"profile_version": 1}}
+        )
+        feature_store.apply_profile({**user, **update_data})
+        schedule_rescore(user_id)
+    else:
+        await users_collection.update_one(
+            {"user_id": user_id},
+            {"$set": update_data}
+        )
+    
+    # Have a discovery queue ready by the time a newly completed profile starts swiping
+    if profile_complete and not user.get("profile_complete"):
+        subscription = await get_user_subscription(user_id)
+        schedule_refill(user_id, subscription["plan_type"])
     
     return {"message": "Profile updated successfully"}
 
 @app.get("/api/ai-recommendations/{user_id}")
-async def get_ai_recommendations(user_id: str, limit: int = 10):
-    """Get AI-recommended matches for a user"""
-    current_user = users_collection.find_one({"user_id": user_id})
+async def get_ai_recommendations(user_id: str, response: Response, limit: int = 10,
+                                 time_budget_ms: Optional[int] = None):
+    """Get AI-recommended matches for a user
+
+    With time_budget_ms, live scoring stops when the budget runs out and
+    returns the best matches among the candidates evaluated so far
+    (most recently active first); see the X-Candidates-* headers. Scoring
+    in the pool shares one deadline per request: the budget, or
+    SCORING_DEADLINE_SECONDS without one.
+    """
+    current_user = await users_collection.find_one({"user_id": user_id})
     if not current_user:
         raise HTTPException(status_code=404, detail="User not found")
     
     if not current_user.get('profile_complete'):
         raise HTTPException(status_code=400, detail="Profile must be complete to get AI recommendations")
     
-    # Get users already swiped on
-    swiped_user_ids = [doc["target_id"] for doc in swipes_collection.find({"swiper_id": user_id})]
-    swiped_user_ids.append(user_id)  # Exclude self
-    
-    # Find all potential matches with complete profiles, sorted by recent activity
-    potential_matches = list(users_collection.find({
-        "user_id": {"$nin": swiped_user_ids},
-        "profile_complete": True
-    }).sort("last_activity", -1))
+    seen = await load_seen_set(user_id)
+    budget = max(time_budget_ms, 0) / 1000 if time_budget_ms is not None else None
+    started = time.monotonic()
+    deadline = started + (budget if budget is not None else scoring_pool.SCORING_DEADLINE_SECONDS)
     
-    # Calculate AI compatibility scores for each potential match
-    scored_matches = []
-    for match in potential_matches:
-        match.pop('_id', None)
-        compatibility = AIMatchingService.calculate_compatibility_score(current_user, match)
-        
-        scored_matches.append({
+    # Precomputed by the offline job; score live only when that entry is missing, stale or used up
+    top_matches = await precomputed_recommendations(current_user, seen, limit)
+    if top_matches is not None:
+        set_recommendation_headers(response, "precomputed")
+    else:
+        try:
+            # Rank every complete profile from the in-process feature store, skipping self and users already swiped on
+            await feature_store.sync()
+            if budget is None:
+                top_matches = await feature_store.recommend(current_user, seen, limit, deadline=deadline)
+                set_recommendation_headers(response, "live")
+            else:
+                top_matches, evaluated, total = await feature_store.recommend_within(
+                    current_user, seen, limit, budget, deadline=deadline
+                )
+                set_recommendation_headers(response, "live", evaluated, total)
+        except UnencodableProfile:
+            # The current user's own profile can't be encoded; score raw documents instead
+            potential_matches = iter_unseen_users(
+                user_id, {"profile_complete": True}, [("last_activity", -1)], projection={"_id": 0}
+            )
+            candidates = []
+            percentages = []
+            exhausted = True
+            try:
+                async for match in potential_matches:
+                    candidates.append(match)
+                    if budget is not None and len(candidates) % ANYTIME_CHUNK_ROWS == 0:
+                        percentages.append(await score_profiles(
+                            current_user, candidates[-ANYTIME_CHUNK_ROWS:], deadline=deadline
+                        ))
+                        if time.monotonic() - started >= budget:
+                            exhausted = False
+                            break
+                unscored = candidates[sum(len(chunk) for chunk in percentages):]
+                percentages.append(await score_profiles(current_user, unscored, deadline=deadline))
+            except ScoringDeadlineExceeded:
+                raise HTTPException(status_code=503, detail="Recommendation scoring timed out, please retry")
+            # Highest compatibility first; ties keep recent-activity order
+            top_matches = [candidates[row] for row in top_k_rows(np.concatenate(percentages), limit)]
+            if budget is None:
+                set_recommendation_headers(response, "live")
+            else:
+                # The total is only known once every candidate was read
+                set_recommendation_headers(response, "live", len(candidates), len(candidates) if exhausted else None)
+        except ScoringDeadlineExceeded:
+            raise HTTPException(status_code=503, detail="Recommendation scoring timed out, please retry")
+    
+    # Full breakdown and recommendations only for the matches returned
+    return [
+        {
             **match,
-            'ai_compatibility': compatibility
-        })
-    
-    # Sort by compatibility score (highest first)
-    scored_matches.sort(key=lambda x: x['ai_compatibility']['compatibility_percentage'], reverse=True)
+            'ai_compatibility': compatibility_cache.score(current_user, match)
+        }
+        for match in top_matches
+    ]
+
+@app.get("/api/compatibility/{user_id}/{other_user_id}")
+async def get_pair_compatibility(user_id: str, other_user_id: str):
+    """AI compatibility of user_id with other_user_id, cached per profile versions"""
+    projection = {"_id": 0, "user_id": 1, "profile_version": 1, **{field: 1 for field in MATCHING_FIELDS}}
+    user = await users_collection.find_one({"user_id": user_id}, projection)
+    other_user = await users_collection.find_one({"user_id": other_user_id}, projection)
+    if not user or not other_user:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    # Return top matches
-    return scored_matches[:limit]
+    return {
+        "user_id": user_id,
+        "other_user_id": other_user_id,
+        "ai_compatibility": compatibility_cache.score(user, other_user)
+    }
+
+def swipe_pair_filter(swiper_id: str, target_id: str) -> dict:
+    """The unique key of a swipe"""
+    return {"swiper_id": swiper_id, "target_id": target_id}
+
+def match_pair_key(user_a: str, user_b: str) -> str:
+    """The unique key of the match between two users, whoever liked first"""
+    return ":".join(sorted((user_a, user_b)))
+
+def new_match(swiper_id: str, target_id: str, now: Optional[datetime] = None) -> dict:
+    now = now or datetime.utcnow()
+    return {
+        "match_id": str(uuid.uuid4()),
+        "pair_key": match_pair_key(swiper_id, target_id),
+        "user1_id": swiper_id,
+        "user2_id": target_id,
+        "created_at": now,
+        "last_message_at": now
+    }
+
+async def upsert_match(swiper_id: str, target_id: str) -> tuple:
+    """(the pair's match, whether this call created it)"""
+    match_data = new_match(swiper_id, target_id)
+    try:
+        match = await matches_collection.find_one_and_update(
+            {"pair_key": match_data["pair_key"]},
+            {"$setOnInsert": match_data},
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # A parallel upsert for the same pair won the insert
+        match = await matches_collection.find_one({"pair_key": match_data["pair_key"]}, {"_id": 0})
+    return match, match["match_id"] == match_data["match_id"]
 
 @app.post("/api/swipe")
 async def swipe_user(swipe: SwipeAction):
-    """Record a swipe action and check for matches"""
-    
-    # Check swipe limits for free users
-    swipe_status = check_swipe_limit(swipe.swiper_id)
-    if not swipe_status["can_swipe"]:
+    """Record a swipe action and check for matches
+
+    Three round trips in the common case: the entitlement, target and
+    daily quota together; then the swipe and seen-set writes; then the
+    queue pop and the mutual-like check. The stages can't merge further:
+    a swipe over the quota must not be written; the mutual-like read must
+    follow this swipe's write, or two users liking each other at once could
+    both miss the other's like; and the pop must follow the seen-set write
+    (see discovery_queue).
+    """
+    subscription, target, today_swipes = await asyncio.gather(
+        get_user_subscription(swipe.swiper_id),
+        users_collection.find_one({"user_id": swipe.target_id}, {"_id": 0, "user_seq": 1}),
+        # Taken at the free limit before the plan is known; the increment itself rejects a swipe over it
+        consume_swipe(swipe.swiper_id, FREE_DAILY_SWIPE_LIMIT)
+    )
+    if today_swipes is None and subscription["plan_type"] != "free":
+        # Paid plans are uncapped; only their swipes past the free limit pay for a second increment
+        today_swipes = await consume_swipe(swipe.swiper_id, None)
+    if today_swipes is None:
         return {
             "error": "daily_limit_reached",
             "message": "You've reached your daily swipe limit. Upgrade to Premium for unlimited swipes!",
@@ -2722,64 +2516,60 @@ async def swipe_user(swipe: SwipeAction):
         }
     
     # Record the swipe with timestamp
+    now = datetime.utcnow()
     swipe_data = {
         "swipe_id": str(uuid.uuid4()),
         "swiper_id": swipe.swiper_id,
         "target_id": swipe.target_id,
         "action": swipe.action,
-        "swiped_at": datetime.utcnow(),
-        "timestamp": datetime.utcnow()
+        "swiped_at": now,
+        "timestamp": now
     }
-    swipes_collection.insert_one(swipe_data)
-    
-    # Store for rewind functionality (premium feature)
-    swipe_history_collection.insert_one({
-        "user_id": swipe.swiper_id,
-        "swipe_data": swipe_data,
-        "can_rewind": can_rewind_swipe(swipe.swiper_id)
-    })
-    
-    # If it's a like, store in likes_received for premium "See Who Liked You" feature
+    writes = [
+        # One swipe per (swiper, target): swiping the same user again replaces the action.
+        # The record also serves rewind (latest by swiped_at) and "See Who Liked You" (likes by target_id)
+        swipes_collection.update_one(swipe_pair_filter(swipe.swiper_id, swipe.target_id), {"$set": swipe_data}, upsert=True)
+    ]
+    if target:
+        # Hide the target from future discovery
+        writes.append(mark_seen(swipe.swiper_id, target.get("user_seq")))
+    await asyncio.gather(*writes)
+
+    # The pop waits for the seen-set write so a queue refill running meanwhile doesn't see the target as unseen.
+    # The mutual-like check waits for this swipe's write (see above)
+    reads = [pop_candidate(swipe.swiper_id, swipe.target_id)]
     if swipe.action == "like":
-        likes_received_collection.insert_one({
-            "user_id": swipe.target_id,
-            "liked_by_user_id": swipe.swiper_id,
-            "liked_at": datetime.utcnow()
-        })
-        
-        # Check for mutual match
-        mutual_like = swipes_collection.find_one({
+        reads.append(swipes_collection.find_one({
             "swiper_id": swipe.target_id,
             "target_id": swipe.swiper_id,
             "action": "like"
-        })
-        
+        }, {"_id": 1}))
+    results = await asyncio.gather(*reads)
+    mutual_like = results[1] if swipe.action == "like" else None
+    
+    updated_swipe_status = swipe_limit_status(subscription, today_swipes)
+    
+    if swipe.action == "like":
+        # Check for mutual match
         if mutual_like:
-            # Create a match
-            match_data = {
-                "match_id": str(uuid.uuid4()),
-                "user1_id": swipe.swiper_id,
-                "user2_id": swipe.target_id,
-                "created_at": datetime.utcnow(),
-                "last_message_at": datetime.utcnow()
-            }
-            matches_collection.insert_one(match_data)
-            
-            # Update analytics for both users
-            update_user_analytics(swipe.swiper_id, "match_made")
-            update_user_analytics(swipe.target_id, "match_made")
-            
-            # Notify both users via WebSocket if connected
-            match_notification = {
-                "type": "new_match",
-                "match_id": match_data["match_id"],
-                "message": "You have a new match!"
-            }
-            await manager.send_message(json.dumps(match_notification), swipe.swiper_id)
-            await manager.send_message(json.dumps(match_notification), swipe.target_id)
+            # Create the match; if both users liked each other at the same moment, the other request may have
+            match_data, created = await upsert_match(swipe.swiper_id, swipe.target_id)
             
-            # Update swipe status after successful swipe
-            updated_swipe_status = check_swipe_limit(swipe.swiper_id)
+            if created:
+                # Update analytics for both users
+                await asyncio.gather(
+                    update_user_analytics(swipe.swiper_id, "match_made"),
+                    update_user_analytics(swipe.target_id, "match_made")
+                )
+                
+                # Notify both users via WebSocket if connected
+                match_notification = {
+                    "type": "new_match",
+                    "match_id": match_data["match_id"],
+                    "message": "You have a new match!"
+                }
+                await manager.send_message(json.dumps(match_notification), swipe.swiper_id)
+                await manager.send_message(json.dumps(match_notification), swipe.target_id)
             
             return {
                 "matched": True, 
@@ -2788,121 +2578,289 @@ async def swipe_user(swipe: SwipeAction):
                 "is_premium": updated_swipe_status["is_premium"]
             }
     
-    # Update swipe status after successful swipe
-    updated_swipe_status = check_swipe_limit(swipe.swiper_id)
-    
     return {
         "matched": False,
         "swipes_remaining": updated_swipe_status["swipes_remaining"],
         "is_premium": updated_swipe_status["is_premium"]
     }
 
+MAX_SWIPE_BATCH = 200
+
+@app.post("/api/swipes/batch")
+async def swipe_batch(batch: SwipeBatch):
+    """Apply a client's queued swipes in order
+
+    Quota, dedupe, likes and mutual matches are resolved for the whole
+    batch, with one bulk write per collection. Each item gets a status:
+    "recorded", "duplicate" (target already swiped), "invalid" or
+    "daily_limit_reached" (free users, once the day's swipes run out).
+    """
+    if len(batch.swipes) > MAX_SWIPE_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SWIPE_BATCH} swipes per batch")
+    swiper_id = batch.swiper_id
+    target_ids = list({item.target_id for item in batch.swipes})
+    subscription, already_swiped, targets = await asyncio.gather(
+        get_user_subscription(swiper_id),
+        swipes_collection.distinct("target_id", {"swiper_id": swiper_id, "target_id": {"$in": target_ids}}),
+        fetch_all(users_collection.find({"user_id": {"$in": target_ids}}, {"_id": 0, "user_id": 1, "user_seq": 1}))
+    )
+    user_seqs = {target["user_id"]: target.get("user_seq") for target in targets}
+
+    results = []
+    accepted = []
+    swiped = set(already_swiped)
+    for index, item in enumerate(batch.swipes):
+        result = {"index": index, "target_id": item.target_id, "matched": False}
+        results.append(result)
+        if item.action not in ("like", "pass") or item.target_id == swiper_id:
+            result["status"] = "invalid"
+        elif item.target_id in swiped:
+            result["status"] = "duplicate"
+        else:
+            swiped.add(item.target_id)
+            accepted.append((result, item))
+
+    granted, today_swipes = await consume_swipes(
+        swiper_id, len(accepted), FREE_DAILY_SWIPE_LIMIT if subscription["plan_type"] == "free" else None
+    )
+    for result, _ in accepted[granted:]:
+        result["status"] = "daily_limit_reached"
+    accepted = accepted[:granted]
+
+    if accepted:
+        now = datetime.utcnow()
+        swipe_writes, seen_writes = [], []
+        for offset, (result, item) in enumerate(accepted):
+            result["status"] = "recorded"
+            # Keep the batch order in swiped_at, which rewind and the likes page sort on (stored to the millisecond)
+            swiped_at = now - timedelta(milliseconds=len(accepted) - 1 - offset)
+            swipe_data = {
+                "swipe_id": str(uuid.uuid4()),
+                "swiper_id": swiper_id,
+                "target_id": item.target_id,
+                "action": item.action,
+                "swiped_at": swiped_at,
+                "timestamp": swiped_at
+            }
+            swipe_writes.append(UpdateOne(swipe_pair_filter(swiper_id, item.target_id), {"$set": swipe_data}, upsert=True))
+            if user_seqs.get(item.target_id) is not None:
+                query, update = seen_update(swiper_id, user_seqs[item.target_id])
+                seen_writes.append(UpdateOne(query, update, upsert=True))
+
+        writes = [swipes_collection.bulk_write(swipe_writes, ordered=False)]
+        if seen_writes:
+            writes.append(swipe_exclusions_collection.bulk_write(seen_writes, ordered=False))
+        await asyncio.gather(*writes)
+        # After the seen-set writes, as in swipe_user
+        await pop_candidates(swiper_id, [item.target_id for _, item in accepted])
+
+        liked_ids = [item.target_id for _, item in accepted if item.action == "like"]
+        mutual_ids = set(await swipes_collection.distinct("swiper_id", {
+            "swiper_id": {"$in": liked_ids},
+            "target_id": swiper_id,
+            "action": "like"
+        })) if liked_ids else set()
+
+        candidates = {
+            match_data["pair_key"]: match_data
+            for match_data in (new_match(swiper_id, target_id, now) for target_id in mutual_ids)
+        }
+        new_matches = []
+        if candidates:
+            try:
+                await matches_collection.bulk_write([
+                    UpdateOne({"pair_key": key}, {"$setOnInsert": match_data}, upsert=True)
+                    for key, match_data in candidates.items()
+                ], ordered=False)
+            except BulkWriteError as e:
+                # Parallel upserts for the same pair; the read below picks up whichever match won
+                if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                    raise
+            matches = {
+                match["pair_key"]: match
+                async for match in matches_collection.find({"pair_key": {"$in": list(candidates)}}, {"_id": 0})
+            }
+            for result, item in accepted:
+                match = matches.get(match_pair_key(swiper_id, item.target_id))
+                if item.action == "like" and match:
+                    result.update({"matched": True, "match_id": match["match_id"]})
+            new_matches = [
+                match for key, match in matches.items() if match["match_id"] == candidates[key]["match_id"]
+            ]
+        for match_data in new_matches:
+            # Analytics is read-modify-write, so the swiper's updates go one match at a time
+            await asyncio.gather(
+                update_user_analytics(swiper_id, "match_made"),
+                update_user_analytics(match_data["user2_id"], "match_made")
+            )
+            match_notification = json.dumps({
+                "type": "new_match",
+                "match_id": match_data["match_id"],
+                "message": "You have a new match!"
+            })
+            await manager.send_message(match_notification, swiper_id)
+            await manager.send_message(match_notification, match_data["user2_id"])
+
+    swipe_status = swipe_limit_status(subscription, today_swipes)
+    return {
+        "results": results,
+        "recorded": len(accepted),
+        "matches": sum(result["matched"] for result in results),
+        "swipes_remaining": swipe_status["swipes_remaining"],
+        "is_premium": swipe_status["is_premium"]
+    }
+
 @app.get("/api/matches/{user_id}")
-async def get_user_matches(user_id: str):
-    """Get all matches for a user"""
-    matches = list(matches_collection.find({
-        "$or": [
+async def get_user_matches(user_id: str, response: Response, cursor: Optional[str] = None,
+                           limit: int = DEFAULT_PAGE_SIZE):
+    """Get a page of matches for a user, most recent conversation first"""
+    matches, next_cursor = await paginate(
+        matches_collection,
+        {"$or": [
             {"user1_id": user_id},
             {"user2_id": user_id}
-        ]
-    }).sort("last_message_at", -1))
+        ]},
+        ["last_message_at", "match_id"],
+        descending=True,
+        limit=clamp_page_size(limit),
+        cursor=cursor,
+        projection={"_id": 0}
+    )
+    set_cursor_headers(response, next_cursor=next_cursor)
+    
+    # Get user data for all matches in one batch
+    other_users = await user_profile_loader().load_many(
+        [match["user2_id"] if match["user1_id"] == user_id else match["user1_id"] for match in matches]
+    )
     
-    # Get user data for each match
     enriched_matches = []
-    for match in matches:
-        other_user_id = match["user2_id"] if match["user1_id"] == user_id else match["user1_id"]
-        other_user = users_collection.find_one({"user_id": other_user_id})
-        
+    for match, other_user in zip(matches, other_users):
         if other_user:
-            other_user.pop('_id', None)
-            match.pop('_id', None)
             match["other_user"] = other_user
             enriched_matches.append(match)
     
     return enriched_matches
 
+async def increment_unread_count(match_id: str, recipient_id: str):
+    """Atomically bump the recipient's unread counter for a match"""
+    await read_status_collection.update_one(
+        {"user_id": recipient_id, "match_id": match_id},
+        {"$inc": {"unread_count": 1}},
+        upsert=True
+    )
+
+def matches_with_messages_pipeline(user_id: str) -> list:
+    """Aggregation returning each match with its other user, last message snapshot and unread counter"""
+    return [
+        {"$match": {"$or": [{"user1_id": user_id}, {"user2_id": user_id}]}},
+        {"$sort": {"created_at": -1}},
+        {"$addFields": {
+            "other_user_id": {"$cond": [{"$eq": ["$user1_id", user_id]}, "$user2_id", "$user1_id"]}
+        }},
+        # Other user, without sensitive fields
+        {"$lookup": {
+            "from": users_collection.name,
+            "let": {"other_user_id": "$other_user_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$user_id", "$$other_user_id"]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 0, "password_hash": 0}}
+            ],
+            "as": "other_user"
+        }},
+        {"$unwind": "$other_user"},
+        # Unread counter maintained by the send paths and reset by mark-read
+        {"$lookup": {
+            "from": read_status_collection.name,
+            "let": {"match_id": "$match_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$and": [
+                    {"$eq": ["$user_id", user_id]},
+                    {"$eq": ["$match_id", "$$match_id"]}
+                ]}}},
+                {"$limit": 1},
+                {"$project": {"_id": 0, "unread_count": 1}}
+            ],
+            "as": "read_status"
+        }},
+        {"$project": {
+            "_id": 0,
+            "match_id": 1,
+            "user1_id": 1,
+            "user2_id": 1,
+            "created_at": 1,
+            "last_message_at": {"$ifNull": ["$last_message_at", "$created_at"]},
+            "other_user": 1,
+            # Snapshot written by the send paths, so no message reads are needed
+            "latest_message": "$last_message",
+            "unread_count": {"$ifNull": [{"$arrayElemAt": ["$read_status.unread_count", 0]}, 0]}
+        }}
+    ]
+
 @app.get("/api/matches-with-messages/{user_id}")
 async def get_matches_with_messages(user_id: str):
     """Get user's matches with latest message info and unread counts"""
     try:
-        # Get user's matches
-        matches = list(matches_collection.find({
-            "$or": [{"user1_id": user_id}, {"user2_id": user_id}]
-        }).sort("created_at", -1))
-        
-        result = []
-        for match in matches:
-            # Determine the other user
-            other_user_id = match["user2_id"] if match["user1_id"] == user_id else match["user1_id"]
-            other_user = users_collection.find_one({"user_id": other_user_id})
-            
-            if not other_user:
-                continue
-                
-            # Remove sensitive data from other_user
-            other_user.pop('_id', None)
-            other_user.pop('password_hash', None)
-            
-            # Get latest message for this match
-            latest_message = messages_collection.find_one(
-                {"match_id": match["match_id"]},
-                sort=[("timestamp", -1)]
-            )
-            
-            # Get unread message count based on actual read status
-            read_status_collection = db.read_status
-            read_status = read_status_collection.find_one({
-                "user_id": user_id,
-                "match_id": match["match_id"]
-            })
-            
-            if read_status and read_status.get("last_read_at"):
-                # Count messages from other user after last read time
-                unread_count = messages_collection.count_documents({
-                    "match_id": match["match_id"],
-                    "sender_id": other_user_id,
-                    "timestamp": {"$gt": read_status["last_read_at"]}
-                })
-            else:
-                # If no read status exists, count all messages from other user
-                unread_count = messages_collection.count_documents({
-                    "match_id": match["match_id"],
-                    "sender_id": other_user_id
-                })
-            
-            match_data = {
-                "match_id": match["match_id"],
-                "user1_id": match["user1_id"],
-                "user2_id": match["user2_id"],
-                "created_at": match["created_at"],
-                "last_message_at": match.get("last_message_at", match["created_at"]),
-                "other_user": other_user,
-                "latest_message": {
-                    "content": latest_message.get("content", "") if latest_message else "",
-                    "timestamp": latest_message.get("timestamp") if latest_message else None,
-                    "sender_id": latest_message.get("sender_id") if latest_message else None
-                },
-                "unread_count": unread_count
+        # Everything comes back from a single aggregation round trip
+        result = await fetch_all(matches_collection.aggregate(matches_with_messages_pipeline(user_id)))
+        
+        for match_data in result:
+            latest_message = match_data.get("latest_message")
+            match_data["latest_message"] = {
+                "content": latest_message.get("content", "") if latest_message else "",
+                "timestamp": latest_message.get("timestamp") if latest_message else None,
+                "sender_id": latest_message.get("sender_id") if latest_message else None
             }
-            result.append(match_data)
         
         return result
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch matches: {str(e)}")
 
+MESSAGE_SORT_FIELDS = ["timestamp", "message_id"]
+
 @app.get("/api/messages/{match_id}")
-async def get_match_messages(match_id: str, limit: int = 50):
-    """Get messages for a specific match"""
-    messages = list(messages_collection.find({
-        "match_id": match_id
-    }).sort("timestamp", -1).limit(limit))
+async def get_match_messages(match_id: str, response: Response, limit: int = 50,
+                             cursor: Optional[str] = None, direction: str = "older"):
+    """Get a page of messages for a specific match, oldest first
+
+    Without a cursor this is the newest page. direction="older" pages back through
+    history from the cursor; direction="newer" pages forward. The next page's cursor
+    is returned in X-Next-Cursor, and X-Prev-Cursor points the opposite way.
+    """
+    if direction not in ["older", "newer"]:
+        raise HTTPException(status_code=400, detail="direction must be 'older' or 'newer'")
+    
+    limit = clamp_page_size(limit)
+    descending = direction == "older"
+    sort_order = -1 if descending else 1
+    
+    query = {"match_id": match_id}
+    if cursor:
+        # Keyset seek on (timestamp, message_id) - same cost at any depth
+        query.update(keyset_filter(decode_cursor(cursor), MESSAGE_SORT_FIELDS, descending))
+    
+    # Fetch one extra row to know whether another page exists
+    messages = await fetch_all(
+        messages_collection.find(query, {"_id": 0})
+        .sort([("timestamp", sort_order), ("message_id", sort_order)])
+        .limit(limit + 1)
+    )
+    has_more = len(messages) > limit
+    messages = messages[:limit]
     
-    # Remove MongoDB _id fields and reverse order
-    for msg in messages:
-        msg.pop('_id', None)
+    if messages:
+        def position(msg):
+            return encode_cursor({field: msg[field] for field in MESSAGE_SORT_FIELDS})
+        
+        set_cursor_headers(
+            response,
+            next_cursor=position(messages[-1]) if has_more else None,
+            prev_cursor=position(messages[0])
+        )
     
-    return list(reversed(messages))
+    # Return in chronological order
+    return list(reversed(messages)) if descending else messages
 
 @app.post("/api/messages/{match_id}/mark-read")
 async def mark_messages_read(match_id: str, user_data: dict):
@@ -2912,17 +2870,15 @@ async def mark_messages_read(match_id: str, user_data: dict):
         if not user_id:
             raise HTTPException(status_code=400, detail="user_id required")
         
-        # Create or update a read_status collection to track when users last read messages
-        read_status_collection = db.read_status
-        
         read_status = {
             "user_id": user_id,
             "match_id": match_id,
-            "last_read_at": datetime.utcnow()
+            "last_read_at": datetime.utcnow(),
+            "unread_count": 0
         }
         
-        # Upsert the read status
-        read_status_collection.update_one(
+        # Upsert the read status and reset the unread counter
+        await read_status_collection.update_one(
             {"user_id": user_id, "match_id": match_id},
             {"$set": read_status},
             upsert=True
@@ -2944,7 +2900,7 @@ async def send_message(message_data: dict):
                 raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
         
         # Validate match exists
-        match = matches_collection.find_one({"match_id": message_data["match_id"]})
+        match = await matches_collection.find_one({"match_id": message_data["match_id"]})
         if not match:
             raise HTTPException(status_code=404, detail="Match not found")
         
@@ -2962,20 +2918,23 @@ async def send_message(message_data: dict):
         }
         
         # Save message to database
-        messages_collection.insert_one(msg)
+        await messages_collection.insert_one(msg)
         
         # Update analytics
-        update_user_analytics(message_data["sender_id"], "message_sent")
+        await update_user_analytics(message_data["sender_id"], "message_sent")
         
-        # Update match last message time
-        matches_collection.update_one(
+        # Update match last message time and preview in the same write
+        await matches_collection.update_one(
             {"match_id": message_data["match_id"]},
-            {"$set": {"last_message_at": datetime.utcnow()}}
+            {"$set": {"last_message_at": msg["timestamp"], "last_message": last_message_snapshot(msg)}}
         )
         
         # Find the other user in the match
         other_user_id = match["user2_id"] if match["user1_id"] == message_data["sender_id"] else match["user1_id"]
         
+        # Count the message as unread for the recipient
+        await increment_unread_count(message_data["match_id"], other_user_id)
+        
         # Remove MongoDB _id field
         msg_response = msg.copy()
         msg_response.pop('_id', None)
@@ -3015,18 +2974,20 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
                     "content": message_data["content"],
                     "timestamp": datetime.utcnow()
                 }
-                messages_collection.insert_one(msg)
+                await messages_collection.insert_one(msg)
                 
-                # Update match last message time
-                matches_collection.update_one(
+                # Update match last message time and preview, returning the match
+                match = await matches_collection.find_one_and_update(
                     {"match_id": message_data["match_id"]},
-                    {"$set": {"last_message_at": datetime.utcnow()}}
+                    {"$set": {"last_message_at": msg["timestamp"], "last_message": last_message_snapshot(msg)}}
                 )
                 
                 # Find the other user in the match
-                match = matches_collection.find_one({"match_id": message_data["match_id"]})
                 other_user_id = match["user2_id"] if match["user1_id"] == user_id else match["user1_id"]
                 
+                # Count the message as unread for the recipient
+                await increment_unread_count(message_data["match_id"], other_user_id)
+                
                 # Send message to other user if connected
                 msg.pop('_id', None)
                 await manager.send_message(json.dumps({
@@ -0,0 +1,82 @@
+"""Per-user daily swipe counters.
+
+Every swipe increments one bucket per user per UTC day in ``swipe_quotas``:
+
+    {"_id": "<user_id>:<YYYY-MM-DD>", "user_id": ..., "day": ..., "count": 7, "expires_at": ...}
+
+Free users consume a swipe with a conditional upsert that only matches
+while ``count`` is below the limit. At the limit the filter misses, the
+upsert collides with the existing ``_id``, and the swipe is rejected by
+that same write. Parallel swipes can't overshoot the limit, and checking
+the allowance is a single ``_id`` lookup instead of counting the day's
+swipes. Premium swipes are counted too (unconditionally), so a plan that
+lapses mid-day starts from the right count. Buckets carry
+``expires_at`` and a TTL index drops them once the day is over.
+"""
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database import swipe_quotas_collection
+
+FREE_DAILY_SWIPE_LIMIT = 20
+# Buckets outlive their day a little, so a request straddling midnight still finds its bucket
+QUOTA_RETENTION = timedelta(days=2)
+
+def quota_day(when: Optional[datetime] = None) -> str:
+    return (when or datetime.utcnow()).strftime("%Y-%m-%d")
+
+def quota_key(user_id: str, day: str) -> str:
+    return f"{user_id}:{day}"
+
+async def swipes_used_today(user_id: str) -> int:
+    """Swipes user_id made since midnight UTC"""
+    bucket = await swipe_quotas_collection.find_one({"_id": quota_key(user_id, quota_day())}, {"count": 1})
+    return bucket["count"] if bucket else 0
+
+async def consume_swipes(user_id: str, count: int, limit: Optional[int] = FREE_DAILY_SWIPE_LIMIT) -> Tuple[int, int]:
+    """Count up to count swipes for today; (swipes granted, today's new total)
+
+    Grants as many as fit under limit (all of them for limit=None), so a
+    queued batch is accepted up to the limit and no further.
+    """
+    day = quota_day()
+    key = quota_key(user_id, day)
+    update = {"$setOnInsert": {
+        "user_id": user_id,
+        "day": day,
+        "expires_at": datetime.strptime(day, "%Y-%m-%d") + QUOTA_RETENTION
+    }}
+    granted = count if limit is None else min(count, limit)
+    while granted > 0:
+        query = {"_id": key} if limit is None else {"_id": key, "count": {"$lte": limit - granted}}
+        try:
+            bucket = await swipe_quotas_collection.find_one_and_update(
+                query, {**update, "$inc": {"count": granted}}, upsert=True, return_document=ReturnDocument.AFTER
+            )
+            return granted, bucket["count"]
+        except DuplicateKeyError:
+            # Today's bucket has less room than granted, or a parallel first swipe just created it.
+            # Retry with what is left; without a limit, only the latter applies and the retry updates it.
+            if limit is not None:
+                granted = min(granted, limit - await swipes_used_today(user_id))
+    return 0, await swipes_used_today(user_id)
+
+async def consume_swipe(user_id: str, limit: Optional[int] = FREE_DAILY_SWIPE_LIMIT) -> Optional[int]:
+    """Count one swipe for today and return the new total, or None if user_id is already at limit
+
+    limit=None counts the swipe without a cap (premium plans).
+    """
+    granted, total = await consume_swipes(user_id, 1, limit)
+    return total if granted else None
+
+async def refund_swipe(user_id: str, swiped_at: datetime):
+    """Give back a swipe that was undone, if it still counts against today"""
+    if quota_day(swiped_at) != quota_day():
+        return
+    await swipe_quotas_collection.update_one(
+        {"_id": quota_key(user_id, quota_day(swiped_at)), "count": {"$gt": 0}},
+        {"$inc": {"count": -1}}
+    )
@@ -10,53 +10,6 @@ class MatchingSystemCleanup:
         self.matches_collection = self.db.matches
         self.messages_collection = self.db.messages
 
-    def check_for_duplicate_swipes(self):
-        """Check for and remove duplicate swipes"""
-        print("\n🔍 Checking for Duplicate Swipes...")
-        
-        # Get all swipes
-        all_swipes = list(self.swipes_collection.find())
-        print(f"Total swipes in database: {len(all_swipes)}")
-        
-        # Track swipes by swiper-target pair
-        swipe_pairs = {}
-        duplicates = []
-        
-        for swipe in all_swipes:
-            pair_key = f"{swipe['swiper_id']}_{swipe['target_id']}"
-            if pair_key in swipe_pairs:
-                # This is a duplicate
-                duplicates.append(swipe)
-                swipe_pairs[pair_key].append(swipe)
-            else:
-                swipe_pairs[pair_key] = [swipe]
-        
-        # Count pairs with duplicates
-        duplicate_pairs = {k: v for k, v in swipe_pairs.items() if len(v) > 1}
-        
-        print(f"Found {len(duplicates)} duplicate swipes across {len(duplicate_pairs)} swiper-target pairs")
-        
-        # Remove duplicates (keep the most recent swipe for each pair)
-        if duplicate_pairs:
-            print("\nRemoving duplicate swipes...")
-            removed_count = 0
-            
-            for pair, swipes in duplicate_pairs.items():
-                # Sort by timestamp (newest first)
-                sorted_swipes = sorted(swipes, key=lambda x: x.get('timestamp', datetime.min), reverse=True)
-                
-                # Keep the most recent swipe, remove the rest
-                for swipe in sorted_swipes[1:]:
-                    self.swipes_collection.delete_one({"swipe_id": swipe["swipe_id"]})
-                    removed_count += 1
-                    print(f"Removed duplicate swipe: {swipe['swiper_id']} → {swipe['target_id']} (ID: {swipe['swipe_id']})")
-            
-            print(f"\n✅ Removed {removed_count} duplicate swipes")
-        else:
-            print("✅ No duplicate swipes found")
-        
-        return duplicate_pairs
-
     def check_for_demo_users(self):
         """Check for and remove demo users"""
         print("\n🔍 Checking for Demo Users...")
@@ -256,6 +209,7 @@ class MatchingSystemCleanup:
                 # Create the match
                 match_data = {
                     "match_id": str(uuid.uuid4()),
+                    "pair_key": ":".join(sorted((user1_id, user2_id))),
                     "user1_id": user1_id,
                     "user2_id": user2_id,
                     "created_at": datetime.utcnow(),
@@ -277,21 +231,20 @@ class MatchingSystemCleanup:
         """Run all cleanup operations"""
         print("🧹 Starting Matching System Cleanup")
         
-        # Step 1: Check for and remove duplicate swipes
-        duplicate_pairs = self.check_for_duplicate_swipes()
+        # Duplicate swipes can no longer be written: swipes have a unique
+        # (swiper_id, target_id) index (see backend/migrations.py unique_swipes)
         
-        # Step 2: Check for and remove demo users
+        # Step 1: Check for and remove demo users
         demo_users, suspicious_users = self.check_for_demo_users()
         
-        # Step 3: Check for and fix asymmetric matches
+        # Step 2: Check for and fix asymmetric matches
         asymmetric_matches = self.check_for_asymmetric_matches()
         
-        # Step 4: Check for and create missing matches
+        # Step 3: Check for and create missing matches
         missing_matches = self.check_for_missing_mutual_likes()
         
         # Print summary
         print("\n📊 Cleanup Summary:")
-        print(f"Duplicate swipes removed: {sum(len(swipes) - 1 for swipes in duplicate_pairs.values()) if duplicate_pairs else 0}")
         print(f"Demo users removed: {len(demo_users)}")
         print(f"Suspicious users removed: {len(suspicious_users)}")
         print(f"Asymmetric matches removed: {len(asymmetric_matches)}")
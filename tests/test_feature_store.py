@@ -0,0 +1,195 @@
+"""Ranking from the in-process feature store against the per-pair scorer"""
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import feature_store
+import scoring_pool
+from exclusions import SeenSet
+from feature_store import UserFeatureStore
+from matching import AIMatchingService
+from test_matching import random_profile
+
+def stored_profiles(rng: random.Random, count: int) -> list:
+    now = datetime.utcnow()
+    profiles = []
+    for seq in range(1, count + 1):
+        profile = random_profile(rng, unusual=(seq % 11 == 0))
+        profile.update({
+            "user_id": f"user-{seq}",
+            "user_seq": seq,
+            "profile_complete": True,
+            "last_activity": now - timedelta(minutes=rng.randint(0, 5000)),
+        })
+        profiles.append(profile)
+    return profiles
+
+def expected_order(user: dict, profiles: list, excluded: set) -> list:
+    scored = [
+        (AIMatchingService.calculate_compatibility_score(user, profile)["compatibility_percentage"], profile)
+        for profile in profiles if profile["user_id"] not in excluded
+    ]
+    scored.sort(key=lambda item: (-item[0], -item[1]["last_activity"].timestamp()))
+    return [(percentage, profile["user_id"]) for percentage, profile in scored]
+
+def ranked(store: UserFeatureStore, user: dict, seen: SeenSet, profiles: list, k: int = 1000) -> list:
+    rows = store.rank(user, seen, k)
+    by_id = {profile["user_id"]: profile for profile in profiles}
+    return [
+        (AIMatchingService.calculate_compatibility_score(user, by_id[store.user_ids[row]])["compatibility_percentage"],
+         store.user_ids[row])
+        for row in rows
+    ]
+
+def test_rank_matches_per_pair_order_and_skips_seen_users():
+    rng = random.Random(5)
+    store_profiles = stored_profiles(rng, 300)
+    store = UserFeatureStore(capacity=16)
+    for profile in store_profiles:
+        store.upsert(profile)
+    assert len(store) == 300
+    assert store.row_nbytes < 64
+
+    user = dict(store_profiles[0])
+    seen = SeenSet()
+    for seq in (2, 3, 50, 299):
+        seen.add(seq)
+    excluded = {"user-1", "user-2", "user-3", "user-50", "user-299"}
+    expected = expected_order(user, store_profiles, excluded)
+    assert ranked(store, user, seen, store_profiles) == expected
+    for k in (1, 10, 37):
+        assert ranked(store, user, seen, store_profiles, k) == expected[:k]
+
+def test_updates_and_removals_are_reflected():
+    rng = random.Random(8)
+    store_profiles = stored_profiles(rng, 50)
+    store = UserFeatureStore(capacity=8)
+    for profile in store_profiles:
+        store.upsert(profile)
+
+    store_profiles[10] = {**store_profiles[10], "preferred_tokens": ["DeFi"], "trading_style": "Scalper"}
+    store.upsert(store_profiles[10])
+    store.upsert({**store_profiles[20], "profile_complete": False})
+    store.remove("user-30")
+    remaining = [p for p in store_profiles if p["user_id"] not in ("user-21", "user-30")]
+
+    user = random_profile(rng)
+    user["user_id"] = "outsider"
+    assert ranked(store, user, SeenSet(), store_profiles) == expected_order(user, remaining, set())
+
+    # Freed rows are reused
+    store.upsert({**store_profiles[20], "profile_complete": True})
+    assert len(store.user_ids) == 50
+
+def test_shortlist_holds_overlapping_users_and_scores_like_the_full_store():
+    rng = random.Random(13)
+    store_profiles = stored_profiles(rng, 200)
+    store = UserFeatureStore(capacity=16)
+    for profile in store_profiles:
+        store.upsert(profile)
+
+    user = {**store_profiles[0], "preferred_tokens": ["AI"], "looking_for": ["Learning"]}
+    rows = store.shortlist(user)
+    expected_ids = {
+        profile["user_id"] for seq, profile in enumerate(store_profiles, start=1)
+        if seq % 11 == 0
+        or "AI" in (profile.get("preferred_tokens") or [])
+        or {"Learning", "Teaching"} & set(profile.get("looking_for") or [])
+    }
+    assert {store.user_ids[row] for row in rows} == expected_ids
+
+    # Scores over the shortlist equal the full store's scores for the same rows
+    all_rows, all_percentage = store.score(user, SeenSet())
+    shortlisted_rows, percentage = store.score(user, SeenSet(), candidates=rows)
+    full = dict(zip(all_rows, all_percentage))
+    assert list(shortlisted_rows) == [row for row in rows if row != store.rows[user["user_id"]]]
+    assert [full[row] for row in shortlisted_rows] == list(percentage)
+
+    sampled = store.shortlist(user, sample=10)
+    assert len(sampled) == len(rows) + 10
+    assert set(rows) <= set(sampled)
+
+def test_scores_from_the_scoring_pool_match_inline_scores(monkeypatch):
+    rng = random.Random(21)
+    store_profiles = stored_profiles(rng, 120)
+    store = UserFeatureStore(capacity=16)
+    for profile in store_profiles:
+        store.upsert(profile)
+    user = random_profile(rng)
+    user["user_id"] = "outsider"
+    seen = SeenSet()
+    seen.add(4)
+
+    monkeypatch.setattr(feature_store, "SCORING_OFFLOAD_MIN", 1)
+    monkeypatch.setattr(scoring_pool, "SCORING_CHUNK_SIZE", 25)
+    try:
+        for as_candidate in (False, True):
+            rows, percentage = store.score(user, seen, as_candidate)
+            pooled, pooled_percentage = asyncio.run(store.score_async(user, seen, as_candidate))
+            assert list(pooled.rows) == list(rows)
+            assert list(pooled.user_ids) == [store.user_ids[row] for row in rows]
+            assert list(pooled_percentage) == list(percentage)
+        # The deadline is an instant shared by the request's scoring calls, not a per-call timeout
+        with pytest.raises(scoring_pool.ScoringDeadlineExceeded):
+            asyncio.run(store.score_async(user, seen, deadline=time.monotonic() - 1))
+    finally:
+        scoring_pool.shutdown()
+
+def test_rows_reused_while_the_pool_scores_keep_their_scored_users(monkeypatch):
+    rng = random.Random(27)
+    store_profiles = stored_profiles(rng, 40)
+    store = UserFeatureStore(capacity=16)
+    for profile in store_profiles:
+        store.upsert(profile)
+    user = random_profile(rng)
+    user["user_id"] = "outsider"
+    expected_rows, expected_percentage = store.score(user, SeenSet())
+
+    async def score_features(*args):
+        # Another request removes user-5 and a new user takes its row mid-scoring
+        percentage = await pooled_score_features(*args)
+        store.remove("user-5")
+        store.upsert({**store_profiles[4], "user_id": "newcomer", "user_seq": 999})
+        return percentage
+    pooled_score_features = feature_store.score_features
+    monkeypatch.setattr(feature_store, "score_features", score_features)
+    monkeypatch.setattr(feature_store, "SCORING_OFFLOAD_MIN", 1)
+    try:
+        scored, percentage = asyncio.run(store.score_async(user, SeenSet()))
+    finally:
+        scoring_pool.shutdown()
+    assert store.user_ids[store.rows["newcomer"]] == "newcomer"
+    assert list(scored.user_ids) == [f"user-{row + 1}" for row in expected_rows]
+    assert list(percentage) == list(expected_percentage)
+
+def test_recommend_within_scores_the_most_recent_candidates_first(monkeypatch):
+    rng = random.Random(34)
+    store_profiles = stored_profiles(rng, 90)
+    store = UserFeatureStore(capacity=16)
+    for profile in store_profiles:
+        store.upsert(profile)
+    user = random_profile(rng)
+    user["user_id"] = "outsider"
+
+    async def fetch_top(user, scored, percentage, limit):
+        return list(scored.top(percentage, limit).user_ids)
+    monkeypatch.setattr(store, "_fetch_top", fetch_top)
+    monkeypatch.setattr(feature_store, "ANYTIME_CHUNK_ROWS", 20)
+
+    # A spent budget still scores the first chunk: the 20 most recently active users
+    results, evaluated, total = asyncio.run(store.recommend_within(user, SeenSet(), 5, budget=0))
+    recent = sorted(store_profiles, key=lambda profile: -profile["last_activity"].timestamp())[:20]
+    assert (evaluated, total) == (20, 90)
+    assert [uid for _, uid in expected_order(user, recent, set())[:5]] == results
+
+    results, evaluated, total = asyncio.run(store.recommend_within(user, SeenSet(), 5, budget=60))
+    assert (evaluated, total) == (90, 90)
+    assert [uid for _, uid in expected_order(user, store_profiles, set())[:5]] == results
@@ -0,0 +1,129 @@
+"""Parity of the vectorized batch scorer with the per-pair AIMatchingService"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import numpy as np
+
+from matching import COMPONENTS, AIMatchingService, BatchCompatibilityScorer, top_k_rows
+from score_cache import CompatibilityCache
+
+EXPERIENCE = ["Beginner", "Intermediate", "Advanced", "Expert", "Guru", "", None]
+PLATFORMS = ["Jupiter", "Raydium", "Orca", "Binance", "", None]
+COMM_PLATFORMS = ["Discord", "Telegram", "Twitter", "", None]
+TOKENS = ["DeFi", "NFTs", "Meme Coins", "Gaming", "AI", "Layer 1", "RWA"]
+GOALS = ["Learning", "Teaching", "Alpha Sharing", "Research Partner", "Risk Management", "Networking", "Copy Trading"]
+STYLES = ["Day Trader", "Swing Trader", "HODLer", "Scalper", "Long-term Investor", "Arbitrage", "Bot Trader", "", None]
+RISK = ["Conservative", "Moderate", "Aggressive", "YOLO", "Degen", "", None]
+COMM_STYLES = ["Professional", "Technical", "Casual", "Friendly", "Chaotic", "", None]
+HOURS = ["Morning", "Afternoon", "Evening", "Night", "24/7", "", None]
+
+def random_profile(rng: random.Random, unusual: bool = False) -> dict:
+    profile = {
+        "trading_experience": rng.choice(EXPERIENCE),
+        "years_trading": rng.choice([0, 1, 2, 3, 5, 10, 1.5, 2.5]),
+        "preferred_trading_platform": rng.choice(PLATFORMS),
+        "preferred_communication_platform": rng.choice(COMM_PLATFORMS),
+        "preferred_tokens": rng.sample(TOKENS, rng.randint(0, 5)),
+        # Duplicated goals count twice towards complementary pairs
+        "looking_for": [rng.choice(GOALS) for _ in range(rng.randint(0, 4))],
+        "trading_style": rng.choice(STYLES),
+        "risk_tolerance": rng.choice(RISK),
+        "communication_style": rng.choice(COMM_STYLES),
+        "trading_hours": rng.choice(HOURS),
+    }
+    # Missing keys fall back to the per-field defaults
+    for field in rng.sample(list(profile), rng.randint(0, 3)):
+        del profile[field]
+    if unusual:
+        # Values the array encoding can't mirror go through the per-pair path
+        field, value = rng.choice([
+            ("preferred_tokens", "DeFi"),
+            ("looking_for", "Teaching"),
+            ("trading_style", 7),
+            ("preferred_trading_platform", ["Jupiter"]),
+        ])
+        profile[field] = value
+    return profile
+
+def assert_parity(user: dict, candidates: list, as_candidate: bool = False):
+    scores = BatchCompatibilityScorer(candidates).score(user, as_candidate=as_candidate)
+    for row, candidate in enumerate(candidates):
+        if as_candidate:
+            expected = AIMatchingService.calculate_compatibility_score(candidate, user)
+        else:
+            expected = AIMatchingService.calculate_compatibility_score(user, candidate)
+        assert scores["compatibility_percentage"][row] == expected["compatibility_percentage"], (user, candidate)
+        assert scores["total_score"][row] == expected["total_score"], (user, candidate)
+        assert scores["max_possible_score"] == expected["max_possible_score"]
+        for component in COMPONENTS:
+            assert scores["breakdown"][component][row] == expected["breakdown"][component]["score"], (component, user, candidate)
+
+def test_batch_scores_match_per_pair_scores():
+    rng = random.Random(1234)
+    candidates = [random_profile(rng) for _ in range(500)]
+    for _ in range(50):
+        assert_parity(random_profile(rng), candidates)
+
+def test_unencodable_candidates_fall_back_to_per_pair_scores():
+    rng = random.Random(99)
+    candidates = [random_profile(rng, unusual=(i % 7 == 0)) for i in range(200)]
+    scorer = BatchCompatibilityScorer(candidates)
+    assert len(scorer.fallback) == len(range(0, 200, 7))
+    for _ in range(20):
+        assert_parity(random_profile(rng), candidates)
+
+def test_unencodable_user_scores_every_candidate_per_pair():
+    rng = random.Random(7)
+    candidates = [random_profile(rng) for _ in range(100)]
+    for _ in range(10):
+        assert_parity(random_profile(rng, unusual=True), candidates)
+
+def test_scores_as_candidate_match_the_reversed_pair():
+    rng = random.Random(42)
+    candidates = [random_profile(rng, unusual=(i % 9 == 0)) for i in range(300)]
+    # Goal and style pairs are not symmetric
+    user = {"looking_for": ["Teaching", "Risk Management"], "trading_style": "Day Trader"}
+    assert_parity(user, candidates, as_candidate=True)
+    for i in range(30):
+        assert_parity(random_profile(rng, unusual=(i % 5 == 0)), candidates, as_candidate=True)
+
+def test_empty_candidate_list():
+    scores = BatchCompatibilityScorer([]).score({"trading_experience": "Expert"})
+    assert len(scores["compatibility_percentage"]) == 0
+
+def test_top_k_rows_is_a_prefix_of_the_stable_full_sort():
+    rng = random.Random(3)
+    percentage = np.array([rng.randint(0, 20) for _ in range(400)])
+    tiebreak = np.array([rng.randint(0, 5) for _ in range(400)], dtype=np.float64)
+    by_score = sorted(range(400), key=lambda row: -percentage[row])
+    by_score_then_tiebreak = sorted(range(400), key=lambda row: (-percentage[row], -tiebreak[row]))
+    for k in (0, 1, 5, 50, 399, 400, 500):
+        assert list(top_k_rows(percentage, k)) == by_score[:k]
+        assert list(top_k_rows(percentage, k, tiebreak)) == by_score_then_tiebreak[:k]
+
+def test_compatibility_cache_shares_pair_entries_and_tracks_versions():
+    now = [0.0]
+    cache = CompatibilityCache(max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+    alice = {"user_id": "a", "profile_version": 1, "looking_for": ["Risk Management"], "trading_style": "Arbitrage"}
+    bob = {"user_id": "b", "looking_for": ["Teaching"], "trading_style": "Day Trader"}
+    carol = {"user_id": "c", "trading_style": "Scalper"}
+
+    assert cache.score(alice, bob) == AIMatchingService.calculate_compatibility_score(alice, bob)
+    # One entry per pair, one result per direction
+    assert cache.score(bob, alice) == AIMatchingService.calculate_compatibility_score(bob, alice)
+    assert cache.score(bob, alice)["total_score"] != cache.score(alice, bob)["total_score"]
+    assert len(cache) == 1
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    # A new profile version misses
+    cache.score({**alice, "profile_version": 2}, bob)
+    assert cache.misses == 3
+
+    # Least recently used goes first; entries expire after the TTL
+    cache.score(carol, bob)
+    assert cache.get(alice, bob) is None and cache.evictions == 1
+    now[0] = 11
+    assert cache.get(carol, bob) is None and cache.expirations == 1
@@ -0,0 +1,35 @@
+"""Data migrations against an in-memory MongoDB"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import migrations
+
+def test_last_activity_is_stored_as_a_date_for_every_user(monkeypatch):
+    users = AsyncMongoMockClient()["solm8_test"]["users"]
+    monkeypatch.setattr(migrations, "users_collection", users)
+    recent = datetime.utcnow() - timedelta(minutes=5)
+
+    async def run():
+        await users.insert_many([
+            {"user_id": "dated", "user_status": "active", "last_activity": recent},
+            {"user_id": "missing", "user_status": "active"},
+            {"user_id": "iso", "user_status": "active", "last_activity": "2024-05-01T12:30:00Z"},
+            {"user_id": "offset", "user_status": "active", "last_activity": "2024-05-01T14:30:00+02:00"},
+            {"user_id": "garbled", "user_status": "active", "last_activity": "yesterday"},
+        ])
+        started = datetime.utcnow()
+        assert await migrations.normalize_last_activity() == 4
+        stored = {user["user_id"]: user["last_activity"] async for user in users.find({}, {"_id": 0})}
+        assert all(isinstance(value, datetime) for value in stored.values())
+        assert abs(stored["dated"] - recent) < timedelta(milliseconds=1)
+        assert stored["iso"] == stored["offset"] == datetime(2024, 5, 1, 12, 30)
+        # Missing and unreadable values count as active now, as the active-users list treated them
+        assert stored["missing"] >= started.replace(microsecond=0) and stored["garbled"] >= started.replace(microsecond=0)
+        assert await migrations.normalize_last_activity() == 0
+    asyncio.run(run())
@@ -0,0 +1,28 @@
+"""Stored recommendation lists against an in-memory MongoDB"""
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import recommendations
+from exclusions import SeenSet
+
+def test_precomputed_recommendations_serve_an_empty_page_for_a_zero_limit(monkeypatch):
+    database = AsyncMongoMockClient()["solm8_test"]
+    monkeypatch.setattr(recommendations, "recommendations_collection", database["recommendations"])
+    monkeypatch.setattr(recommendations, "users_collection", database["users"])
+    user = {"user_id": "user-1", "profile_version": 0}
+
+    async def run():
+        await database["users"].insert_one({"user_id": "user-2", "user_seq": 2, "profile_complete": True})
+        await database["recommendations"].insert_one({
+            "user_id": "user-1", "profile_version": 0, "generated_at": datetime.utcnow(), "min_percentage": -1,
+            "recommendations": [{"user_id": "user-2", "user_seq": 2, "compatibility_percentage": 80}]
+        })
+        assert await recommendations.precomputed_recommendations(user, SeenSet(), 0) == []
+        assert [u["user_id"] for u in await recommendations.precomputed_recommendations(user, SeenSet(), 1)] == ["user-2"]
+    asyncio.run(run())
@@ -0,0 +1,56 @@
+"""Daily swipe buckets against an in-memory MongoDB"""
+import asyncio
+import os
+import sys
+
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import DuplicateKeyError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import swipe_quota
+from swipe_quota import consume_swipe, consume_swipes, quota_day, quota_key
+
+class FirstUpsertRaces:
+    """Collection whose first find_one_and_update loses to a parallel first swipe"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.raced = False
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def find_one_and_update(self, query, update, **kwargs):
+        if not self.raced:
+            self.raced = True
+            await self.collection.update_one({"_id": query["_id"]}, {"$inc": {"count": 1}}, upsert=True)
+            raise DuplicateKeyError("E11000 duplicate key error")
+        return await self.collection.find_one_and_update(query, update, **kwargs)
+
+def quota_collection(monkeypatch):
+    collection = AsyncMongoMockClient()["solm8_test"]["swipe_quotas"]
+    monkeypatch.setattr(swipe_quota, "swipe_quotas_collection", collection)
+    return collection
+
+def test_a_batch_is_granted_up_to_the_limit(monkeypatch):
+    collection = quota_collection(monkeypatch)
+
+    async def run():
+        await collection.insert_one({"_id": quota_key("user-1", quota_day()), "user_id": "user-1", "count": 18})
+        assert await consume_swipes("user-1", 5, limit=20) == (2, 20)
+        assert await consume_swipes("user-1", 3, limit=20) == (0, 20)
+        assert await consume_swipe("user-1", limit=20) is None
+        assert await consume_swipes("user-2", 3, limit=20) == (3, 3)
+    asyncio.run(run())
+
+def test_a_lost_first_upsert_is_retried(monkeypatch):
+    collection = FirstUpsertRaces(quota_collection(monkeypatch))
+    monkeypatch.setattr(swipe_quota, "swipe_quotas_collection", collection)
+
+    async def run():
+        # Unlimited: the whole batch is retried against the bucket the parallel swipe created
+        assert await consume_swipes("user-1", 4, limit=None) == (4, 5)
+        collection.raced = False
+        assert await consume_swipes("user-2", 25, limit=20) == (19, 20)
+    asyncio.run(run())